@@ -0,0 +1,134 @@
+""" Synthetic daily station datasets for the benchmarks
+
+The datasets are generated from a fixed seed, so every run of the benchmarks works on exactly
+the same values: a seasonal temperature cycle with noise for tmin/tmax/tmean and gamma
+distributed precipitation on wet days.
+
+The stations are generated in blocks of STATION_BLOCK_SIZE, every block and every random component
+(station offset, temperature noise, daily range, wet days, precipitation amount) from its own random
+stream. So one variable, or the first stations of a variable, can be generated without the others,
+which keeps the memory of large datasets (e.g. 10000 stations x 100 years) bounded to the arrays
+actually used.
+"""
+
+from typing import Dict, Optional
+import numpy as np
+import pandas as pd
+
+START_YEAR = 1960
+
+STATION_BLOCK_SIZE = 100
+
+VARIABLES = ["tmin", "tmax", "tmean", "prec"]
+
+# Random stream of every component of a block
+STATION_OFFSET, TEMPERATURE_NOISE, DAILY_RANGE, WET_DAY, PRECIPITATION_AMOUNT = range(5)
+
+
+def make_dates(n_years: int,
+               start_year: int = START_YEAR) -> pd.DatetimeIndex:
+    """Function for the daily dates of a synthetic dataset
+
+    Args:
+        n_years (int): number of years
+        start_year (int): first year of the dataset
+
+    Returns:
+        pd.DatetimeIndex: all days from the 1st of January of the first to the 31st of December of the last year
+
+    """
+    return pd.date_range(f"{start_year}-01-01", f"{start_year + n_years - 1}-12-31")
+
+
+def _block_values(variable: str,
+                  day_of_year: np.ndarray,
+                  block: int,
+                  n_block_stations: int,
+                  seed: int) -> np.ndarray:
+    def rng(component):
+        return np.random.default_rng([seed, block, component])
+
+    shape = (day_of_year.size, n_block_stations)
+
+    if variable == "prec":
+        wet_day = rng(WET_DAY).random(shape) < 0.45
+        return np.where(wet_day, rng(PRECIPITATION_AMOUNT).gamma(0.8, 6.0, shape), 0.0).round(1)
+
+    station_offset = rng(STATION_OFFSET).normal(0.0, 3.0, n_block_stations)[np.newaxis, :]
+
+    seasonal_cycle = 9.0 + 10.0 * np.sin(2 * np.pi * (day_of_year[:, np.newaxis] - 105) / 365.25) + station_offset
+
+    tmean = seasonal_cycle + rng(TEMPERATURE_NOISE).normal(0.0, 3.5, shape)
+
+    if variable == "tmean":
+        return tmean.round(1)
+
+    daily_range = rng(DAILY_RANGE).gamma(4.0, 2.0, shape)
+
+    if variable == "tmin":
+        return (tmean - daily_range / 2).round(1)
+
+    return (tmean + daily_range / 2).round(1)
+
+
+def make_station_variable(variable: str,
+                          n_stations: int,
+                          n_years: int,
+                          seed: int = 0,
+                          start_year: int = START_YEAR,
+                          first_stations: Optional[int] = None) -> np.ndarray:
+    """Function for building one variable of a synthetic daily dataset
+
+    Args:
+        variable (str): "tmin", "tmax", "tmean" or "prec"
+        n_stations (int): number of stations of the dataset
+        n_years (int): number of years
+        seed (int): seed of the random generator
+        start_year (int): first year of the dataset
+        first_stations (int): generate only the first stations of the dataset, None for all
+
+    Returns:
+        np.ndarray: float64 array of shape (days, stations)
+
+    """
+    if variable not in VARIABLES:
+        raise ValueError(f"Error: unknown variable '{variable}'.")
+
+    day_of_year = make_dates(n_years, start_year).dayofyear.to_numpy()
+
+    n_selected = n_stations if first_stations is None else min(first_stations, n_stations)
+
+    values = np.empty((day_of_year.size, n_selected))
+
+    for start in range(0, n_selected, STATION_BLOCK_SIZE):
+        block = start // STATION_BLOCK_SIZE
+        n_block_stations = min(STATION_BLOCK_SIZE, n_stations - start)
+        end = min(start + STATION_BLOCK_SIZE, n_selected)
+
+        values[:, start:end] = _block_values(variable, day_of_year, block, n_block_stations, seed)[:, :end - start]
+
+    return values
+
+
+def make_station_dataset(n_stations: int,
+                         n_years: int,
+                         seed: int = 0,
+                         start_year: int = START_YEAR) -> Dict[str, object]:
+    """Function for building a synthetic daily dataset
+
+    Args:
+        n_stations (int): number of stations
+        n_years (int): number of years
+        seed (int): seed of the random generator
+        start_year (int): first year of the dataset
+
+    Returns:
+        dict: the dates and one float64 array of shape (days, stations) per variable
+
+    """
+    dataset = {"dates": make_dates(n_years, start_year)}
+
+    for variable in VARIABLES:
+        dataset[variable] = make_station_variable(variable, n_stations, n_years, seed, start_year)
+
+    return dataset
@@ -0,0 +1,106 @@
+""" Import time benchmark of the climate_tools modules
+
+Every module is imported in a fresh interpreter several times; the best wall time of the import
+is compared with its budget. Modules of the NumPy core additionally must not load pandas or
+numba at import time. The script exits with a nonzero status if a budget is exceeded:
+
+    python benchmarks/import_time.py
+    python benchmarks/import_time.py --repeat 10 --budget-scale 2
+"""
+
+from typing import Tuple
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+BENCHMARK_DIRECTORY = os.path.dirname(os.path.abspath(__file__))
+REPOSITORY_DIRECTORY = os.path.dirname(BENCHMARK_DIRECTORY)
+
+# Budget of the import wall time in seconds, including the import of numpy (about 0.1 s)
+IMPORT_BUDGETS = {
+    "climate_tools": 0.05,
+    "climate_tools.profiling": 0.05,
+    "climate_tools.year_matrix": 0.25,
+    "climate_tools.batch_indices": 0.25,
+    "climate_tools.quality": 0.25,
+    "climate_tools.calendars": 0.25,
+    "climate_tools.grid_engine": 0.25,
+    "climate_tools.accumulators": 0.25,
+    "climate_tools.cumulative": 0.25,
+    "climate_tools.meteorological_funtions": 0.25,
+    "climate_tools.precipitation_correction_functions": 0.25,
+    "climate_tools.hydrological_functions": 0.25,
+    "climate_tools.snowpack": 0.25,
+    "climate_tools.streaming": 0.25,
+    "climate_tools.climate_indices": 0.25,
+    "climate_tools.threshold_cache": 0.25,
+}
+
+# Modules that must be importable without loading these packages
+DEFERRED_PACKAGES = ["pandas", "numba"]
+
+MEASURE_SCRIPT = """
+import json, sys, time
+start = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - start
+print(json.dumps({{"seconds": elapsed, "loaded": [name for name in {deferred!r} if name in sys.modules]}}))
+"""
+
+
+def measure_import(module: str,
+                   repeat: int) -> Tuple[float, list]:
+    """Function for the best import time of a module over several fresh interpreters
+
+    Args:
+        module (str): module name
+        repeat (int): number of interpreters
+
+    Returns:
+        tuple: best import time in seconds and the deferred packages loaded by the import
+
+    """
+    best = None
+    loaded = []
+
+    for _ in range(repeat):
+        output = subprocess.run([sys.executable, "-c", MEASURE_SCRIPT.format(module=module,
+                                                                              deferred=DEFERRED_PACKAGES)],
+                                cwd=REPOSITORY_DIRECTORY, capture_output=True, text=True, check=True).stdout
+        result = json.loads(output)
+
+        best = result["seconds"] if best is None else min(best, result["seconds"])
+        loaded = result["loaded"]
+
+    return best, loaded
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=5, help="fresh interpreters per module")
+    parser.add_argument("--budget-scale", type=float, default=1.0, help="factor applied to all budgets")
+    args = parser.parse_args()
+
+    failed = False
+
+    for module, budget in IMPORT_BUDGETS.items():
+        seconds, loaded = measure_import(module, args.repeat)
+        budget = budget * args.budget_scale
+
+        status = "ok"
+        if seconds > budget:
+            status = "OVER BUDGET"
+        if loaded:
+            status = f"LOADS {', '.join(loaded)}"
+
+        failed |= status != "ok"
+
+        print(f"{module:50s} {seconds * 1000:8.1f} ms  budget {budget * 1000:6.0f} ms  {status}")
+
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,538 @@
+""" Benchmark suite for climate_indices, batch_indices, meteorological_funtions and
+precipitation_correction_functions
+
+Every public function is timed on synthetic datasets (see datasets.py) of the requested sizes.
+For each benchmark the best wall time of several repeats, the throughput and the peak memory
+(traced with tracemalloc in a separate run) are recorded. Results are stored as JSON named after
+the current git commit, so two commits can be compared:
+
+    python benchmarks/run_benchmarks.py --stations 1 100 10000 --years 30 100
+    python benchmarks/run_benchmarks.py --compare benchmarks/results/<old>.json benchmarks/results/<new>.json
+
+Functions working on one station-year at a time are evaluated on at most --per-series-limit
+station-years (the throughput stays comparable), all array functions on the full dataset. The inputs
+are generated per variable on first use and, for datasets of more than DEFAULT_CACHE_BYTES per
+variable, released after every benchmark, so large sizes (e.g. 10000 stations x 100 years) only
+hold the inputs of the running benchmark.
+"""
+
+from typing import Callable, Dict, List, Optional, Tuple
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+import numpy as np
+import pandas as pd
+
+BENCHMARK_DIRECTORY = os.path.dirname(os.path.abspath(__file__))
+REPOSITORY_DIRECTORY = os.path.dirname(BENCHMARK_DIRECTORY)
+
+sys.path.insert(0, REPOSITORY_DIRECTORY)
+
+from datasets import make_dates, make_station_variable  # noqa: E402
+from climate_tools import climate_indices  # noqa: E402
+from climate_tools import batch_indices  # noqa: E402
+from climate_tools.year_matrix import YearMatrix  # noqa: E402
+from climate_tools import snowpack  # noqa: E402
+from climate_tools import streaming  # noqa: E402
+from climate_tools import meteorological_funtions  # noqa: E402
+from climate_tools import precipitation_correction_functions  # noqa: E402
+
+DEFAULT_RESULTS_DIRECTORY = os.path.join(BENCHMARK_DIRECTORY, "results")
+DEFAULT_REGRESSION_THRESHOLD = 1.2
+
+# Inputs of datasets with more bytes per variable are released after every benchmark
+DEFAULT_CACHE_BYTES = 256 * 1024 ** 2
+
+BENCHMARKS = []
+
+
+def benchmark(name: str,
+              unit: str):
+    """Decorator registering a benchmark; the decorated setup function receives the context and
+    returns the function to time and the number of processed items"""
+    def register(setup: Callable[["Context"], Tuple[Callable[[], object], int]]):
+        BENCHMARKS.append((name, unit, setup))
+        return setup
+
+    return register
+
+
+class Context:
+    """Lazily prepared inputs of one dataset size. Every input (values of a variable, year matrix, ...) is
+    generated on first use; inputs of datasets larger than cache_bytes per variable are released after
+    every benchmark, so at no time more than the inputs of one benchmark are held in memory"""
+
+    def __init__(self,
+                 n_stations: int,
+                 n_years: int,
+                 per_series_limit: int,
+                 cache_bytes: int = DEFAULT_CACHE_BYTES):
+        self.n_stations = n_stations
+        self.n_years = n_years
+        self.per_series_limit = per_series_limit
+        self.cache_bytes = cache_bytes
+        self.dates = make_dates(n_years)
+        self._cache = {}
+
+    @property
+    def n_values(self) -> int:
+        return self.dates.size * self.n_stations
+
+    def _cached(self,
+                key: tuple,
+                build: Callable[[], object]):
+        if key not in self._cache:
+            self._cache[key] = build()
+
+        return self._cache[key]
+
+    def release(self) -> None:
+        """Function for dropping the inputs of a large dataset after a benchmark"""
+        if self.n_values * np.dtype(np.float64).itemsize > self.cache_bytes:
+            self._cache.clear()
+
+    def values(self,
+               variable: str,
+               first_stations: Optional[int] = None) -> np.ndarray:
+        """Function for the values of shape (days, stations) of a variable, optionally of the first stations only"""
+        if first_stations is not None and first_stations >= self.n_stations:
+            first_stations = None
+
+        return self._cached(("values", variable, first_stations),
+                            lambda: make_station_variable(variable, self.n_stations, self.n_years,
+                                                          first_stations=first_stations))
+
+    def station_values(self,
+                       variable: str) -> np.ndarray:
+        """Function for the values of the first station of a variable"""
+        return self.values(variable, 1)[:, 0]
+
+    def year_series(self,
+                    variable: str) -> List[pd.Series]:
+        def build():
+            years = self.dates.year.to_numpy()
+            boundaries = np.flatnonzero(np.diff(years)) + 1
+            starts = np.concatenate([[0], boundaries])
+            ends = np.concatenate([boundaries, [self.dates.size]])
+
+            # Only the stations within the limit of station-years are generated
+            values = self.values(variable, -(-self.per_series_limit // self.n_years))
+
+            return [pd.Series(values[start:end, station])
+                    for station in range(values.shape[1])
+                    for start, end in zip(starts, ends)][:self.per_series_limit]
+
+        return self._cached(("year_series", variable), build)
+
+    def year_matrix(self,
+                    variable: str,
+                    dtype=np.float64) -> YearMatrix:
+        return self._cached(("year_matrix", variable, np.dtype(dtype).name),
+                            lambda: YearMatrix.from_array(self.values(variable), self.dates, dtype=dtype))
+
+    @property
+    def reference_frame(self) -> pd.DataFrame:
+        return self._cached(("reference_frame", ),
+                            lambda: pd.DataFrame({"DATE": self.dates, "VALUES": self.station_values("tmin")}))
+
+    @property
+    def reference_period(self) -> Tuple[int, int]:
+        first_year = self.dates[0].year + (1 if self.n_years >= 32 else 0)
+
+        return first_year, first_year + 29
+
+
+def _per_series(function: Callable,
+                variable: str,
+                *args) -> Callable[["Context"], Tuple[Callable[[], object], int]]:
+    def setup(context: Context):
+        series = context.year_series(variable)
+        return (lambda: [function(values, *args) for values in series]), len(series)
+
+    return setup
+
+
+for _name, _variable in [("number_of_fd", "tmin"), ("number_of_sd", "tmax"), ("number_of_id", "tmax"),
+                         ("number_of_tn", "tmin"), ("consecutive_fd", "tmin"), ("consecutive_sd", "tmax"),
+                         ("sum_of_hdd", "tmean"), ("growing_season_length", "tmean"), ("rr10", "prec"),
+                         ("rr20", "prec"), ("consecutive_dd", "prec"), ("is_valid_year_length", "tmean"),
+                         ("rle", "prec")]:
+    benchmark(f"climate_indices.{_name}", "station-years")(_per_series(getattr(climate_indices, _name), _variable))
+
+benchmark("climate_indices.fix_timeseries_for_leapyear", "station-years")(
+    _per_series(climate_indices.fix_timeseries_for_leapyear, "tmin"))
+
+
+@benchmark("climate_indices.number_of", "station-years")
+def _number_of(context: Context):
+    import operator
+    return _per_series(climate_indices.number_of, "tmin", 0.0, operator.lt)(context)
+
+
+@benchmark("climate_indices.number_of_cn", "station-years")
+def _number_of_cn(context: Context):
+    thresholds = pd.Series(np.zeros(365))
+    return _per_series(climate_indices.number_of_cn, "tmin", thresholds)(context)
+
+
+@benchmark("climate_indices.compute_indices", "station-years")
+def _compute_indices(context: Context):
+    series = {variable: pd.Series(context.station_values(variable), index=context.dates)
+              for variable in ["tmin", "tmax", "tmean", "prec"]}
+
+    return (lambda: climate_indices.compute_indices(**series)), context.n_years
+
+
+@benchmark("climate_indices.calculate_percentile_threshold", "stations")
+def _calculate_percentile_threshold(context: Context):
+    if context.n_years < 30:
+        return None
+
+    def run():
+        return climate_indices.calculate_percentile_threshold(context.reference_frame, [0.1, 0.9],
+                                                              context.reference_period, 5, 0.5)
+
+    return run, 1
+
+
+@benchmark("climate_indices.calculate_bootstrap_percentile_threshold", "stations")
+def _calculate_bootstrap_percentile_threshold(context: Context):
+    if context.n_years < 30:
+        return None
+
+    def run():
+        return climate_indices.calculate_bootstrap_percentile_threshold(context.reference_frame, 0.9,
+                                                                        context.reference_period, 5, 0.5)
+
+    return run, 1
+
+
+@benchmark("climate_indices.calculate_batch_percentile_threshold", "stations")
+def _calculate_batch_percentile_threshold(context: Context):
+    if context.n_years < 30:
+        return None
+
+    def run():
+        return climate_indices.calculate_batch_percentile_threshold(context.year_matrix("tmin"), [0.1, 0.9],
+                                                                    context.reference_period, 5, 0.5)
+
+    return run, context.n_stations
+
+
+for _name in sorted(batch_indices.PERCENTILE_INDICES):
+    def _percentile_setup(context: Context, name=_name):
+        if context.n_years < 30:
+            return None
+
+        function, variable, percentile = batch_indices.PERCENTILE_INDICES[name]
+
+        year_matrix = context.year_matrix(variable)
+        thresholds = climate_indices.calculate_batch_percentile_threshold(year_matrix, percentile,
+                                                                          context.reference_period, 5, 0.5)
+
+        return (lambda: function(year_matrix, thresholds)), context.n_stations * context.n_years
+
+    benchmark(f"batch_indices.{_name}", "station-years")(_percentile_setup)
+
+
+@benchmark("climate_indices.calculate_batch_wet_day_percentile", "stations")
+def _calculate_batch_wet_day_percentile(context: Context):
+    if context.n_years < 30:
+        return None
+
+    def run():
+        return climate_indices.calculate_batch_wet_day_percentile(context.year_matrix("prec"), [0.95, 0.99],
+                                                                  context.reference_period)
+
+    return run, context.n_stations
+
+
+for _name in sorted(batch_indices.WET_DAY_PERCENTILE_INDICES):
+    def _wet_day_percentile_setup(context: Context, name=_name):
+        if context.n_years < 30:
+            return None
+
+        function, percentile = batch_indices.WET_DAY_PERCENTILE_INDICES[name]
+
+        year_matrix = context.year_matrix("prec")
+        thresholds = climate_indices.calculate_batch_wet_day_percentile(year_matrix, percentile,
+                                                                        context.reference_period)
+
+        return (lambda: function(year_matrix, thresholds)), context.n_stations * context.n_years
+
+    benchmark(f"batch_indices.{_name}", "station-years")(_wet_day_percentile_setup)
+
+
+for _name in sorted(batch_indices.BATCH_INDICES):
+    _variable = batch_indices.INDEX_VARIABLES[_name]
+
+    def _batch_setup(context: Context, function=batch_indices.BATCH_INDICES[_name], variable=_variable):
+        year_matrix = context.year_matrix(variable)
+        return (lambda: function(year_matrix)), context.n_stations * context.n_years
+
+    benchmark(f"batch_indices.{_name}", "station-years")(_batch_setup)
+
+    def _compact_batch_setup(context: Context, function=batch_indices.BATCH_INDICES[_name], variable=_variable):
+        year_matrix = context.year_matrix(variable, np.float32)
+        return (lambda: function(year_matrix, compact=True)), context.n_stations * context.n_years
+
+    benchmark(f"batch_indices.{_name}[compact]", "station-years")(_compact_batch_setup)
+
+
+@benchmark("streaming.stream_indices", "station-years")
+def _stream_indices(context: Context):
+    dates = context.dates
+    records = {"DATE": dates, **{variable: context.station_values(variable) for variable in ["tmin", "tmax", "prec"]}}
+
+    # Chunks of 1000 days, not aligned with the years
+    chunk_size = 1000
+    indices = ["number_of_fd", "consecutive_sd", "rx5day", "sdii"]
+
+    def run():
+        chunks = ({column: values[start:start + chunk_size] for column, values in records.items()}
+                  for start in range(0, len(dates), chunk_size))
+
+        return list(streaming.stream_indices(chunks, indices))
+
+    return run, context.n_years
+
+
+def _array_setup(function: Callable,
+                 variables: Dict[str, str],
+                 **constants) -> Callable[["Context"], Tuple[Callable[[], object], int]]:
+    def setup(context: Context):
+        inputs = {argument: context.values(variable) for argument, variable in variables.items()}
+        return (lambda: function(**inputs, **constants)), context.n_values
+
+    return setup
+
+
+benchmark("meteorological_funtions.get_sat_wvp", "values")(
+    _array_setup(meteorological_funtions.get_sat_wvp, {"temperature_air": "tmean"}))
+benchmark("meteorological_funtions.get_wvp", "values")(
+    _array_setup(meteorological_funtions.get_wvp, {"temperature_air": "tmean"}, humidity=0.7))
+benchmark("meteorological_funtions.get_humidity", "values")(
+    _array_setup(meteorological_funtions.get_humidity, {"temperature_air": "tmean"}, water_vapor_pressure=10.0))
+benchmark("meteorological_funtions.get_air_pressure", "values")(
+    _array_setup(meteorological_funtions.get_air_pressure, {"T2": "tmean"}, p1=1013.25, h1=0.0, h2=500.0, T1=288.15))
+benchmark("meteorological_funtions.get_windspeed_height", "values")(
+    _array_setup(meteorological_funtions.get_windspeed_height, {"u1": "prec"}, h1=10.0, h2=2.0, z0=0.1))
+benchmark("meteorological_funtions.get_evapotranspiration", "values")(
+    _array_setup(meteorological_funtions.get_evapotranspiration, {"e_pot": "tmax"}, e_izp=0.5, e_a=2.0))
+
+
+def _solar_setup(function: Callable,
+                 **constants) -> Callable[["Context"], Tuple[Callable[[], object], int]]:
+    def setup(context: Context):
+        julian_day = np.broadcast_to(context.dates.dayofyear.to_numpy()[:, np.newaxis],
+                                     (context.dates.size, context.n_stations))
+        latitude = np.radians(np.linspace(47.0, 55.0, context.n_stations))[np.newaxis, :]
+        return (lambda: function(julian_day=julian_day, latitude=latitude, **constants)), context.n_values
+
+    return setup
+
+
+@benchmark("meteorological_funtions.get_sun_decl", "values")
+def _get_sun_decl(context: Context):
+    julian_day = context.dates.dayofyear.to_numpy()
+    return (lambda: meteorological_funtions.get_sun_decl(julian_day)), julian_day.size
+
+
+benchmark("meteorological_funtions.get_sunrise", "values")(_solar_setup(meteorological_funtions.get_sunrise))
+benchmark("meteorological_funtions.get_pos_sun_dur", "values")(_solar_setup(meteorological_funtions.get_pos_sun_dur))
+benchmark("meteorological_funtions.get_sun_rad", "values")(_solar_setup(meteorological_funtions.get_sun_rad))
+benchmark("meteorological_funtions.get_glob_rad_daily", "values")(
+    _solar_setup(meteorological_funtions.get_glob_rad_daily, month=6, sun_radiation_direct=1.0, sunshine_duration=5.0))
+benchmark("meteorological_funtions.get_glob_rad_hourly", "values")(
+    _solar_setup(meteorological_funtions.get_glob_rad_hourly, sun_radiation_direct=1.0, sunshine_duration=0.5))
+
+
+benchmark("meteorological_funtions.get_eb_snowpack_dd", "values")(
+    _array_setup(meteorological_funtions.get_eb_snowpack_dd, {"prec": "prec", "t_air": "tmean"},
+                 t_boundary=1.0, ta=24, degree_day_factor=3.0, also_snowmelt=True))
+benchmark("meteorological_funtions.get_eb_snowpack_knauf", "values")(
+    _array_setup(meteorological_funtions.get_eb_snowpack_knauf, {"prec": "prec", "t_air": "tmean"},
+                 a0=2.0, a1=1.5, v=3.0, ta=24, hf_ground=2.0))
+
+
+@benchmark("snowpack.simulate_snowpack", "values")
+def _simulate_snowpack(context: Context):
+    # (days, stations) -> (cells, timesteps)
+    prec = context.values("prec").T
+    t_air = context.values("tmean").T
+
+    return (lambda: snowpack.simulate_snowpack(prec, t_air, degree_day_factor=3.0, t_boundary=1.0)), context.n_values
+
+
+@benchmark("precipitation_correction_functions.prec_correction_method1", "values")
+def _prec_correction_method1(context: Context):
+    month = context.dates.month.to_numpy()[:, np.newaxis]
+    return _array_setup(precipitation_correction_functions.prec_correction_method1,
+                        {"precipitation": "prec", "temperature_air": "tmean"},
+                        month=month, windspeed_1m=2.0, temperature_min=1.0)(context)
+
+
+@benchmark("precipitation_correction_functions.prec_correction_method2", "values")
+def _prec_correction_method2(context: Context):
+    month = context.dates.month.to_numpy()[:, np.newaxis]
+    return _array_setup(precipitation_correction_functions.prec_correction_method2,
+                        {"precipitation": "prec", "temperature_air": "tmean"},
+                        month=month, horizon_shielding="5D")(context)
+
+
+benchmark("precipitation_correction_functions.prec_areal_correction", "values")(
+    _array_setup(precipitation_correction_functions.prec_areal_correction, {"precipitation": "prec"},
+                 correction_factor=1.1))
+benchmark("precipitation_correction_functions.prec_height_correction_boundary", "values")(
+    _array_setup(precipitation_correction_functions.prec_height_correction_boundary, {"cor_val_absolute": "prec"},
+                 cor_val_relative=0.1))
+
+
+@benchmark("precipitation_correction_functions.prec_height_correction", "values")
+def _prec_height_correction(context: Context):
+    values = context.values("prec", -(-context.per_series_limit // context.dates.size)).ravel(order="F")
+    values = values[:context.per_series_limit].tolist()
+    return (lambda: [precipitation_correction_functions.prec_height_correction(value, 500.0, 100.0, 5.0, 1.0, 0.1)
+                     for value in values]), len(values)
+
+
+def run_benchmark(function: Callable[[], object],
+                  repeat: int) -> Tuple[float, int]:
+    """Function for the best wall time of several repeats and the peak memory of one extra run"""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    try:
+        function()
+        _, peak_bytes = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return min(timings), peak_bytes
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=REPOSITORY_DIRECTORY,
+                                       text=True, stderr=subprocess.DEVNULL).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def run_suite(stations: List[int],
+              years: List[int],
+              repeat: int,
+              per_series_limit: int,
+              pattern: str = "") -> dict:
+    results = []
+    for n_stations in stations:
+        for n_years in years:
+            context = Context(n_stations, n_years, per_series_limit)
+
+            for name, unit, setup in BENCHMARKS:
+                if pattern not in name:
+                    continue
+
+                prepared = setup(context)
+                if prepared is None:
+                    continue
+
+                function, n_items = prepared
+                seconds, peak_bytes = run_benchmark(function, repeat)
+
+                # The inputs of large datasets are only held for one benchmark
+                del prepared, function
+                context.release()
+
+                result = {"name": name,
+                          "stations": n_stations,
+                          "years": n_years,
+                          "items": n_items,
+                          "unit": unit,
+                          "seconds": seconds,
+                          "throughput": n_items / seconds if seconds > 0 else float("inf"),
+                          "peak_bytes": peak_bytes}
+                results.append(result)
+
+                print(f"{name:70s} {n_stations:>6d} x {n_years:>3d}  {seconds:10.4f} s  "
+                      f"{result['throughput']:14.1f} {unit}/s  {peak_bytes / 1024 ** 2:10.2f} MiB", flush=True)
+
+    return {"commit": git_commit(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "pandas": pd.__version__,
+            "machine": platform.machine(),
+            "results": results}
+
+
+def compare(old_path: str,
+            new_path: str,
+            threshold: float) -> bool:
+    """Function for printing the time and memory ratios of two result files, returns True if any benchmark
+    got slower or needs more memory than the threshold allows"""
+    with open(old_path) as file:
+        old = json.load(file)
+    with open(new_path) as file:
+        new = json.load(file)
+
+    old_results = {(result["name"], result["stations"], result["years"]): result for result in old["results"]}
+
+    regression = False
+    print(f"{old['commit']} -> {new['commit']}")
+    for result in new["results"]:
+        key = (result["name"], result["stations"], result["years"])
+        if key not in old_results:
+            continue
+
+        time_ratio = result["seconds"] / max(old_results[key]["seconds"], 1e-12)
+        memory_ratio = result["peak_bytes"] / max(old_results[key]["peak_bytes"], 1)
+
+        flag = ""
+        if time_ratio > threshold or memory_ratio > threshold:
+            flag = "REGRESSION"
+            regression = True
+
+        print(f"{key[0]:70s} {key[1]:>6d} x {key[2]:>3d}  time x{time_ratio:6.2f}  memory x{memory_ratio:6.2f}  {flag}")
+
+    return regression
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--stations", type=int, nargs="+", default=[1, 100])
+    parser.add_argument("--years", type=int, nargs="+", default=[30])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--per-series-limit", type=int, default=3000)
+    parser.add_argument("--filter", default="", help="run only benchmarks whose name contains this text")
+    parser.add_argument("--output", default=DEFAULT_RESULTS_DIRECTORY)
+    parser.add_argument("--compare", nargs=2, metavar=("OLD", "NEW"))
+    parser.add_argument("--threshold", type=float, default=DEFAULT_REGRESSION_THRESHOLD)
+    args = parser.parse_args(argv)
+
+    if args.compare:
+        return int(compare(*args.compare, args.threshold))
+
+    suite = run_suite(args.stations, args.years, args.repeat, args.per_series_limit, args.filter)
+
+    os.makedirs(args.output, exist_ok=True)
+    path = os.path.join(args.output, f"{suite['commit']}.json")
+    with open(path, "w") as file:
+        json.dump(suite, file, indent=1)
+
+    print(f"results written to {path}")
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
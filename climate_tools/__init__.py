@@ -0,0 +1,43 @@
+""" climate_tools - climate indices, meteorological, hydrological and precipitation correction functions
+
+The submodules are imported on first access (climate_tools.batch_indices, ...), so importing the
+package is cheap. The NumPy core (year_matrix, batch_indices, run_length, spell_kernels, quality,
+calendars, ...) does not import pandas; pandas is only loaded by the pandas based interfaces
+(climate_indices, threshold_cache, cli) when they are used.
+"""
+
+import importlib
+
+__all__ = [
+    "accumulators",
+    "arrow_io",
+    "batch_indices",
+    "calendars",
+    "cli",
+    "climate_indices",
+    "cumulative",
+    "general_variables",
+    "grid_engine",
+    "hydrological_functions",
+    "meteorological_funtions",
+    "precipitation_correction_functions",
+    "profiling",
+    "quality",
+    "run_length",
+    "snowpack",
+    "spell_kernels",
+    "streaming",
+    "threshold_cache",
+    "year_matrix",
+]
+
+
+def __getattr__(name: str):
+    if name in __all__:
+        return importlib.import_module(f"{__name__}.{name}")
+
+    raise AttributeError(f"module '{__name__}' has no attribute '{name}'")
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
@@ -0,0 +1,24 @@
+""" Deferred imports of heavy optional modules (pandas) """
+
+import importlib
+
+
+class LazyModule:
+    """Module proxy importing the module on first attribute access
+
+    Args:
+        name (str): name of the module
+
+    """
+
+    def __init__(self,
+                 name: str):
+        self._name = name
+        self._module = None
+
+    def __getattr__(self,
+                    attribute: str):
+        if self._module is None:
+            self._module = importlib.import_module(self._name)
+
+        return getattr(self._module, attribute)
@@ -0,0 +1,251 @@
+""" Online accumulators for the annual climate indices of daily data feeds
+
+Each accumulator consumes one daily value per update in O(1), exposes the provisional
+year-to-date value and is finalized at the year boundary. The finalized value follows the
+rules of the functions in climate_indices, e.g. it is NaN if the year has not 365/366 values.
+"""
+
+from typing import Callable, Dict, Optional, Union
+import abc
+import operator
+import numpy as np
+
+
+class IndexAccumulator(abc.ABC):
+    """Base class of the accumulators, counts the days consumed in the current year"""
+
+    def __init__(self):
+        self.n_days = 0
+
+    def update(self,
+               value: float) -> None:
+        """Function for consuming the value of the next day
+
+        Args:
+            value (float): daily value
+
+        """
+        self.n_days += 1
+        self._update(value)
+
+    @abc.abstractmethod
+    def _update(self,
+                value: float) -> None:
+        """Function for consuming the value of the next day into the index"""
+
+    @abc.abstractmethod
+    def _reset(self) -> None:
+        """Function for resetting the index at the start of a year"""
+
+    @property
+    @abc.abstractmethod
+    def value(self) -> Union[float, int]:
+        """Provisional year-to-date value of the index"""
+
+    def finalize(self) -> Union[float, int]:
+        """Function for closing the current year, returns the final value and resets the accumulator
+
+        Returns:
+            np.nan or number: the index of the year, NaN if the year has not 365 or 366 values
+
+        """
+        result = self.value if self.n_days in [365, 366] else np.nan
+
+        self.n_days = 0
+        self._reset()
+
+        return result
+
+
+class CountAccumulator(IndexAccumulator):
+    """Accumulator counting the days that fulfill a comparison with a threshold
+
+    Args:
+        num (float): a number with what the values are compared with to receive a count
+        op (operator): the operator that is used to compare the values with the number
+
+    """
+
+    def __init__(self,
+                 num: float,
+                 op: Callable[[float, float], bool]):
+        super().__init__()
+
+        self.num = num
+        self.op = op
+        self.count = 0
+
+    def _update(self,
+                value: float) -> None:
+        if self.op(value, self.num):
+            self.count += 1
+
+    def _reset(self) -> None:
+        self.count = 0
+
+    @property
+    def value(self) -> int:
+        return self.count
+
+
+class SpellAccumulator(IndexAccumulator):
+    """Accumulator for the greatest number of consecutive days that fulfill a comparison with a threshold
+
+    Args:
+        num (float): a number with what the values are compared with
+        op (operator): the operator that is used to compare the values with the number
+
+    """
+
+    def __init__(self,
+                 num: float,
+                 op: Callable[[float, float], bool]):
+        super().__init__()
+
+        self.num = num
+        self.op = op
+        self.current = 0
+        self.maximum = 0
+
+    def _update(self,
+                value: float) -> None:
+        if self.op(value, self.num):
+            self.current += 1
+            self.maximum = max(self.maximum, self.current)
+        else:
+            self.current = 0
+
+    def _reset(self) -> None:
+        self.current = 0
+        self.maximum = 0
+
+    @property
+    def value(self) -> int:
+        return self.maximum
+
+
+class DegreeDayAccumulator(IndexAccumulator):
+    """Accumulator for the sum of degree differences of all days below a base temperature
+
+    Args:
+        num (float): base temperature
+
+    """
+
+    def __init__(self,
+                 num: float):
+        super().__init__()
+
+        self.num = num
+        self.total = 0.0
+
+    def _update(self,
+                value: float) -> None:
+        if value < self.num:
+            self.total += self.num - value
+
+    def _reset(self) -> None:
+        self.total = 0.0
+
+    @property
+    def value(self) -> float:
+        return self.total
+
+
+ACCUMULATORS = {
+    "number_of_fd": lambda: CountAccumulator(0.0, operator.lt),
+    "number_of_sd": lambda: CountAccumulator(25.0, operator.gt),
+    "number_of_id": lambda: CountAccumulator(0.0, operator.lt),
+    "number_of_tn": lambda: CountAccumulator(20.0, operator.gt),
+    "rr10": lambda: CountAccumulator(10.0, operator.ge),
+    "rr20": lambda: CountAccumulator(20.0, operator.ge),
+    "consecutive_fd": lambda: SpellAccumulator(0.0, operator.lt),
+    "consecutive_sd": lambda: SpellAccumulator(25.0, operator.gt),
+    "consecutive_dd": lambda: SpellAccumulator(1.0, operator.lt),
+    "sum_of_hdd": lambda: DegreeDayAccumulator(17.0),
+}
+
+
+def make_accumulator(index: str) -> IndexAccumulator:
+    """Function for creating the accumulator of an index of climate_indices
+
+    Args:
+        index (str): name of the index function, e.g. "number_of_fd"
+
+    Returns:
+        IndexAccumulator: a fresh accumulator
+
+    """
+    if index not in ACCUMULATORS:
+        raise ValueError(f"Error: no accumulator for index '{index}'.")
+
+    return ACCUMULATORS[index]()
+
+
+class AnnualIndexStream:
+    """Set of accumulators for one station that is fed day by day and finalizes all indices at the
+    year boundary
+
+    Args:
+        indices (dict): mapping of index name to the name of the variable it is computed from,
+            e.g. {"number_of_fd": "tmin", "rr10": "prec"}
+
+    """
+
+    def __init__(self,
+                 indices: Dict[str, str]):
+        self.indices = dict(indices)
+        self.accumulators = {index: make_accumulator(index) for index in self.indices}
+        self.year = None
+        self.last_date = None
+
+    def update(self,
+               date: np.datetime64,
+               values: Dict[str, float]) -> Optional[Dict[str, Union[float, int]]]:
+        """Function for consuming the values of the next day
+
+        Args:
+            date (np.datetime64): date of the values, has to be later than the previous date
+            values (dict): daily value per variable
+
+        Returns:
+            dict or None: the final indices of the previous year if the date starts a new year
+
+        """
+        date = np.datetime64(date, "D")
+
+        if self.last_date is not None and not date > self.last_date:
+            raise ValueError("Error: dates have to be strictly increasing.")
+
+        year = int(date.astype("datetime64[Y]").astype(int)) + 1970
+
+        result = None
+        if self.year is not None and year != self.year:
+            result = self.finalize()
+
+        self.year = year
+        self.last_date = date
+
+        for index, accumulator in self.accumulators.items():
+            accumulator.update(values[self.indices[index]])
+
+        return result
+
+    @property
+    def values(self) -> Dict[str, Union[float, int]]:
+        """Provisional year-to-date values of all indices"""
+        return {index: accumulator.value for index, accumulator in self.accumulators.items()}
+
+    def finalize(self) -> Dict[str, Union[float, int]]:
+        """Function for closing the current year
+
+        Returns:
+            dict: the year and the final value of every index
+
+        """
+        result = {"YEAR": self.year}
+        result.update({index: accumulator.finalize() for index, accumulator in self.accumulators.items()})
+
+        self.year = None
+
+        return result
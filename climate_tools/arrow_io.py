@@ -0,0 +1,268 @@
+""" Arrow/Parquet input of station datasets and partitioned output of annual index results
+
+Station datasets are read with pyarrow.dataset in the long layout (one row per station and date),
+optionally partitioned (e.g. hive directories STATION=.../YEAR=...). Only the requested columns
+are read, and a year range is pushed down to the dataset: the filter on the date column skips
+Parquet row groups outside of it by their statistics, and an integer partition field YEAR skips
+whole partitions. Columns without missing values that arrive in one chunk are handed to NumPy
+without copying.
+
+Results are written as Parquet dataset partitioned by index and decade
+(<base_dir>/INDEX=<index>/DECADE=<decade>/*.parquet) with the columns STATION, YEAR and VALUE.
+
+pyarrow is an optional dependency, only needed by this module.
+"""
+
+from typing import Dict, Optional, Sequence, Tuple
+import datetime
+import numpy as np
+
+from climate_tools.year_matrix import YearMatrix
+from climate_tools.profiling import instrument
+
+# Partition field holding the year of the records, used to skip partitions outside a year range
+YEAR_PARTITION_FIELD = "YEAR"
+
+
+def _import_pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.compute
+        import pyarrow.dataset
+    except ImportError:
+        raise ImportError("Error: reading and writing Arrow/Parquet data requires the package 'pyarrow'.")
+
+    return pyarrow
+
+
+def open_station_dataset(source,
+                         format: str = "parquet",
+                         partitioning: Optional[str] = "hive"):
+    """Function for opening a (partitioned) station dataset without reading it
+
+    Args:
+        source (str, list): file, directory or list of files
+        format (str): file format, "parquet", "arrow"/"ipc" or "feather"
+        partitioning (str): partitioning flavor of the directories, None for unpartitioned data
+
+    Returns:
+        pyarrow.dataset.Dataset: lazily read dataset
+
+    """
+    pa = _import_pyarrow()
+
+    return pa.dataset.dataset(source, format=format, partitioning=partitioning)
+
+
+def _year_filter(dataset,
+                 date_column: str,
+                 years: Tuple[int, int]):
+    pa = _import_pyarrow()
+
+    date_type = dataset.schema.field(date_column).type
+
+    if pa.types.is_date(date_type):
+        first, end = datetime.date(years[0], 1, 1), datetime.date(years[1] + 1, 1, 1)
+    else:
+        first, end = datetime.datetime(years[0], 1, 1), datetime.datetime(years[1] + 1, 1, 1)
+
+    field = pa.dataset.field(date_column)
+
+    row_filter = (field >= pa.scalar(first, type=date_type)) & (field < pa.scalar(end, type=date_type))
+
+    # The date filter does not prune partitions, those are selected by the partition field
+    partitioning = getattr(dataset, "partitioning", None)
+
+    if partitioning is not None and YEAR_PARTITION_FIELD in partitioning.schema.names:
+        year_type = partitioning.schema.field(YEAR_PARTITION_FIELD).type
+
+        if pa.types.is_integer(year_type):
+            year_field = pa.dataset.field(YEAR_PARTITION_FIELD)
+
+            row_filter &= (year_field >= pa.scalar(years[0], type=year_type)) & \
+                (year_field <= pa.scalar(years[1], type=year_type))
+
+    return row_filter
+
+
+def _to_numpy(column) -> np.ndarray:
+    # A single chunk without nulls of a primitive type is viewed without copying
+    if column.num_chunks == 1:
+        return column.chunk(0).to_numpy(zero_copy_only=False)
+
+    return column.to_numpy()
+
+
+@instrument
+def read_station_arrays(source,
+                        variables: Sequence[str],
+                        date_column: str = "DATE",
+                        station_column: Optional[str] = "STATION",
+                        years: Optional[Tuple[int, int]] = None,
+                        format: str = "parquet",
+                        partitioning: Optional[str] = "hive") -> Dict[str, np.ndarray]:
+    """Function for reading variables of a long station dataset into NumPy arrays
+
+    Args:
+        source (str, list, pyarrow.dataset.Dataset): dataset or file, directory or list of files
+        variables (list): value columns to read, e.g. ["tmin", "prec"]
+        date_column (str): name of the date column
+        station_column (str): name of the station column, None for a single station
+        years (tuple): first and last year to read, None for all
+        format (str): file format, "parquet", "arrow"/"ipc" or "feather"
+        partitioning (str): partitioning flavor of the directories, None for unpartitioned data
+
+    Returns:
+        dict: "dates" (datetime64[D]), "station_codes" (position in "stations"), "stations" (sorted
+        labels) and one value array per variable, all with one entry per row
+
+    """
+    pa = _import_pyarrow()
+
+    if isinstance(source, pa.dataset.Dataset):
+        dataset = source
+    else:
+        dataset = open_station_dataset(source, format, partitioning)
+
+    columns = [date_column] + ([station_column] if station_column is not None else []) + list(variables)
+
+    missing = [column for column in columns if column not in dataset.schema.names]
+
+    if missing:
+        raise ValueError(f"Error: station dataset has no columns {missing}.")
+
+    row_filter = _year_filter(dataset, date_column, years) if years is not None else None
+
+    table = dataset.to_table(columns=columns, filter=row_filter)
+
+    if table.num_rows == 0:
+        period = "" if years is None else f" in the years {years[0]} to {years[1]}"
+        raise ValueError(f"Error: station dataset has no records{period}.")
+
+    arrays = {"dates": _to_numpy(table.column(date_column)).astype("datetime64[D]", copy=False)}
+
+    if station_column is not None:
+        station = table.column(station_column)
+
+        stations = pa.compute.unique(station)
+        stations = stations.take(pa.compute.sort_indices(stations))
+
+        arrays["station_codes"] = _to_numpy(pa.compute.index_in(station, value_set=stations))
+        arrays["stations"] = stations.to_numpy(zero_copy_only=False)
+    else:
+        arrays["station_codes"] = np.zeros(table.num_rows, dtype=np.intp)
+        arrays["stations"] = np.zeros(1, dtype=np.intp)
+
+    for variable in variables:
+        arrays[variable] = _to_numpy(table.column(variable))
+
+    return arrays
+
+
+@instrument
+def read_year_matrices(source,
+                       variables: Sequence[str],
+                       date_column: str = "DATE",
+                       station_column: Optional[str] = "STATION",
+                       years: Optional[Tuple[int, int]] = None,
+                       format: str = "parquet",
+                       partitioning: Optional[str] = "hive") -> Dict[str, YearMatrix]:
+    """Function for reading variables of a long station dataset into year matrices for the batch
+    index kernels
+
+    Args:
+        source (str, list, pyarrow.dataset.Dataset): dataset or file, directory or list of files
+        variables (list): value columns to read, e.g. ["tmin", "prec"]
+        date_column (str): name of the date column
+        station_column (str): name of the station column, None for a single station
+        years (tuple): first and last year to read, None for all
+        format (str): file format, "parquet", "arrow"/"ipc" or "feather"
+        partitioning (str): partitioning flavor of the directories, None for unpartitioned data
+
+    Returns:
+        dict: year matrix per variable
+
+    """
+    arrays = read_station_arrays(source, variables, date_column, station_column, years, format, partitioning)
+
+    return {variable: YearMatrix.from_long_arrays(arrays[variable],
+                                                  arrays["dates"],
+                                                  arrays["station_codes"],
+                                                  arrays["stations"])
+            for variable in variables}
+
+
+@instrument
+def write_index_results(results: Dict[str, np.ndarray],
+                        years: Sequence[int],
+                        stations: Sequence,
+                        base_dir: str,
+                        existing_data_behavior: str = "overwrite_or_ignore") -> None:
+    """Function for writing annual index results as Parquet dataset partitioned by index and decade
+
+    Args:
+        results (dict): result of shape (stations, years) per index, e.g. of the batch kernels
+        years (sequence): years of the result arrays, e.g. YearMatrix.years
+        stations (sequence): stations of the result arrays, e.g. YearMatrix.stations
+        base_dir (str): root directory of the dataset
+        existing_data_behavior (str): handling of existing files, see pyarrow.dataset.write_dataset
+
+    """
+    pa = _import_pyarrow()
+
+    years = np.asarray(years)
+    stations = np.asarray(stations)
+
+    station_column = np.repeat(stations, years.size)
+    year_column = np.tile(years, stations.size)
+    decade_column = year_column // 10 * 10
+
+    tables = []
+
+    for index, result in results.items():
+        result = np.asarray(result)
+
+        if result.shape != (stations.size, years.size):
+            raise ValueError(f"Error: expecting result of shape (stations, years) for index '{index}'.")
+
+        tables.append(pa.table({"STATION": station_column,
+                                "YEAR": year_column,
+                                "VALUE": result.ravel(),
+                                "INDEX": pa.array(np.full(result.size, index)),
+                                "DECADE": decade_column}))
+
+    pa.dataset.write_dataset(pa.concat_tables(tables),
+                             base_dir,
+                             format="parquet",
+                             partitioning=["INDEX", "DECADE"],
+                             partitioning_flavor="hive",
+                             existing_data_behavior=existing_data_behavior)
+
+
+def write_index_table(table,
+                      base_dir: str,
+                      existing_data_behavior: str = "overwrite_or_ignore") -> None:
+    """Function for writing a results table with the columns STATION, YEAR and one column per index
+    (e.g. of the command line runner) as Parquet dataset partitioned by index and decade
+
+    Args:
+        table (pd.DataFrame): results table
+        base_dir (str): root directory of the dataset
+        existing_data_behavior (str): handling of existing files, see pyarrow.dataset.write_dataset
+
+    """
+    import pandas as pd
+
+    table = table.set_index(["STATION", "YEAR"])
+
+    stations = table.index.levels[0]
+    years = table.index.levels[1]
+
+    # Complete (stations, years) grid, station-years without result are NaN
+    table = table.reindex(pd.MultiIndex.from_product([stations, years], names=["STATION", "YEAR"]))
+
+    results = {index: table[index].to_numpy(dtype=float).reshape(stations.size, years.size)
+               for index in table.columns}
+
+    write_index_results(results, years.to_numpy(), stations.to_numpy(), base_dir, existing_data_behavior)
+
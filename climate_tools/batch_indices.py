@@ -0,0 +1,829 @@
+""" Batch versions of the annual climate indices working on year matrices
+
+Every function consumes a YearMatrix (or a plain array of shape (..., 366) in the same layout)
+and reduces along the day axis in one call. The result has the shape of the leading axes,
+e.g. (stations, years), and is NaN for station-years with missing days. Alternatively, the
+validity of the station-years can be given (e.g. the ETCCDI completeness rules of quality.py,
+built once per year matrix and shared by all indices); the values are then not scanned for gaps.
+
+Year matrices of float32 are reduced without promoting them to float64 (sums are still accumulated
+in float64). With compact=True, counts and spell lengths are returned as int16 with COMPACT_MISSING
+for invalid station-years and sums as float32, which quarters the memory of the results.
+"""
+
+from typing import Callable, Optional, Tuple, Union
+import operator
+import numpy as np
+
+from climate_tools.year_matrix import YearMatrix, DAYS_PER_YEAR_MATRIX
+from climate_tools import spell_kernels
+from climate_tools.run_length import spell_days
+from climate_tools.cumulative import max_window_sum, masked_sum
+from climate_tools.quality import VALIDITY, as_mask
+from climate_tools.profiling import instrument
+
+YEAR_MATRIX_OR_ARRAY = Union[YearMatrix, np.ndarray]
+
+# Value of invalid station-years in the int16 results of the compact mode
+COMPACT_MISSING = np.iinfo(np.int16).min
+
+DAYS_PER_THRESHOLDS = 365
+
+# Days with at least 1mm of precipitation are wet days
+WET_DAY_PRECIPITATION = 1.0
+
+# Position in the 365 day of year thresholds of every slot of a non-leap (row 0) and a leap year
+# (row 1), the 29th of February shares the threshold of the 28th of February
+THRESHOLD_SLOTS = np.array([np.minimum(np.arange(DAYS_PER_YEAR_MATRIX), DAYS_PER_THRESHOLDS - 1),
+                            np.arange(DAYS_PER_YEAR_MATRIX) - (np.arange(DAYS_PER_YEAR_MATRIX) >= 59)])
+
+
+def _unpack(data: YEAR_MATRIX_OR_ARRAY) -> Tuple[np.ndarray, np.ndarray]:
+    if isinstance(data, YearMatrix):
+        return data.values, data.day_mask
+
+    values = np.asarray(data)
+
+    if values.shape[-1] != DAYS_PER_YEAR_MATRIX:
+        raise ValueError("Error: expecting array with 366 days on the last axis.")
+
+    # Without calendar information only the first 365 slots are required to be present
+    day_mask = np.ones(DAYS_PER_YEAR_MATRIX, dtype=bool)
+    day_mask[-1] = False
+
+    return values, day_mask
+
+
+def is_complete_year(data: YEAR_MATRIX_OR_ARRAY) -> np.ndarray:
+    """Function for checking that every calendar day of a station-year holds a value
+
+    Args:
+        data (YearMatrix, np.ndarray): year matrix of daily values
+
+    Returns:
+        np.ndarray: True for complete station-years
+
+    """
+    return _is_complete(*_unpack(data))
+
+
+def _is_complete(values: np.ndarray,
+                 day_mask: np.ndarray) -> np.ndarray:
+    return ~np.any(np.isnan(values) & day_mask, axis=-1)
+
+
+def _mask_invalid(result: np.ndarray,
+                  values: np.ndarray,
+                  day_mask: np.ndarray,
+                  validity: Optional[VALIDITY],
+                  compact: bool = False) -> np.ndarray:
+    if validity is None:
+        valid = _is_complete(values, day_mask)
+    else:
+        valid = as_mask(validity)
+
+        if valid.shape != result.shape:
+            raise ValueError("Error: validity does not match the shape of the result.")
+
+    if compact:
+        if np.issubdtype(result.dtype, np.integer):
+            return np.where(valid, result, COMPACT_MISSING).astype(np.int16)
+
+        return np.where(valid, result, np.nan).astype(np.float32)
+
+    return np.where(valid, result, np.nan)
+
+
+def from_compact(result: np.ndarray) -> np.ndarray:
+    """Function for converting a result of the compact mode into floats with NaN for invalid station-years
+
+    Args:
+        result (np.ndarray): int16 result with COMPACT_MISSING or float32 result
+
+    Returns:
+        np.ndarray: float64 result, NaN for invalid station-years
+
+    """
+    result = np.asarray(result)
+
+    if np.issubdtype(result.dtype, np.integer):
+        return np.where(result == COMPACT_MISSING, np.nan, result)
+
+    return result.astype(np.float64)
+
+
+@instrument
+def number_of(data: YEAR_MATRIX_OR_ARRAY,
+              num: float,
+              op: Callable[[np.ndarray, float], np.ndarray],
+              validity: Optional[VALIDITY] = None,
+              compact: bool = False) -> np.ndarray:
+    """Helper function to count days per station-year according a given threshold and an operator
+
+    Args:
+        data (YearMatrix, np.ndarray): year matrix of daily values
+        num (float): a number with what the values are compared with to receive a count
+        op (operator): the operator that is used to compare the values with the number
+        validity (ValidityBitmap, np.ndarray): validity of the station-years, None for complete years only
+        compact (bool): return int16 with COMPACT_MISSING for invalid station-years
+
+    Returns:
+        np.ndarray: the counts per station-year, NaN for incomplete years
+
+    """
+    values, day_mask = _unpack(data)
+
+    counts = np.count_nonzero(op(values, num), axis=-1)
+
+    return _mask_invalid(counts, values, day_mask, validity, compact)
+
+
+@instrument
+def number_of_fd(tmin: YEAR_MATRIX_OR_ARRAY,
+                 validity: Optional[VALIDITY] = None,
+                 compact: bool = False) -> np.ndarray:
+    """Function for count of frost days (days where minimum temperature lower then 0°C)
+
+    Args:
+        tmin (YearMatrix, np.ndarray): year matrix of minimum temperature
+        validity (ValidityBitmap, np.ndarray): validity of the station-years, None for complete years only
+        compact (bool): return int16 with COMPACT_MISSING for invalid station-years
+
+    Returns:
+        np.ndarray: the count of frost days per station-year
+
+    """
+    return number_of(tmin, 0.0, operator.lt, validity, compact)
+
+
+@instrument
+def number_of_sd(tmax: YEAR_MATRIX_OR_ARRAY,
+                 validity: Optional[VALIDITY] = None,
+                 compact: bool = False) -> np.ndarray:
+    """Function for count of summer days (days where maximum temperature greater then 25°C)
+
+    Args:
+        tmax (YearMatrix, np.ndarray): year matrix of maximum temperature
+        validity (ValidityBitmap, np.ndarray): validity of the station-years, None for complete years only
+        compact (bool): return int16 with COMPACT_MISSING for invalid station-years
+
+    Returns:
+        np.ndarray: the count of summer days per station-year
+
+    """
+    return number_of(tmax, 25.0, operator.gt, validity, compact)
+
+
+@instrument
+def number_of_id(tmax: YEAR_MATRIX_OR_ARRAY,
+                 validity: Optional[VALIDITY] = None,
+                 compact: bool = False) -> np.ndarray:
+    """Function for count of icing days (days where maximum temperature smaller then 0°C)
+
+    Args:
+        tmax (YearMatrix, np.ndarray): year matrix of maximum temperature
+        validity (ValidityBitmap, np.ndarray): validity of the station-years, None for complete years only
+        compact (bool): return int16 with COMPACT_MISSING for invalid station-years
+
+    Returns:
+        np.ndarray: the count of icing days per station-year
+
+    """
+    return number_of(tmax, 0.0, operator.lt, validity, compact)
+
+
+@instrument
+def number_of_tn(tmin: YEAR_MATRIX_OR_ARRAY,
+                 validity: Optional[VALIDITY] = None,
+                 compact: bool = False) -> np.ndarray:
+    """Function for count of tropical nights (days where minimum temperature greater then 20°C)
+
+    Args:
+        tmin (YearMatrix, np.ndarray): year matrix of minimum temperature
+        validity (ValidityBitmap, np.ndarray): validity of the station-years, None for complete years only
+        compact (bool): return int16 with COMPACT_MISSING for invalid station-years
+
+    Returns:
+        np.ndarray: the count of tropical nights per station-year
+
+    """
+    return number_of(tmin, 20.0, operator.gt, validity, compact)
+
+
+@instrument
+def sum_of_hdd(tmean: YEAR_MATRIX_OR_ARRAY,
+               validity: Optional[VALIDITY] = None,
+               compact: bool = False) -> np.ndarray:
+    """Function for determining heating degree days (sum of [17°C - tmean] for all days where tmean < 17°C)
+
+    Args:
+        tmean (YearMatrix, np.ndarray): year matrix of mean temperature
+        validity (ValidityBitmap, np.ndarray): validity of the station-years, None for complete years only
+        compact (bool): return float32 sums
+
+    Returns:
+        np.ndarray: the sum of degree difference per station-year
+
+    """
+    values, day_mask = _unpack(tmean)
+
+    num = 17.0
+
+    degree_days = np.where(operator.lt(values, num), num - values, 0.0)
+
+    # float32 degree days are accumulated in float64
+    return _mask_invalid(np.sum(degree_days, axis=-1, dtype=np.float64), values, day_mask, validity, compact)
+
+
+@instrument
+def rr10(prec: YEAR_MATRIX_OR_ARRAY,
+         validity: Optional[VALIDITY] = None,
+         compact: bool = False) -> np.ndarray:
+    """Function for count of heavy precipitation (days where rr greater equal 10mm)
+
+    Args:
+        prec (YearMatrix, np.ndarray): year matrix of precipitation
+        validity (ValidityBitmap, np.ndarray): validity of the station-years, None for complete years only
+        compact (bool): return int16 with COMPACT_MISSING for invalid station-years
+
+    Returns:
+        np.ndarray: the count of heavy precipitation days per station-year
+
+    """
+    return number_of(prec, 10.0, operator.ge, validity, compact)
+
+
+@instrument
+def rr20(prec: YEAR_MATRIX_OR_ARRAY,
+         validity: Optional[VALIDITY] = None,
+         compact: bool = False) -> np.ndarray:
+    """Function for count of very heavy precipitation (days where rr greater equal 20mm)
+
+    Args:
+        prec (YearMatrix, np.ndarray): year matrix of precipitation
+        validity (ValidityBitmap, np.ndarray): validity of the station-years, None for complete years only
+        compact (bool): return int16 with COMPACT_MISSING for invalid station-years
+
+    Returns:
+        np.ndarray: the count of very heavy precipitation days per station-year
+
+    """
+    return number_of(prec, 20.0, operator.ge, validity, compact)
+
+
+def _longest_spell(data: YEAR_MATRIX_OR_ARRAY,
+                   num: float,
+                   below: bool,
+                   validity: Optional[VALIDITY] = None,
+                   compact: bool = False) -> np.ndarray:
+    values, day_mask = _unpack(data)
+
+    spells = spell_kernels.longest_spell(values.reshape(-1, DAYS_PER_YEAR_MATRIX), num, below)
+
+    return _mask_invalid(spells.reshape(values.shape[:-1]), values, day_mask, validity, compact)
+
+
+@instrument
+def consecutive_fd(tmin: YEAR_MATRIX_OR_ARRAY,
+                   validity: Optional[VALIDITY] = None,
+                   compact: bool = False) -> np.ndarray:
+    """Function for determining greatest number of consecutive frost days (tmin < 0°C)
+
+    Args:
+        tmin (YearMatrix, np.ndarray): year matrix of minimum temperature
+        validity (ValidityBitmap, np.ndarray): validity of the station-years, None for complete years only
+        compact (bool): return int16 with COMPACT_MISSING for invalid station-years
+
+    Returns:
+        np.ndarray: the greatest number of consecutive frost days per station-year
+
+    """
+    return _longest_spell(tmin, 0.0, below=True, validity=validity, compact=compact)
+
+
+@instrument
+def consecutive_sd(tmax: YEAR_MATRIX_OR_ARRAY,
+                   validity: Optional[VALIDITY] = None,
+                   compact: bool = False) -> np.ndarray:
+    """Function for determining greatest number of consecutive summer days (tmax > 25°C)
+
+    Args:
+        tmax (YearMatrix, np.ndarray): year matrix of maximum temperature
+        validity (ValidityBitmap, np.ndarray): validity of the station-years, None for complete years only
+        compact (bool): return int16 with COMPACT_MISSING for invalid station-years
+
+    Returns:
+        np.ndarray: the greatest number of consecutive summer days per station-year
+
+    """
+    return _longest_spell(tmax, 25.0, below=False, validity=validity, compact=compact)
+
+
+@instrument
+def consecutive_dd(prec: YEAR_MATRIX_OR_ARRAY,
+                   validity: Optional[VALIDITY] = None,
+                   compact: bool = False) -> np.ndarray:
+    """Function for determining greatest number of consecutive dry days (rr < 1mm)
+
+    Args:
+        prec (YearMatrix, np.ndarray): year matrix of precipitation
+        validity (ValidityBitmap, np.ndarray): validity of the station-years, None for complete years only
+        compact (bool): return int16 with COMPACT_MISSING for invalid station-years
+
+    Returns:
+        np.ndarray: the greatest number of consecutive dry days per station-year
+
+    """
+    return _longest_spell(prec, 1.0, below=True, validity=validity, compact=compact)
+
+
+@instrument
+def growing_season_length(tmean: YEAR_MATRIX_OR_ARRAY,
+                          validity: Optional[VALIDITY] = None,
+                          compact: bool = False) -> np.ndarray:
+    """Function for determining the growing-season-length
+
+    Args:
+        tmean (YearMatrix, np.ndarray): year matrix of mean temperature
+        validity (ValidityBitmap, np.ndarray): validity of the station-years, None for complete years only
+        compact (bool): return int16 with COMPACT_MISSING for invalid station-years
+
+    Returns:
+        np.ndarray: the growing season length per station-year
+
+    """
+    values, day_mask = _unpack(tmean)
+
+    # The 1st of July is day 183 in leap years, taken from the calendar as the 31st of December may be missing
+    jday_1jul = np.broadcast_to(np.where(day_mask[..., -1], 183, 182), values.shape[:-1])
+
+    gsl = spell_kernels.growing_season_length(values.reshape(-1, DAYS_PER_YEAR_MATRIX),
+                                              jday_1jul.reshape(-1))
+
+    return _mask_invalid(gsl.reshape(values.shape[:-1]), values, day_mask, validity, compact)
+
+
+def _exceedance_mask(values: np.ndarray,
+                     day_mask: np.ndarray,
+                     thresholds: np.ndarray,
+                     below: bool) -> np.ndarray:
+    """Function for comparing every day of a year matrix with the day of year threshold of its station
+
+    Args:
+        values (np.ndarray): values of shape (stations, years, 366)
+        day_mask (np.ndarray): calendar days of shape (years, 366)
+        thresholds (np.ndarray): 365 day of year thresholds per station of shape (stations, 365)
+        below (bool): True for days with values lower than the threshold, False for greater
+
+    Returns:
+        np.ndarray: True for days below (above) the threshold, False for missing days
+
+    """
+    thresholds = np.asarray(thresholds)
+
+    if thresholds.shape != values.shape[:-2] + (DAYS_PER_THRESHOLDS, ):
+        raise ValueError("Error: expecting 365 day of year thresholds per station.")
+
+    op = np.less if below else np.greater
+
+    # The last slot only holds a calendar day in leap years
+    is_leap = day_mask[..., -1, np.newaxis]
+
+    # The thresholds are broadcast over all years, the comparison runs once for non-leap and once for leap years
+    mask = np.zeros(values.shape, dtype=bool)
+    for leap in [False, True]:
+        slot_thresholds = thresholds[..., THRESHOLD_SLOTS[int(leap)]][..., np.newaxis, :]
+        op(values, slot_thresholds, out=mask, where=is_leap == leap)
+
+    return mask
+
+
+def _percentage_of_days(mask: np.ndarray,
+                        values: np.ndarray,
+                        day_mask: np.ndarray) -> np.ndarray:
+    # Share of the days holding a value
+    n_days = np.count_nonzero(~np.isnan(values) & day_mask, axis=-1)
+
+    return 100.0 * np.count_nonzero(mask, axis=-1) / np.maximum(n_days, 1)
+
+
+def _spell_days_of(mask: np.ndarray,
+                   min_length: int) -> np.ndarray:
+    return spell_days(mask.reshape(-1, DAYS_PER_YEAR_MATRIX), min_length).reshape(mask.shape[:-1])
+
+
+@instrument
+def exceedance_indices(data: YEAR_MATRIX_OR_ARRAY,
+                       thresholds: np.ndarray,
+                       below: bool,
+                       min_length: int = 6,
+                       validity: Optional[VALIDITY] = None,
+                       compact: bool = False) -> Tuple[np.ndarray, np.ndarray]:
+    """Function for the percentage of days beyond the day of year thresholds and the count of days in spells
+    beyond them, both from one comparison of the year matrix
+
+    Args:
+        data (YearMatrix, np.ndarray): year matrix of daily values
+        thresholds (np.ndarray): 365 day of year thresholds per station of shape (stations, 365), e.g. of
+            climate_indices.calculate_batch_percentile_threshold
+        below (bool): True for days with values lower than the threshold, False for greater
+        min_length (int): minimal length of a spell
+        validity (ValidityBitmap, np.ndarray): validity of the station-years, None for complete years only
+        compact (bool): return float32 percentages and int16 spell days with COMPACT_MISSING
+
+    Returns:
+        tuple: percentage of the days with values per station-year, count of spell days per station-year
+
+    """
+    values, day_mask = _unpack(data)
+
+    mask = _exceedance_mask(values, day_mask, thresholds, below)
+
+    return (_mask_invalid(_percentage_of_days(mask, values, day_mask), values, day_mask, validity, compact),
+            _mask_invalid(_spell_days_of(mask, min_length), values, day_mask, validity, compact))
+
+
+def _exceedance_percentage(data: YEAR_MATRIX_OR_ARRAY,
+                           thresholds: np.ndarray,
+                           below: bool,
+                           validity: Optional[VALIDITY] = None,
+                           compact: bool = False) -> np.ndarray:
+    values, day_mask = _unpack(data)
+
+    mask = _exceedance_mask(values, day_mask, thresholds, below)
+
+    return _mask_invalid(_percentage_of_days(mask, values, day_mask), values, day_mask, validity, compact)
+
+
+def _exceedance_spell_days(data: YEAR_MATRIX_OR_ARRAY,
+                           thresholds: np.ndarray,
+                           below: bool,
+                           validity: Optional[VALIDITY] = None,
+                           compact: bool = False) -> np.ndarray:
+    values, day_mask = _unpack(data)
+
+    mask = _exceedance_mask(values, day_mask, thresholds, below)
+
+    min_length = 6
+
+    return _mask_invalid(_spell_days_of(mask, min_length), values, day_mask, validity, compact)
+
+
+@instrument
+def tx10p(tmax: YEAR_MATRIX_OR_ARRAY,
+          thresholds: np.ndarray,
+          validity: Optional[VALIDITY] = None,
+          compact: bool = False) -> np.ndarray:
+    """Function for the percentage of cool days (days where maximum temperature lower then the 10th
+    percentile of the day of year)
+
+    Args:
+        tmax (YearMatrix, np.ndarray): year matrix of maximum temperature
+        thresholds (np.ndarray): 10th percentile of maximum temperature per station of shape (stations, 365)
+        validity (ValidityBitmap, np.ndarray): validity of the station-years, None for complete years only
+        compact (bool): return float32 percentages
+
+    Returns:
+        np.ndarray: the percentage of cool days per station-year
+
+    """
+    return _exceedance_percentage(tmax, thresholds, True, validity, compact)
+
+
+@instrument
+def tx90p(tmax: YEAR_MATRIX_OR_ARRAY,
+          thresholds: np.ndarray,
+          validity: Optional[VALIDITY] = None,
+          compact: bool = False) -> np.ndarray:
+    """Function for the percentage of warm days (days where maximum temperature greater then the 90th
+    percentile of the day of year)
+
+    Args:
+        tmax (YearMatrix, np.ndarray): year matrix of maximum temperature
+        thresholds (np.ndarray): 90th percentile of maximum temperature per station of shape (stations, 365)
+        validity (ValidityBitmap, np.ndarray): validity of the station-years, None for complete years only
+        compact (bool): return float32 percentages
+
+    Returns:
+        np.ndarray: the percentage of warm days per station-year
+
+    """
+    return _exceedance_percentage(tmax, thresholds, False, validity, compact)
+
+
+@instrument
+def tn10p(tmin: YEAR_MATRIX_OR_ARRAY,
+          thresholds: np.ndarray,
+          validity: Optional[VALIDITY] = None,
+          compact: bool = False) -> np.ndarray:
+    """Function for the percentage of cool nights (days where minimum temperature lower then the 10th
+    percentile of the day of year)
+
+    Args:
+        tmin (YearMatrix, np.ndarray): year matrix of minimum temperature
+        thresholds (np.ndarray): 10th percentile of minimum temperature per station of shape (stations, 365)
+        validity (ValidityBitmap, np.ndarray): validity of the station-years, None for complete years only
+        compact (bool): return float32 percentages
+
+    Returns:
+        np.ndarray: the percentage of cool nights per station-year
+
+    """
+    return _exceedance_percentage(tmin, thresholds, True, validity, compact)
+
+
+@instrument
+def tn90p(tmin: YEAR_MATRIX_OR_ARRAY,
+          thresholds: np.ndarray,
+          validity: Optional[VALIDITY] = None,
+          compact: bool = False) -> np.ndarray:
+    """Function for the percentage of warm nights (days where minimum temperature greater then the 90th
+    percentile of the day of year)
+
+    Args:
+        tmin (YearMatrix, np.ndarray): year matrix of minimum temperature
+        thresholds (np.ndarray): 90th percentile of minimum temperature per station of shape (stations, 365)
+        validity (ValidityBitmap, np.ndarray): validity of the station-years, None for complete years only
+        compact (bool): return float32 percentages
+
+    Returns:
+        np.ndarray: the percentage of warm nights per station-year
+
+    """
+    return _exceedance_percentage(tmin, thresholds, False, validity, compact)
+
+
+@instrument
+def wsdi(tmax: YEAR_MATRIX_OR_ARRAY,
+         thresholds: np.ndarray,
+         validity: Optional[VALIDITY] = None,
+         compact: bool = False) -> np.ndarray:
+    """Function for the warm spell duration index (count of days in spells of at least 6 days where
+    maximum temperature greater then the 90th percentile of the day of year)
+
+    Args:
+        tmax (YearMatrix, np.ndarray): year matrix of maximum temperature
+        thresholds (np.ndarray): 90th percentile of maximum temperature per station of shape (stations, 365)
+        validity (ValidityBitmap, np.ndarray): validity of the station-years, None for complete years only
+        compact (bool): return int16 with COMPACT_MISSING for invalid station-years
+
+    Returns:
+        np.ndarray: the count of warm spell days per station-year
+
+    """
+    return _exceedance_spell_days(tmax, thresholds, False, validity, compact)
+
+
+@instrument
+def csdi(tmin: YEAR_MATRIX_OR_ARRAY,
+         thresholds: np.ndarray,
+         validity: Optional[VALIDITY] = None,
+         compact: bool = False) -> np.ndarray:
+    """Function for the cold spell duration index (count of days in spells of at least 6 days where
+    minimum temperature lower then the 10th percentile of the day of year)
+
+    Args:
+        tmin (YearMatrix, np.ndarray): year matrix of minimum temperature
+        thresholds (np.ndarray): 10th percentile of minimum temperature per station of shape (stations, 365)
+        validity (ValidityBitmap, np.ndarray): validity of the station-years, None for complete years only
+        compact (bool): return int16 with COMPACT_MISSING for invalid station-years
+
+    Returns:
+        np.ndarray: the count of cold spell days per station-year
+
+    """
+    return _exceedance_spell_days(tmin, thresholds, True, validity, compact)
+
+
+@instrument
+def rx1day(prec: YEAR_MATRIX_OR_ARRAY,
+           validity: Optional[VALIDITY] = None,
+           compact: bool = False) -> np.ndarray:
+    """Function for the maximum 1-day precipitation
+
+    Args:
+        prec (YearMatrix, np.ndarray): year matrix of precipitation
+        validity (ValidityBitmap, np.ndarray): validity of the station-years, None for complete years only
+        compact (bool): return float32 maxima
+
+    Returns:
+        np.ndarray: the maximum daily precipitation per station-year
+
+    """
+    values, day_mask = _unpack(prec)
+
+    return _mask_invalid(np.fmax.reduce(values, axis=-1), values, day_mask, validity, compact)
+
+
+@instrument
+def rx5day(prec: YEAR_MATRIX_OR_ARRAY,
+           validity: Optional[VALIDITY] = None,
+           compact: bool = False) -> np.ndarray:
+    """Function for the maximum consecutive 5-day precipitation (windows with missing days are skipped)
+
+    Args:
+        prec (YearMatrix, np.ndarray): year matrix of precipitation
+        validity (ValidityBitmap, np.ndarray): validity of the station-years, None for complete years only
+        compact (bool): return float32 maxima
+
+    Returns:
+        np.ndarray: the maximum 5-day precipitation per station-year
+
+    """
+    values, day_mask = _unpack(prec)
+
+    window = 5
+
+    return _mask_invalid(max_window_sum(values, window), values, day_mask, validity, compact)
+
+
+@instrument
+def prcptot(prec: YEAR_MATRIX_OR_ARRAY,
+            validity: Optional[VALIDITY] = None,
+            compact: bool = False) -> np.ndarray:
+    """Function for the total precipitation of the wet days (rr greater equal 1mm)
+
+    Args:
+        prec (YearMatrix, np.ndarray): year matrix of precipitation
+        validity (ValidityBitmap, np.ndarray): validity of the station-years, None for complete years only
+        compact (bool): return float32 sums
+
+    Returns:
+        np.ndarray: the wet day precipitation per station-year
+
+    """
+    values, day_mask = _unpack(prec)
+
+    wet_days = values >= WET_DAY_PRECIPITATION
+
+    return _mask_invalid(masked_sum(values, wet_days), values, day_mask, validity, compact)
+
+
+@instrument
+def sdii(prec: YEAR_MATRIX_OR_ARRAY,
+         validity: Optional[VALIDITY] = None,
+         compact: bool = False) -> np.ndarray:
+    """Function for the simple precipitation intensity index (mean precipitation of the wet days, rr greater
+    equal 1mm, 0 for years without wet days)
+
+    Args:
+        prec (YearMatrix, np.ndarray): year matrix of precipitation
+        validity (ValidityBitmap, np.ndarray): validity of the station-years, None for complete years only
+        compact (bool): return float32 intensities
+
+    Returns:
+        np.ndarray: the mean wet day precipitation per station-year
+
+    """
+    values, day_mask = _unpack(prec)
+
+    wet_days = values >= WET_DAY_PRECIPITATION
+
+    n_wet_days = np.count_nonzero(wet_days, axis=-1)
+    intensity = masked_sum(values, wet_days) / np.maximum(n_wet_days, 1)
+
+    return _mask_invalid(intensity, values, day_mask, validity, compact)
+
+
+def _wet_day_exceedance_sum(prec: YEAR_MATRIX_OR_ARRAY,
+                            thresholds: np.ndarray,
+                            validity: Optional[VALIDITY] = None,
+                            compact: bool = False) -> np.ndarray:
+    values, day_mask = _unpack(prec)
+
+    thresholds = np.asarray(thresholds)
+
+    if thresholds.shape != values.shape[:-2]:
+        raise ValueError("Error: expecting one wet day threshold per station.")
+
+    # One threshold per station, broadcast over its years and days
+    exceedance = (values >= WET_DAY_PRECIPITATION) & (values > thresholds[..., np.newaxis, np.newaxis])
+
+    return _mask_invalid(masked_sum(values, exceedance), values, day_mask, validity, compact)
+
+
+@instrument
+def r95p(prec: YEAR_MATRIX_OR_ARRAY,
+         thresholds: np.ndarray,
+         validity: Optional[VALIDITY] = None,
+         compact: bool = False) -> np.ndarray:
+    """Function for the precipitation of very wet days (wet days where rr greater then the 95th percentile
+    of the wet days of the reference period)
+
+    Args:
+        prec (YearMatrix, np.ndarray): year matrix of precipitation
+        thresholds (np.ndarray): 95th percentile of the wet days per station of shape (stations, ), e.g. of
+            climate_indices.calculate_batch_wet_day_percentile
+        validity (ValidityBitmap, np.ndarray): validity of the station-years, None for complete years only
+        compact (bool): return float32 sums
+
+    Returns:
+        np.ndarray: the precipitation of very wet days per station-year
+
+    """
+    return _wet_day_exceedance_sum(prec, thresholds, validity, compact)
+
+
+@instrument
+def r99p(prec: YEAR_MATRIX_OR_ARRAY,
+         thresholds: np.ndarray,
+         validity: Optional[VALIDITY] = None,
+         compact: bool = False) -> np.ndarray:
+    """Function for the precipitation of extremely wet days (wet days where rr greater then the 99th
+    percentile of the wet days of the reference period)
+
+    Args:
+        prec (YearMatrix, np.ndarray): year matrix of precipitation
+        thresholds (np.ndarray): 99th percentile of the wet days per station of shape (stations, ), e.g. of
+            climate_indices.calculate_batch_wet_day_percentile
+        validity (ValidityBitmap, np.ndarray): validity of the station-years, None for complete years only
+        compact (bool): return float32 sums
+
+    Returns:
+        np.ndarray: the precipitation of extremely wet days per station-year
+
+    """
+    return _wet_day_exceedance_sum(prec, thresholds, validity, compact)
+
+
+BATCH_INDICES = {
+    "number_of_fd": number_of_fd,
+    "number_of_sd": number_of_sd,
+    "number_of_id": number_of_id,
+    "number_of_tn": number_of_tn,
+    "sum_of_hdd": sum_of_hdd,
+    "rr10": rr10,
+    "rr20": rr20,
+    "consecutive_fd": consecutive_fd,
+    "consecutive_sd": consecutive_sd,
+    "consecutive_dd": consecutive_dd,
+    "growing_season_length": growing_season_length,
+    "rx1day": rx1day,
+    "rx5day": rx5day,
+    "prcptot": prcptot,
+    "sdii": sdii,
+}
+
+# Input variable of every batch index
+INDEX_VARIABLES = {
+    "number_of_fd": "tmin",
+    "number_of_sd": "tmax",
+    "number_of_id": "tmax",
+    "number_of_tn": "tmin",
+    "sum_of_hdd": "tmean",
+    "rr10": "prec",
+    "rr20": "prec",
+    "consecutive_fd": "tmin",
+    "consecutive_sd": "tmax",
+    "consecutive_dd": "prec",
+    "growing_season_length": "tmean",
+    "rx1day": "prec",
+    "rx5day": "prec",
+    "prcptot": "prec",
+    "sdii": "prec",
+}
+
+# Batch indices comparing the values with day of year percentile thresholds: index, variable and percentile
+# of the thresholds
+PERCENTILE_INDICES = {
+    "tx10p": (tx10p, "tmax", 0.1),
+    "tx90p": (tx90p, "tmax", 0.9),
+    "tn10p": (tn10p, "tmin", 0.1),
+    "tn90p": (tn90p, "tmin", 0.9),
+    "wsdi": (wsdi, "tmax", 0.9),
+    "csdi": (csdi, "tmin", 0.1),
+}
+
+# Batch indices comparing the precipitation with a percentile of the wet days per station: index and
+# percentile of the thresholds
+WET_DAY_PERCENTILE_INDICES = {
+    "r95p": (r95p, 0.95),
+    "r99p": (r99p, 0.99),
+}
+
+# Result type of every batch index in the compact mode
+INDEX_COMPACT_DTYPES = {
+    "number_of_fd": np.int16,
+    "number_of_sd": np.int16,
+    "number_of_id": np.int16,
+    "number_of_tn": np.int16,
+    "sum_of_hdd": np.float32,
+    "rr10": np.int16,
+    "rr20": np.int16,
+    "consecutive_fd": np.int16,
+    "consecutive_sd": np.int16,
+    "consecutive_dd": np.int16,
+    "growing_season_length": np.int16,
+    "tx10p": np.float32,
+    "tx90p": np.float32,
+    "tn10p": np.float32,
+    "tn90p": np.float32,
+    "wsdi": np.int16,
+    "csdi": np.int16,
+    "rx1day": np.float32,
+    "rx5day": np.float32,
+    "prcptot": np.float32,
+    "sdii": np.float32,
+    "r95p": np.float32,
+    "r99p": np.float32,
+}
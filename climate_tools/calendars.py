@@ -0,0 +1,249 @@
+""" Calendar index for the standard, noleap and 360-day calendars
+
+A CalendarIndex enumerates all days of a year range of one calendar and provides the mappings
+needed by the percentile based indices: day of year, leap days, the reference day of year the
+thresholds are given for (the 29th of February shares the threshold of the 28th of February) and
+the neighbours of every day in a centered window. The mappings are computed once per calendar and
+year range: get_calendar_index is memoized and the arrays of an index are read-only, so they can be
+shared between calls.
+
+Supported calendars (CF conventions): "standard" (also "gregorian", "proleptic_gregorian"),
+"noleap" (also "365_day") and "360_day".
+"""
+
+from typing import Sequence, Tuple
+from functools import lru_cache
+import numpy as np
+
+from climate_tools.profiling import phase
+
+CALENDAR_ALIASES = {
+    "standard": "standard",
+    "gregorian": "standard",
+    "proleptic_gregorian": "standard",
+    "noleap": "noleap",
+    "365_day": "noleap",
+    "360_day": "360_day",
+}
+
+MONTH_LENGTHS = {
+    "standard": np.array([31, 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31]),
+    "noleap": np.array([31, 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31]),
+    "360_day": np.full(12, 30),
+}
+
+MONTH_FEB = 2
+
+
+def normalize_calendar(calendar: str) -> str:
+    """Function for mapping a CF calendar name on one of "standard", "noleap" and "360_day"
+
+    Args:
+        calendar (str): calendar name
+
+    Returns:
+        str: normalized calendar name
+
+    """
+    try:
+        return CALENDAR_ALIASES[calendar.lower()]
+    except KeyError:
+        raise ValueError(f"Error: unsupported calendar '{calendar}', expecting one of {list(CALENDAR_ALIASES)}.")
+
+
+def _is_leap(years: np.ndarray) -> np.ndarray:
+    return (years % 4 == 0) & ((years % 100 != 0) | (years % 400 == 0))
+
+
+def _read_only(arr: np.ndarray) -> np.ndarray:
+    arr.flags.writeable = False
+    return arr
+
+
+def date_fields(dates: Sequence) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Function for splitting dates into year, month and day
+
+    Args:
+        dates (sequence): numpy datetime64 values (or anything convertible, e.g. a pandas.DatetimeIndex),
+            objects with year, month and day attributes (e.g. cftime dates) or "YYYY-MM-DD" strings
+
+    Returns:
+        tuple: arrays of the year, month and day
+
+    """
+    dates = np.asarray(dates)
+
+    if dates.dtype.kind == "O" and dates.size > 0 and hasattr(dates.flat[0], "month"):
+        return (np.fromiter((date.year for date in dates.flat), dtype=int, count=dates.size),
+                np.fromiter((date.month for date in dates.flat), dtype=int, count=dates.size),
+                np.fromiter((date.day for date in dates.flat), dtype=int, count=dates.size))
+
+    if dates.dtype.kind in "OUS":
+        # "YYYY-MM-DD", optionally followed by a time
+        fields = [str(date).split("-", 2) for date in dates.flat]
+        fields = np.array([(year, month, day[:2]) for year, month, day in fields], dtype=int).reshape(-1, 3)
+
+        return fields[:, 0], fields[:, 1], fields[:, 2]
+
+    dates = dates.astype("datetime64[D]").ravel()
+
+    years = dates.astype("datetime64[Y]")
+    months = dates.astype("datetime64[M]")
+
+    return (years.astype(int) + 1970,
+            (months - years).astype(int) + 1,
+            (dates - months).astype(int) + 1)
+
+
+class CalendarIndex:
+    """Enumeration of all days of the years first_year to last_year of a calendar
+
+    Args:
+        calendar (str): calendar name, see normalize_calendar
+        first_year (int): first year
+        last_year (int): last year
+
+    """
+
+    def __init__(self,
+                 calendar: str,
+                 first_year: int,
+                 last_year: int):
+        if last_year < first_year:
+            raise ValueError("Error: last_year is before first_year.")
+
+        self.calendar = normalize_calendar(calendar)
+        self.first_year = first_year
+        self.last_year = last_year
+
+        years = np.arange(first_year, last_year + 1)
+
+        # (years, 12) month lengths
+        month_lengths = np.tile(MONTH_LENGTHS[self.calendar], (years.size, 1))
+        if self.calendar == "standard":
+            month_lengths[_is_leap(years), MONTH_FEB - 1] += 1
+
+        self.days_per_year = _read_only(month_lengths.sum(axis=1))
+
+        # First position of every year and of every month within its year
+        self.year_start = _read_only(np.concatenate([[0], np.cumsum(self.days_per_year)[:-1]]))
+        self._month_start = np.concatenate([np.zeros((years.size, 1), dtype=int),
+                                            np.cumsum(month_lengths, axis=1)[:, :-1]], axis=1)
+        self._month_end = self._month_start + month_lengths
+
+        self.n_days = int(self.days_per_year.sum())
+
+        month_per_day = np.repeat(np.tile(np.arange(1, 13), years.size), month_lengths.ravel())
+        year_per_day = np.repeat(years, self.days_per_year)
+
+        position = np.arange(self.n_days)
+        year_offset = np.repeat(self.year_start, self.days_per_year)
+        day_of_year = position - year_offset + 1
+
+        self.year = _read_only(year_per_day)
+        self.month = _read_only(month_per_day)
+        self.day = _read_only(day_of_year - self._month_start[year_per_day - first_year, month_per_day - 1])
+        self.day_of_year = _read_only(day_of_year)
+
+        self.is_leap_day = _read_only((self.month == MONTH_FEB) & (self.day == 29))
+
+        # The 29th of February and all later days of a leap year are shifted onto the day before
+        leap_year_day = (self.days_per_year[year_per_day - first_year] == 366) & \
+            (self.day_of_year >= self._month_start[0, MONTH_FEB - 1] + 29)
+        self.reference_day_of_year = _read_only(self.day_of_year - leap_year_day)
+
+        self.n_reference_days = 360 if self.calendar == "360_day" else 365
+
+        self._window_neighbours = {}
+
+    def positions(self,
+                  year: np.ndarray,
+                  month: np.ndarray,
+                  day: np.ndarray) -> np.ndarray:
+        """Function for the positions of dates in the index
+
+        Args:
+            year (np.ndarray): years
+            month (np.ndarray): months
+            day (np.ndarray): days of the month
+
+        Returns:
+            np.ndarray: positions, -1 for dates outside the year range or not existing in the calendar
+
+        """
+        year = np.asarray(year)
+        month = np.asarray(month)
+        day = np.asarray(day)
+
+        year_index = year - self.first_year
+
+        inside = (year_index >= 0) & (year_index < self.days_per_year.size) & (month >= 1) & (month <= 12)
+
+        year_index = np.where(inside, year_index, 0)
+        month_index = np.where(inside, month - 1, 0)
+
+        month_start = self._month_start[year_index, month_index]
+        month_end = self._month_end[year_index, month_index]
+
+        inside &= (day >= 1) & (day <= month_end - month_start)
+
+        return np.where(inside, self.year_start[year_index] + month_start + day - 1, -1)
+
+    def date_positions(self,
+                       dates: Sequence) -> np.ndarray:
+        """Function for the positions of dates in the index, see date_fields for the supported dates
+
+        Args:
+            dates (sequence): dates
+
+        Returns:
+            np.ndarray: positions, -1 for dates outside the year range or not existing in the calendar
+
+        """
+        return self.positions(*date_fields(dates))
+
+    def window_neighbours(self,
+                          window: int) -> np.ndarray:
+        """Function for the positions of the days in a centered window of every day (the window of
+        day i holds the days i - window // 2 to i - window // 2 + window - 1, like a centered rolling
+        window of pandas)
+
+        Args:
+            window (int): length of the window in days
+
+        Returns:
+            np.ndarray: read-only positions of shape (n_days, window), -1 outside the year range
+
+        """
+        if window not in self._window_neighbours:
+            neighbours = np.arange(self.n_days)[:, np.newaxis] + (np.arange(window) - window // 2)
+            neighbours[(neighbours < 0) | (neighbours >= self.n_days)] = -1
+
+            self._window_neighbours[window] = _read_only(neighbours)
+
+        return self._window_neighbours[window]
+
+
+@lru_cache(maxsize=32)
+def _get_calendar_index(calendar: str,
+                        first_year: int,
+                        last_year: int) -> CalendarIndex:
+    with phase("calendar build"):
+        return CalendarIndex(calendar, first_year, last_year)
+
+
+def get_calendar_index(calendar: str,
+                       first_year: int,
+                       last_year: int) -> CalendarIndex:
+    """Function for the shared calendar index of a calendar and year range
+
+    Args:
+        calendar (str): calendar name, see normalize_calendar
+        first_year (int): first year
+        last_year (int): last year
+
+    Returns:
+        CalendarIndex: memoized calendar index
+
+    """
+    return _get_calendar_index(normalize_calendar(calendar), int(first_year), int(last_year))
@@ -0,0 +1,362 @@
+""" Command line runner computing annual climate indices for a directory of station files
+
+    python -m climate_tools STATION_DIRECTORY --indices number_of_fd rr10 --output indices.csv
+
+Every station file (.csv or .parquet, the file name without extension is the station label; files
+sharing a label are reported as errors) holds a date column and one column per variable (tmin,
+tmax, tmean, prec; names are matched case insensitive, other names can be mapped with --column).
+The stations are processed in batches on a pool of worker processes; every batch is turned into
+year matrices and reduced by the batch index kernels. The results of all stations are written into
+one table with the columns STATION, YEAR and one column per index (.csv or .parquet, chosen by the
+extension of --output; an output path without extension receives a Parquet dataset partitioned by
+index and decade).
+"""
+
+from typing import Dict, List, Optional, Sequence, Tuple
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import argparse
+import multiprocessing
+import os
+import sys
+import numpy as np
+import pandas as pd
+
+from climate_tools.batch_indices import BATCH_INDICES, INDEX_VARIABLES
+from climate_tools.year_matrix import YearMatrix
+from climate_tools.quality import validity_bitmap, MAX_MISSING_DAYS_MONTH, MAX_MISSING_DAYS_YEAR
+from climate_tools.profiling import instrument
+
+STATION_FILE_EXTENSIONS = [".csv", ".parquet"]
+
+DEFAULT_BATCH_SIZE = 64
+
+SIZE_UNITS = {"K": 1024, "M": 1024 ** 2, "G": 1024 ** 3, "T": 1024 ** 4}
+
+
+def parse_size(size: str) -> int:
+    """Function for parsing a memory size like "512M" or "4G" into bytes
+
+    Args:
+        size (str): number of bytes, optionally with one of the units K, M, G, T
+
+    Returns:
+        int: number of bytes
+
+    """
+    size = size.strip().upper().rstrip("B")
+
+    if size and size[-1] in SIZE_UNITS:
+        return int(float(size[:-1]) * SIZE_UNITS[size[-1]])
+
+    return int(size)
+
+
+def find_station_files(directory: str) -> List[str]:
+    """Function for listing the station files of a directory
+
+    Args:
+        directory (str): directory holding .csv and .parquet station files
+
+    Returns:
+        list: sorted paths of the station files
+
+    """
+    return sorted(os.path.join(directory, name) for name in os.listdir(directory)
+                  if os.path.splitext(name)[1].lower() in STATION_FILE_EXTENSIONS)
+
+
+@instrument
+def read_station_file(path: str,
+                      variables: Sequence[str],
+                      date_column: str = "DATE",
+                      columns: Optional[Dict[str, str]] = None) -> pd.DataFrame:
+    """Function for reading the requested variables of a station file
+
+    Args:
+        path (str): path of a .csv or .parquet station file
+        variables (list): variables to read, e.g. ["tmin", "prec"]
+        date_column (str): name of the date column
+        columns (dict): column name per variable, where it differs from the variable name
+
+    Returns:
+        pd.DataFrame: frame with the columns DATE and one column per variable
+
+    """
+    columns = columns or {}
+
+    if os.path.splitext(path)[1].lower() == ".parquet":
+        frame = pd.read_parquet(path)
+    else:
+        frame = pd.read_csv(path)
+
+    lookup = {column.lower(): column for column in frame.columns}
+
+    selection = {"DATE": lookup.get(date_column.lower())}
+    for variable in variables:
+        selection[variable] = columns.get(variable, lookup.get(variable.lower()))
+
+    missing = [name for name, column in selection.items() if column not in frame.columns]
+
+    if missing:
+        raise ValueError(f"Error: station file {path} has no column for {missing}.")
+
+    frame = frame[list(selection.values())]
+    frame.columns = list(selection)
+    frame["DATE"] = pd.to_datetime(frame["DATE"])
+
+    return frame
+
+
+def _station_label(path: str) -> str:
+    return os.path.splitext(os.path.basename(path))[0]
+
+
+def _duplicate_label_errors(paths: Sequence[str]) -> Dict[str, str]:
+    # Files with the same label (e.g. s1.csv and s1.parquet) would be merged into one station
+    paths_per_label = {}
+    for path in paths:
+        paths_per_label.setdefault(_station_label(path), []).append(path)
+
+    return {path: f"Error: station label '{label}' is shared by {sorted(label_paths)}."
+            for label, label_paths in paths_per_label.items() if len(label_paths) > 1
+            for path in label_paths}
+
+
+@instrument
+def compute_station_batch(paths: Sequence[str],
+                          indices: Sequence[str],
+                          date_column: str = "DATE",
+                          columns: Optional[Dict[str, str]] = None,
+                          etccdi_missing_rules: bool = False) -> Tuple[pd.DataFrame, Dict[str, str]]:
+    """Function for computing the indices of a batch of station files
+
+    Args:
+        paths (list): paths of the station files
+        indices (list): names of the batch indices
+        date_column (str): name of the date column
+        columns (dict): column name per variable, where it differs from the variable name
+        etccdi_missing_rules (bool): accept years with up to 3 missing days per month and 15 per year
+            (ETCCDI) instead of complete years only
+
+    Returns:
+        tuple: table with the columns STATION, YEAR and one column per index, error message per
+        station file that could not be read
+
+    """
+    variables = sorted({INDEX_VARIABLES[index] for index in indices})
+
+    frames = []
+    errors = {}
+
+    for path in paths:
+        try:
+            frame = read_station_file(path, variables, date_column, columns)
+        except Exception as error:
+            errors[path] = str(error)
+            continue
+
+        frame["STATION"] = _station_label(path)
+        frames.append(frame)
+
+    if not frames:
+        return pd.DataFrame(columns=["STATION", "YEAR"] + list(indices)), errors
+
+    frame = pd.concat(frames, ignore_index=True)
+
+    year_matrices = {variable: YearMatrix.from_frame(frame, value_column=variable, station_column="STATION")
+                     for variable in variables}
+
+    # All year matrices share stations and years, as they are built from the same frame
+    year_matrix = year_matrices[variables[0]]
+
+    result = pd.DataFrame({"STATION": np.repeat(year_matrix.stations, year_matrix.years.size),
+                           "YEAR": np.tile(year_matrix.years, year_matrix.stations.size)})
+
+    # Gaps are checked once per variable and shared by all indices
+    max_missing = (MAX_MISSING_DAYS_MONTH, MAX_MISSING_DAYS_YEAR) if etccdi_missing_rules else (0, 0)
+    validities = {variable: validity_bitmap(year_matrix, *max_missing)
+                  for variable, year_matrix in year_matrices.items()}
+
+    for index in indices:
+        variable = INDEX_VARIABLES[index]
+        result[index] = BATCH_INDICES[index](year_matrices[variable], validities[variable]).ravel()
+
+    return result, errors
+
+
+def _limit_memory(memory_limit: Optional[int]) -> None:
+    if memory_limit is None:
+        return
+
+    import resource
+
+    # RLIMIT_DATA caps the heap and private writable mappings, i.e. the memory actually allocated by NumPy
+    # and Arrow; RLIMIT_AS would also count address space that is only reserved
+    resource.setrlimit(resource.RLIMIT_DATA, (memory_limit, memory_limit))
+
+
+@instrument
+def run(paths: Sequence[str],
+        indices: Sequence[str],
+        workers: Optional[int] = None,
+        memory_limit: Optional[int] = None,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        date_column: str = "DATE",
+        columns: Optional[Dict[str, str]] = None,
+        progress: bool = True,
+        etccdi_missing_rules: bool = False) -> Tuple[pd.DataFrame, Dict[str, str]]:
+    """Function for computing the indices of many station files on a process pool
+
+    Args:
+        paths (list): paths of the station files
+        indices (list): names of the batch indices
+        workers (int): number of worker processes, None for one per CPU
+        memory_limit (int): limit of the data segment (heap and private memory mappings) of every worker
+            process in bytes (Unix only)
+        batch_size (int): number of station files handed to a worker at once
+        date_column (str): name of the date column
+        columns (dict): column name per variable, where it differs from the variable name
+        progress (bool): print the progress to stderr
+        etccdi_missing_rules (bool): accept years with up to 3 missing days per month and 15 per year
+            (ETCCDI) instead of complete years only
+
+    Returns:
+        tuple: consolidated table with the columns STATION, YEAR and one column per index, error
+        message per station file that failed or shares its station label with another file
+
+    """
+    for index in indices:
+        if index not in BATCH_INDICES:
+            raise ValueError(f"Error: unknown index '{index}'.")
+
+    errors = _duplicate_label_errors(paths)
+    paths = [path for path in paths if path not in errors]
+
+    batches = [paths[start:start + batch_size] for start in range(0, len(paths), batch_size)]
+
+    results = []
+    done = 0
+
+    # Forking a process that runs the thread pool of the Numba kernels (e.g. TBB) leaves it hanging at
+    # exit, the workers are spawned instead
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"),
+                             initializer=_limit_memory, initargs=(memory_limit, )) as executor:
+        futures = {executor.submit(compute_station_batch, batch, indices, date_column, columns,
+                                   etccdi_missing_rules): batch
+                   for batch in batches}
+
+        for future in as_completed(futures):
+            batch = futures[future]
+
+            try:
+                result, batch_errors = future.result()
+            except Exception as error:
+                batch_errors = {path: f"{type(error).__name__}: {error}" for path in batch}
+            else:
+                results.append(result)
+
+            errors.update(batch_errors)
+            done += len(batch)
+
+            if progress:
+                print(f"\r{done}/{len(paths)} stations, {len(errors)} failed", end="", file=sys.stderr, flush=True)
+
+    if progress:
+        print(file=sys.stderr)
+
+    if results:
+        table = pd.concat(results, ignore_index=True).sort_values(["STATION", "YEAR"], ignore_index=True)
+    else:
+        table = pd.DataFrame(columns=["STATION", "YEAR"] + list(indices))
+
+    return table, errors
+
+
+def write_table(table: pd.DataFrame,
+                path: str) -> None:
+    """Function for writing the results table as .csv, .parquet or, for a path without extension,
+    as Parquet dataset partitioned by index and decade (see arrow_io.write_index_table)
+
+    Args:
+        table (pd.DataFrame): results table
+        path (str): output path, the extension selects the format
+
+    """
+    extension = os.path.splitext(path.rstrip(os.sep))[1].lower()
+
+    if not extension:
+        from climate_tools.arrow_io import write_index_table
+
+        write_index_table(table, path)
+    elif extension == ".parquet":
+        table.to_parquet(path, index=False)
+    else:
+        table.to_csv(path, index=False)
+
+
+def _parse_columns(mappings: Sequence[str]) -> Dict[str, str]:
+    columns = {}
+
+    for mapping in mappings:
+        variable, separator, column = mapping.partition("=")
+
+        if not separator:
+            raise argparse.ArgumentTypeError(f"Error: expecting VARIABLE=COLUMN, got '{mapping}'.")
+
+        columns[variable.lower()] = column
+
+    return columns
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="climate-tools",
+                                     description="Compute annual climate indices for a directory of station files.")
+    parser.add_argument("directory", help="directory holding .csv/.parquet station files")
+    parser.add_argument("--indices", nargs="+", required=True, choices=sorted(BATCH_INDICES), metavar="INDEX",
+                        help=f"indices to compute, any of {', '.join(sorted(BATCH_INDICES))}")
+    parser.add_argument("--output", required=True, help="output table (.csv or .parquet), or directory of a partitioned Parquet dataset")
+    parser.add_argument("--workers", type=int, default=None, help="number of worker processes (default: CPUs)")
+    parser.add_argument("--memory-limit", type=parse_size, default=None,
+                        help="data segment limit (heap and private memory mappings) per worker process, e.g. 2G (Unix only)")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE,
+                        help="station files per worker task")
+    parser.add_argument("--date-column", default="DATE", help="name of the date column")
+    parser.add_argument("--column", action="append", default=[], metavar="VARIABLE=COLUMN",
+                        help="column of a variable, e.g. tmin=TN (repeatable)")
+    parser.add_argument("--etccdi-missing-rules", action="store_true",
+                        help="accept years with at most 3 missing days per month and 15 per year")
+    parser.add_argument("--quiet", action="store_true", help="do not print the progress")
+
+    return parser
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = build_parser()
+    args = parser.parse_args(argv)
+
+    try:
+        columns = _parse_columns(args.column)
+    except argparse.ArgumentTypeError as error:
+        parser.error(str(error))
+
+    paths = find_station_files(args.directory)
+
+    if not paths:
+        parser.error(f"no station files found in {args.directory}")
+
+    table, errors = run(paths,
+                        args.indices,
+                        workers=args.workers,
+                        memory_limit=args.memory_limit,
+                        batch_size=args.batch_size,
+                        date_column=args.date_column,
+                        columns=columns,
+                        progress=not args.quiet,
+                        etccdi_missing_rules=args.etccdi_missing_rules)
+
+    write_table(table, args.output)
+
+    for path, error in sorted(errors.items()):
+        print(f"{path}: {error}", file=sys.stderr)
+
+    return 1 if errors else 0
@@ -3,12 +3,22 @@ Link 1: http://etccdi.pacificclimate.org/list_27_indices.shtml
 Link 2: http://etccdi.pacificclimate.org/docs/ETCCDMIndicesComparison1.pdf
 """
 
-from typing import Tuple, List, Union, Callable
+from __future__ import annotations
+
+from typing import Tuple, List, Union, Callable, Sequence, Optional, Dict
 import operator
-from itertools import groupby
-import calendar
 import numpy as np
-import pandas as pd
+
+from climate_tools._lazy import LazyModule
+from climate_tools.run_length import rle_2d, longest_run, first_spell_start
+from climate_tools import spell_kernels
+from climate_tools.calendars import CalendarIndex, get_calendar_index
+from climate_tools.year_matrix import YearMatrix
+from climate_tools.batch_indices import COMPACT_MISSING, THRESHOLD_SLOTS, WET_DAY_PRECIPITATION
+from climate_tools.profiling import instrument, phase
+
+# pandas is imported on first use
+pd = LazyModule("pandas")
 # from pandas import Series
 # from pandas.core.groupby import DataFrameGroupBy, SeriesGroupBy
 
@@ -17,6 +27,7 @@ import pandas as pd
 #                                  pd.core.groupby.SeriesGroupBy]
 
 DAY_OF_YEAR_29_FEB = 60
+LEAP_YEAR = 2000
 
 
 def is_valid_year_length(arr: pd.Series) -> bool:
@@ -36,7 +47,8 @@ def is_valid_year_length(arr: pd.Series) -> bool:
     return False
 
 
-def rle(arr: pd.Series) -> Tuple[List[float], List[int]]:
+@instrument
+def rle(arr: pd.Series) -> Tuple[np.ndarray, np.ndarray]:
     """Function for runlength encoding that returns a tuple with the values and their individual runlength
     according to the input array. E.g. an array [0, 0, 1, 1] would return a tuple ([0, 1], [2, 2])
 
@@ -44,17 +56,15 @@ def rle(arr: pd.Series) -> Tuple[List[float], List[int]]:
         arr (pandas.Series): value array expected from return of pandas DataFrame groupby
 
     Returns:
-        tuple: list of values and list of their respective runlength
+        tuple: array of values and array of their respective runlength
 
     """
-    values, lengths = [], []
-    for k, g in groupby(arr):
-        values.append(k)
-        lengths.append(len(list(g)))
+    _, _, lengths, values = rle_2d(np.asarray(arr))
 
     return values, lengths
 
 
+@instrument
 def number_of(arr: pd.Series,
               num: float,
               op: Callable[[pd.Series, float], List[bool]]) -> Union[float, int]:
@@ -71,7 +81,7 @@ def number_of(arr: pd.Series,
     """
     assert isinstance(arr, pd.Series)
     assert isinstance(num, float)
-    assert isinstance(op, (operator.lt, operator.le, operator.eq, operator.ne, operator.ge, operator.gt))
+    assert op in (operator.lt, operator.le, operator.eq, operator.ne, operator.ge, operator.gt)
 
     if not is_valid_year_length(arr):
         return np.nan
@@ -79,6 +89,7 @@ def number_of(arr: pd.Series,
     return int(np.sum(op(arr, num)))
 
 
+@instrument
 def number_of_fd(tmin: pd.Series) -> Union[float, int]:
     """Function for count of frost days (days where minimum temperature lower then 0°C)
 
@@ -98,6 +109,7 @@ def number_of_fd(tmin: pd.Series) -> Union[float, int]:
     return number_of(tmin, num, op)
 
 
+@instrument
 def number_of_sd(tmax: pd.Series) -> Union[float, int]:
     """Function for count of summer days (days where maximum temperature greater then 25°C)
 
@@ -117,6 +129,7 @@ def number_of_sd(tmax: pd.Series) -> Union[float, int]:
     return number_of(tmax, num, op)
 
 
+@instrument
 def consecutive_fd(tmin: pd.Series) -> Union[float, int]:
     """Function for determining greatest number of consecutive frost days (tmin < 0°C)
 
@@ -135,11 +148,10 @@ def consecutive_fd(tmin: pd.Series) -> Union[float, int]:
 
     num = 0.0
 
-    values, lengths = rle(operator.lt(tmin, num))
-
-    return int(np.max(np.array(lengths)[np.where(values)]))
+    return int(spell_kernels.longest_spell(tmin.to_numpy(), num, below=True)[0])
 
 
+@instrument
 def consecutive_sd(tmax: pd.Series) -> Union[float, int]:
     """Function for determining greatest number of consecutive summer days (tmax > 25°C)
 
@@ -158,11 +170,10 @@ def consecutive_sd(tmax: pd.Series) -> Union[float, int]:
 
     num = 25.0
 
-    values, lengths = rle(operator.gt(tmax, num))
-
-    return int(np.max(np.array(lengths)[np.where(values)]))
+    return int(spell_kernels.longest_spell(tmax.to_numpy(), num, below=False)[0])
 
 
+@instrument
 def sum_of_hdd(tmean: pd.Series) -> Union[float, int]:
     """Function for determining heating degree days (sum of [17°C - tmean] for all days where tmean < 17°C)
 
@@ -184,6 +195,7 @@ def sum_of_hdd(tmean: pd.Series) -> Union[float, int]:
     return np.sum(num - tmean[operator.lt(tmean, num)]).item()
 
 
+@instrument
 def number_of_id(tmax: pd.Series) -> Union[float, int]:
     """Function for count of icing days (days where maximum temperature smaller then 0°C)
 
@@ -203,6 +215,7 @@ def number_of_id(tmax: pd.Series) -> Union[float, int]:
     return number_of(tmax, num, op)
 
 
+@instrument
 def number_of_tn(tmin: pd.Series) -> Union[float, int]:
     """Function for count of tropical nights (days where minimum temperature greater then 20°C)
 
@@ -222,29 +235,187 @@ def number_of_tn(tmin: pd.Series) -> Union[float, int]:
     return number_of(tmin, num, op)
 
 
-def calculate_percentile_threshold(timeseries: pd.DataFrame,
-                                   percentile: float,
-                                   reference_period: Tuple[int, int],
-                                   window: int,
-                                   min_percentage: float) -> pd.Series:
-    """Function for count of tropical nights (days where minimum temperature greater then 20°C)
+def _reference_calendar_index(reference_period: Tuple[int, int],
+                              window: int,
+                              calendar: str) -> Tuple[CalendarIndex, int]:
+    """Function for the calendar index of the reference period, extended by whole years so the window of
+    every day of the reference period lies inside the index
 
     Args:
-        timeseries (pd.DataFrame) -
-        percentile (float) -
-        reference_period (tuple) -
-        window (int) -
-        min_percentage (float) -
+        reference_period (tuple): first and last year of the reference period
+        window (int): length of the centered rolling mean in days
+        calendar (str): calendar of the dates, see calendars.normalize_calendar
 
     Returns:
-        np.nan or number: the count of icing days
+        tuple: calendar index and the number of years it is extended by on both sides
 
     """
+    padding = window // 2 // 360 + 1
 
-    if not isinstance(timeseries, pd.DataFrame):
+    return get_calendar_index(calendar, reference_period[0] - padding, reference_period[1] + padding), padding
+
+
+def _percentile_samples(values: np.ndarray,
+                        calendar_index: CalendarIndex,
+                        padding: int,
+                        reference_period: Tuple[int, int],
+                        window: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Function for reshaping the smoothed reference period of daily values on a calendar index into a
+    (day of year x sample) matrix
+
+    Args:
+        values (np.ndarray): values of shape (..., n_days) on the days of the calendar index, NaN where missing
+        calendar_index (CalendarIndex): calendar index of the reference period, see _reference_calendar_index
+        padding (int): number of years the calendar index extends the reference period by on both sides
+        reference_period (tuple): first and last year of the reference period
+        window (int): length of the centered rolling mean in days
+
+    Returns:
+        tuple: matrix of shape (..., 365, samples) (360 for the 360-day calendar) padded with NaN, the count of
+            samples per day of year and the year index (-1 for padding) of every sample
+
+    """
+    reference_start = calendar_index.year_start[padding]
+    reference_end = calendar_index.year_start[-padding]
+
+    with phase("rolling mean"):
+        # Window of day i starts at day i - window // 2 (see CalendarIndex.window_neighbours)
+        windows = np.lib.stride_tricks.sliding_window_view(values, window, axis=-1)
+        smoothed = windows[..., reference_start - window // 2:reference_end - window // 2, :].mean(axis=-1)
+
+    with phase("sample matrix"):
+        day_of_year = calendar_index.reference_day_of_year[reference_start:reference_end] - 1
+        sample_year_of_day = calendar_index.year[reference_start:reference_end] - reference_period[0]
+
+        order = np.argsort(day_of_year, kind="stable")
+        sample_count = np.bincount(day_of_year, minlength=calendar_index.n_reference_days)
+        sample_position = np.arange(day_of_year.size) - np.repeat(np.cumsum(sample_count) - sample_count,
+                                                                  sample_count)
+
+        samples = np.full(values.shape[:-1] + (sample_count.size, sample_count.max()), np.nan)
+        samples[..., day_of_year[order], sample_position] = smoothed[..., order]
+
+        sample_year = np.full((sample_count.size, sample_count.max()), -1)
+        sample_year[day_of_year[order], sample_position] = sample_year_of_day[order]
+
+    return samples, sample_count, sample_year
+
+
+def _percentile_sample_matrix(timeseries: pd.DataFrame,
+                              reference_period: Tuple[int, int],
+                              window: int,
+                              calendar: str = "standard") -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Function for reshaping the smoothed reference period into a (day of year x sample) matrix
+
+    Args:
+        timeseries (pd.DataFrame): frame with dates in the first and values in the second column
+        reference_period (tuple): first and last year of the reference period
+        window (int): length of the centered rolling mean in days
+        calendar (str): calendar of the dates, see calendars.normalize_calendar
+
+    Returns:
+        tuple: matrix of shape (365, samples) (360 for the 360-day calendar) padded with NaN, the count of
+            samples per day of year and the year index (-1 for padding) of every sample
+
+    """
+    calendar_index, padding = _reference_calendar_index(reference_period, window, calendar)
+
+    positions = calendar_index.date_positions(timeseries.iloc[:, 0].to_numpy())
+    inside = positions >= 0
+
+    # Reversed assignment keeps the first value of duplicated dates
+    values = np.full(calendar_index.n_days, np.nan)
+    values[positions[inside][::-1]] = timeseries.iloc[:, 1].to_numpy(dtype=float)[inside][::-1]
+
+    return _percentile_samples(values, calendar_index, padding, reference_period, window)
+
+
+def _quantiles_from_sorted(sorted_samples: np.ndarray,
+                           n_valid: np.ndarray,
+                           percentiles: np.ndarray) -> np.ndarray:
+    """Function for linearly interpolated quantiles of samples sorted along the last axis with NaN at the end
+
+    Args:
+        sorted_samples (np.ndarray): sorted samples of shape (..., samples)
+        n_valid (np.ndarray): count of valid samples of shape (...)
+        percentiles (np.ndarray): percentiles between 0 and 1
+
+    Returns:
+        np.ndarray: quantiles of shape (..., percentiles), NaN where no sample is valid
+
+    """
+    n_valid = np.asarray(n_valid)[..., np.newaxis]
+
+    rank = (n_valid - 1) * percentiles
+    lower = np.clip(np.floor(rank).astype(np.intp), 0, None)
+    upper = np.clip(np.minimum(lower + 1, n_valid - 1), 0, None)
+
+    lower_values = np.take_along_axis(sorted_samples, lower, axis=-1)
+    upper_values = np.take_along_axis(sorted_samples, upper, axis=-1)
+
+    quantiles = lower_values + (rank - lower) * (upper_values - lower_values)
+
+    return np.where(n_valid > 0, quantiles, np.nan)
+
+
+def _thresholds_from_samples(samples: np.ndarray,
+                             sample_count: np.ndarray,
+                             percentiles: np.ndarray,
+                             min_percentage: float) -> np.ndarray:
+    """Function for the percentile thresholds of a (..., day of year x sample) matrix
+
+    Args:
+        samples (np.ndarray): samples of shape (..., days, samples) padded with NaN
+        sample_count (np.ndarray): count of samples per day of year
+        percentiles (np.ndarray): percentiles between 0 and 1
+        min_percentage (float): minimal share of valid samples per day of year, else the threshold is NaN
+
+    Returns:
+        np.ndarray: thresholds of shape (..., days, percentiles)
+
+    """
+    with phase("quantiles"):
+        n_valid = np.count_nonzero(~np.isnan(samples), axis=-1)
+
+        thresholds = _quantiles_from_sorted(np.sort(samples, axis=-1), n_valid, percentiles)
+        thresholds[(n_valid / sample_count) < min_percentage] = np.nan
+
+    return thresholds
+
+
+def _threshold_dtype(timeseries: pd.DataFrame) -> np.dtype:
+    """Function for the type of the thresholds: float32 for float32 values, else float64. The quantiles are
+    computed in float64 in both cases, so float32 thresholds equal the rounded float64 thresholds"""
+    if timeseries.iloc[:, 1].dtype == np.float32:
+        return np.dtype(np.float32)
+
+    return np.dtype(np.float64)
+
+
+def _check_percentile_arguments(percentile: Union[float, Sequence[float]],
+                                reference_period: Tuple[int, int],
+                                window: int,
+                                min_percentage: float) -> None:
+    _check_reference_arguments(percentile, reference_period)
+
+    if not isinstance(window, int):
+        raise TypeError()
+    if not window > 0:
+        raise ValueError()
+    if not isinstance(min_percentage, float):
         raise TypeError()
-    if not isinstance(percentile, float):
+    if not 0 <= min_percentage <= 1:
+        raise ValueError()
+
+
+def _check_reference_arguments(percentile: Union[float, Sequence[float]],
+                               reference_period: Tuple[int, int]) -> None:
+    if not isinstance(percentile, (float, list, tuple)):
         raise TypeError()
+    if not all(isinstance(p, float) for p in np.atleast_1d(percentile).tolist()):
+        raise TypeError()
+    if not all(0 <= p <= 1 for p in np.atleast_1d(percentile).tolist()):
+        raise ValueError()
     if not isinstance(reference_period, tuple):
         raise TypeError()
     if not len(reference_period) == 2:
@@ -253,61 +424,338 @@ def calculate_percentile_threshold(timeseries: pd.DataFrame,
         raise TypeError()
     if not (reference_period[1] - reference_period[0] + 1) == 30:
         raise ValueError()
-    if not isinstance(window, int):
+
+
+@instrument
+def calculate_percentile_threshold(timeseries: pd.DataFrame,
+                                   percentile: Union[float, Sequence[float]],
+                                   reference_period: Tuple[int, int],
+                                   window: int,
+                                   min_percentage: float,
+                                   calendar: str = "standard") -> Union[pd.Series, pd.DataFrame]:
+    """Function for calculating the day of year percentile thresholds of a reference period. The values are
+    smoothed with a centered rolling mean, the 29th of February is merged with the 28th of February.
+
+    Args:
+        timeseries (pd.DataFrame) - frame with dates in the first and values in the second column
+        percentile (float, list) - one percentile or a list of percentiles between 0 and 1
+        reference_period (tuple) - first and last year of the 30 year reference period
+        window (int) - length of the rolling mean in days
+        min_percentage (float) - minimal share of valid values per day of year, else the threshold is NaN
+        calendar (str) - calendar of the dates: "standard", "noleap" or "360_day" (see calendars)
+
+    Returns:
+        pd.Series or pd.DataFrame: the 365 thresholds (360 for the 360-day calendar), one column per
+            percentile if a list is given, float32 for float32 values
+
+    """
+    if not isinstance(timeseries, pd.DataFrame):
         raise TypeError()
-    if not window > 0:
-        raise ValueError()
-    if not isinstance(min_percentage, float):
+
+    _check_percentile_arguments(percentile, reference_period, window, min_percentage)
+
+    percentiles = np.atleast_1d(np.asarray(percentile, dtype=float))
+
+    samples, sample_count, _ = _percentile_sample_matrix(timeseries, reference_period, window, calendar)
+
+    thresholds = _thresholds_from_samples(samples, sample_count, percentiles, min_percentage)
+
+    thresholds = thresholds.astype(_threshold_dtype(timeseries), copy=False)
+
+    if isinstance(percentile, float):
+        return pd.Series(thresholds[:, 0])
+
+    return pd.DataFrame(thresholds, columns=percentiles)
+
+
+@instrument
+def calculate_batch_percentile_threshold(data: YearMatrix,
+                                         percentile: Union[float, Sequence[float]],
+                                         reference_period: Tuple[int, int],
+                                         window: int,
+                                         min_percentage: float) -> np.ndarray:
+    """Function for calculating the day of year percentile thresholds of every station of a year matrix at
+    once, same thresholds as calculate_percentile_threshold of the single stations
+
+    Args:
+        data (YearMatrix) - year matrix of daily values
+        percentile (float, list) - one percentile or a list of percentiles between 0 and 1
+        reference_period (tuple) - first and last year of the 30 year reference period
+        window (int) - length of the rolling mean in days
+        min_percentage (float) - minimal share of valid values per day of year, else the threshold is NaN
+
+    Returns:
+        np.ndarray: thresholds of shape (stations, 365), (stations, 365, percentiles) if a list is given,
+            float32 for float32 year matrices
+
+    """
+    if not isinstance(data, YearMatrix):
+        raise TypeError("Error: expecting YearMatrix as data.")
+
+    _check_percentile_arguments(percentile, reference_period, window, min_percentage)
+
+    percentiles = np.atleast_1d(np.asarray(percentile, dtype=float))
+
+    calendar_index, padding = _reference_calendar_index(reference_period, window, "standard")
+
+    # Slots of the years of the year matrix inside the calendar index, in the order of the index
+    year_index = data.years - calendar_index.first_year
+    inside = (year_index >= 0) & (year_index < calendar_index.days_per_year.size)
+
+    day_mask = data.day_mask[inside]
+    positions = calendar_index.year_start[year_index[inside]][:, np.newaxis] + np.arange(day_mask.shape[1])
+
+    values = np.full((data.stations.size, calendar_index.n_days), np.nan)
+    values[:, positions[day_mask]] = data.values[:, inside][:, day_mask]
+
+    samples, sample_count, _ = _percentile_samples(values, calendar_index, padding, reference_period, window)
+
+    thresholds = _thresholds_from_samples(samples, sample_count, percentiles, min_percentage)
+
+    thresholds = thresholds.astype(np.float32 if data.values.dtype == np.float32 else np.float64, copy=False)
+
+    if isinstance(percentile, float):
+        return thresholds[..., 0]
+
+    return thresholds
+
+
+@instrument
+def calculate_batch_wet_day_percentile(data: YearMatrix,
+                                       percentile: Union[float, Sequence[float]],
+                                       reference_period: Tuple[int, int]) -> np.ndarray:
+    """Function for calculating the percentiles of the wet day precipitation (rr greater equal 1mm) of the
+    reference period of every station of a year matrix at once, e.g. the thresholds of R95p and R99p
+
+    Args:
+        data (YearMatrix) - year matrix of precipitation
+        percentile (float, list) - one percentile or a list of percentiles between 0 and 1
+        reference_period (tuple) - first and last year of the 30 year reference period
+
+    Returns:
+        np.ndarray: thresholds of shape (stations, ), (stations, percentiles) if a list is given, NaN for
+            stations without wet days in the reference period, float32 for float32 year matrices
+
+    """
+    if not isinstance(data, YearMatrix):
+        raise TypeError("Error: expecting YearMatrix as data.")
+
+    _check_reference_arguments(percentile, reference_period)
+
+    percentiles = np.atleast_1d(np.asarray(percentile, dtype=float))
+
+    in_reference = (data.years >= reference_period[0]) & (data.years <= reference_period[1])
+
+    values = data.values[:, in_reference].reshape(data.stations.size, -1)
+
+    # Dry and missing days are sorted to the end
+    wet_days = values >= WET_DAY_PRECIPITATION
+    samples = np.where(wet_days, values, np.nan).astype(np.float64, copy=False)
+
+    thresholds = _quantiles_from_sorted(np.sort(samples, axis=-1), np.count_nonzero(wet_days, axis=-1), percentiles)
+
+    thresholds = thresholds.astype(np.float32 if data.values.dtype == np.float32 else np.float64, copy=False)
+
+    if isinstance(percentile, float):
+        return thresholds[..., 0]
+
+    return thresholds
+
+
+def _bootstrap_year_quantiles(sorted_samples: np.ndarray,
+                              n_valid: np.ndarray,
+                              n_samples: np.ndarray,
+                              year_ranks: np.ndarray,
+                              year_counts: np.ndarray,
+                              year: int,
+                              replacement_years: np.ndarray,
+                              percentiles: np.ndarray,
+                              min_percentage: float) -> np.ndarray:
+    """Function for the thresholds of all replicates of one out-of-base year. In every replicate the
+    samples of the year are replaced by the samples of another year of the reference period; the
+    replicate order statistics are read from the shared sorted sample matrix by index arithmetic.
+
+    Args:
+        sorted_samples (np.ndarray): samples of shape (365, samples) sorted with NaN at the end
+        n_valid (np.ndarray): count of valid samples per day of year
+        n_samples (np.ndarray): count of samples per day of year
+        year_ranks (np.ndarray): ranks of the valid samples of shape (years, 365, 2), sorted_samples.shape[1]
+            where the year has no (valid) sample
+        year_counts (np.ndarray): count of samples of shape (years, 365)
+        year (int): index of the out-of-base year
+        replacement_years (np.ndarray): indexes of the years replacing it, one per replicate
+        percentiles (np.ndarray): percentiles between 0 and 1
+        min_percentage (float): minimal share of valid values per day of year
+
+    Returns:
+        np.ndarray: thresholds of shape (replicates, 365, percentiles)
+
+    """
+    no_rank = sorted_samples.shape[1]
+
+    # Shapes (replicates, 365, 2), both sorted ascending with no_rank at the end
+    removed = year_ranks[year][np.newaxis, :, :]
+    added = year_ranks[replacement_years]
+
+    n_new = (n_valid - np.count_nonzero(removed < no_rank, axis=-1) +
+             np.count_nonzero(added < no_rank, axis=-1))[..., np.newaxis]
+
+    # Positions of the added samples after the removal and after inserting the first one
+    insert_positions = added - np.sum(removed[..., np.newaxis, :] < added[..., np.newaxis], axis=-1)
+    insert_positions[..., 1] += 1
+    insert_positions[added >= no_rank] = np.iinfo(np.intp).max
+
+    def rank_to_index(rank):
+        index = rank - np.sum(insert_positions[..., np.newaxis, :] < rank[..., np.newaxis], axis=-1)
+        for position in (0, 1):
+            index += index >= removed[..., np.newaxis, position]
+        for position in (0, 1):
+            index = np.where(rank == insert_positions[..., np.newaxis, position],
+                             added[..., np.newaxis, position], index)
+        return np.clip(index, 0, no_rank - 1)
+
+    rank = (n_new - 1) * percentiles
+    lower = np.clip(np.floor(rank).astype(np.intp), 0, None)
+    upper = np.clip(np.minimum(lower + 1, n_new - 1), 0, None)
+
+    day_index = np.arange(sorted_samples.shape[0])[np.newaxis, :, np.newaxis]
+    lower_values = sorted_samples[day_index, rank_to_index(lower)]
+    upper_values = sorted_samples[day_index, rank_to_index(upper)]
+
+    thresholds = lower_values + (rank - lower) * (upper_values - lower_values)
+
+    n_samples_new = (n_samples - year_counts[year] + year_counts[replacement_years])[..., np.newaxis]
+
+    return np.where((n_new > 0) & (n_new / n_samples_new >= min_percentage), thresholds, np.nan)
+
+
+def _bootstrap_worker(arguments: tuple) -> List[np.ndarray]:
+    (sorted_samples, n_valid, n_samples, year_ranks, year_counts,
+     years, replacement_years, percentiles, min_percentage) = arguments
+
+    return [_bootstrap_year_quantiles(sorted_samples, n_valid, n_samples, year_ranks, year_counts,
+                                      year, replacements, percentiles, min_percentage)
+            for year, replacements in zip(years, replacement_years)]
+
+
+@instrument
+def calculate_bootstrap_percentile_threshold(timeseries: pd.DataFrame,
+                                             percentile: Union[float, Sequence[float]],
+                                             reference_period: Tuple[int, int],
+                                             window: int,
+                                             min_percentage: float,
+                                             n_replicates: Optional[int] = None,
+                                             seed: int = 0,
+                                             workers: int = 1,
+                                             calendar: str = "standard") -> Dict[int, np.ndarray]:
+    """Function for the bootstrapped percentile thresholds of every year of the reference period as required
+    by ETCCDI for exceedance indices evaluated inside the base period. For every (out-of-base) year, the year is
+    left out and replaced by one of the other years of the reference period; the index of the year is then
+    the average over the indices of all replicates.
+
+    Args:
+        timeseries (pd.DataFrame) - frame with dates in the first and values in the second column
+        percentile (float, list) - one percentile or a list of percentiles between 0 and 1
+        reference_period (tuple) - first and last year of the 30 year reference period
+        window (int) - length of the rolling mean in days
+        min_percentage (float) - minimal share of valid values per day of year, else the threshold is NaN
+        n_replicates (int) - number of randomly drawn replacement years per year, None for all 29 other years
+        seed (int) - seed of the random draws, each year gets its own stream so results don't depend on workers
+        workers (int) - number of processes the years are distributed on
+        calendar (str) - calendar of the dates: "standard", "noleap" or "360_day" (see calendars)
+
+    Returns:
+        dict: thresholds per year of shape (replicates, 365), (replicates, 365, percentiles) if a list is given
+            (360 days for the 360-day calendar), float32 for float32 values
+
+    """
+    if not isinstance(timeseries, pd.DataFrame):
         raise TypeError()
-    if not 0 <= min_percentage <= 1:
+
+    _check_percentile_arguments(percentile, reference_period, window, min_percentage)
+
+    if not isinstance(workers, int):
+        raise TypeError()
+    if not workers > 0:
         raise ValueError()
 
-    timeseries = timeseries.copy()
-    timeseries.columns = ["DATE", "VALUES"]
+    percentiles = np.atleast_1d(np.asarray(percentile, dtype=float))
 
-    start_date = pd.to_datetime(f"{reference_period[0]}-01-01")
-    end_date = pd.to_datetime(f"{reference_period[1]}-12-31")
+    samples, n_samples, sample_year = _percentile_sample_matrix(timeseries, reference_period, window, calendar)
 
-    date_operations = pd.DataFrame({"DATE": pd.date_range(start_date, end_date)})
-    date_operations["LEAPYEAR"] = date_operations["DATE"].dt.year.apply(calendar.isleap)
-    date_operations["DAYOFYEAR"] = date_operations["DATE"].dt.dayofyear
+    n_years = reference_period[1] - reference_period[0] + 1
 
-    date_operations.loc[date_operations["LEAPYEAR"] &
-                        (date_operations["DAYOFYEAR"] >= DAY_OF_YEAR_29_FEB), "DAYOFYEAR"] -= 1
+    if n_replicates is not None and not 0 < n_replicates <= n_years - 1:
+        raise ValueError()
 
-    daterange_extended = pd.date_range(start_date - pd.Timedelta(days=int(window / 2)),
-                                       end_date + pd.Timedelta(days=int(window / 2)))
+    order = np.argsort(samples, axis=1)
+    sorted_samples = np.take_along_axis(samples, order, axis=1)
+    n_valid = np.count_nonzero(~np.isnan(samples), axis=1)
 
-    timeseries = pd.merge(pd.DataFrame({"DATE": daterange_extended}),
-                          timeseries)
+    ranks = np.empty_like(order)
+    np.put_along_axis(ranks, order, np.arange(samples.shape[1])[np.newaxis, :], axis=1)
+    ranks[np.isnan(samples)] = samples.shape[1]
 
-    timeseries.iloc[:, 1] = timeseries.iloc[:, 1].rolling(window, center=True).mean()
+    # Samples of one year and day of year are adjacent, the second one only exists for the 29th of February
+    day_index, sample_index = np.nonzero(sample_year >= 0)
+    slot = np.zeros(day_index.size, dtype=np.intp)
+    slot[1:] = (day_index[1:] == day_index[:-1]) & (sample_year[day_index[1:], sample_index[1:]] ==
+                                                   sample_year[day_index[:-1], sample_index[:-1]])
 
-    days_of_year = range(1, 366)
+    year_ranks = np.full((n_years, samples.shape[0], 2), samples.shape[1])
+    year_ranks[sample_year[day_index, sample_index], day_index, slot] = ranks[day_index, sample_index]
+    year_ranks.sort(axis=-1)
 
-    thresholds = []
-    for day_of_year in days_of_year:
-        selection_of_timeseries = timeseries.loc[date_operations["DAYOFYEAR"].isin([day_of_year]), "VALUES"]
+    year_counts = np.zeros((n_years, samples.shape[0]), dtype=np.intp)
+    np.add.at(year_counts, (sample_year[day_index, sample_index], day_index), 1)
 
-        percentage_of_values = selection_of_timeseries.agg(lambda x: x.notna().sum() / x.size).item()
+    seeds = np.random.SeedSequence(seed).spawn(n_years)
 
-        if percentage_of_values < min_percentage:
-            thresholds.append(np.nan)
-            continue
+    replacement_years = []
+    for year in range(n_years):
+        other_years = np.delete(np.arange(n_years), year)
+        if n_replicates is not None:
+            other_years = np.random.default_rng(seeds[year]).choice(other_years, n_replicates, replace=False)
+        replacement_years.append(other_years)
+
+    chunks = np.array_split(np.arange(n_years), min(workers, n_years))
+    tasks = [(sorted_samples, n_valid, n_samples, year_ranks, year_counts,
+              chunk, [replacement_years[year] for year in chunk], percentiles, min_percentage)
+             for chunk in chunks]
+
+    with phase("bootstrap replicates"):
+        if workers == 1:
+            results = [_bootstrap_worker(task) for task in tasks]
+        else:
+            from concurrent.futures import ProcessPoolExecutor
+            import multiprocessing
+
+            # Forking a process that runs the thread pool of the Numba kernels (e.g. TBB) leaves it
+            # hanging at exit, the workers are spawned instead
+            with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as executor:
+                results = list(executor.map(_bootstrap_worker, tasks))
+
+    dtype = _threshold_dtype(timeseries)
+
+    thresholds = [year_thresholds.astype(dtype, copy=False)
+                  for chunk_results in results for year_thresholds in chunk_results]
 
-        thresholds.append(selection_of_timeseries[selection_of_timeseries.notna()].quantile([percentile]).item())
+    if isinstance(percentile, float):
+        thresholds = [year_thresholds[..., 0] for year_thresholds in thresholds]
 
-    return pd.Series(thresholds)
+    return {reference_period[0] + year: year_thresholds for year, year_thresholds in enumerate(thresholds)}
 
 
+@instrument
 def fix_timeseries_for_leapyear(timeseries: pd.Series) -> pd.Series:
-    """Function for count of tropical nights (days where minimum temperature greater then 20°C)
+    """Function for expanding the 365 day of year thresholds to a leap year, the 29th of February gets
+    the threshold of the 28th of February (as in calculate_percentile_threshold)
 
     Args:
-        timeseries (pd.Series) -
+        timeseries (pd.Series) - 365 day of year values
 
     Returns:
-        np.nan or number: the count of icing days
+        pd.Series or np.nan: the 366 values of a leap year
 
     """
 
@@ -317,68 +765,119 @@ def fix_timeseries_for_leapyear(timeseries: pd.Series) -> pd.Series:
     if not is_valid_year_length(timeseries):
         return np.nan
 
-    return pd.concat([timeseries[:DAY_OF_YEAR_29_FEB],
-                      timeseries[[DAY_OF_YEAR_29_FEB]].repeat(2),
-                      timeseries[(DAY_OF_YEAR_29_FEB + 1):]]).reset_index(drop=True)
+    if timeseries.size == 366:
+        return timeseries.reset_index(drop=True)
+
+    leap_year = get_calendar_index("standard", LEAP_YEAR, LEAP_YEAR)
+
+    return timeseries.iloc[leap_year.reference_day_of_year - 1].reset_index(drop=True)
 
 
 def _number_of_thresholds(data: pd.Series,
-                          thresholds: pd.Series):
+                          thresholds: pd.Series,
+                          below: bool = True):
     assert isinstance(data, pd.Series), "Error: 'data' is not of type pandas.Series"
     assert isinstance(thresholds, pd.Series), "Error: 'thresholds' is not of type pandas.Series"
 
     if not is_valid_year_length(data):
         return np.nan
 
-    if data.size > thresholds.size:
-        thresholds = fix_timeseries_for_leapyear(thresholds)
+    thresholds = thresholds.to_numpy()
 
-    values, lengths = rle(pd.Series(data.reset_index(drop=True) < thresholds.reset_index(drop=True)))
+    # The 29th of February shares the threshold of the 28th of February
+    if data.size == 366 and thresholds.size == 365:
+        thresholds = thresholds[THRESHOLD_SLOTS[1]]
 
-    _number_of_vals = (np.array(values) & operator.ge(np.array(lengths), 6)).nonzero()[0]
+    min_length = 6
 
-    if not _number_of_vals.any():
-        return np.nan
+    return int(spell_kernels.threshold_spell_days(data.to_numpy(), thresholds, min_length, below=below)[0])
 
-    return np.sum(_number_of_vals)
+
+def _check_threshold_arguments(data: pd.Series,
+                               thresholds: pd.Series) -> None:
+    if not isinstance(data, pd.Series):
+        raise TypeError("Error: expecting pandas.Series as array.")
+    if not isinstance(thresholds, pd.Series):
+        raise TypeError("Error: expecting pandas.Series as array.")
 
 
+@instrument
 def number_of_cn(tmin: pd.Series,
                  thresholds: pd.Series) -> Union[float, int]:
-    """Function for count of tropical nights (days where minimum temperature greater then 20°C)
+    """Function for count of days in cold night spells (at least 6 consecutive days where minimum
+    temperature lower then the day of year threshold, e.g. the 10th percentile)
 
     Args:
         tmin (pd.Series): value array of minimum temperature
-        thresholds (pd.Series) -
+        thresholds (pd.Series): 365 day of year thresholds, e.g. of calculate_percentile_threshold
 
     Returns:
-        np.nan or number: the count of icing days
+        np.nan or number: the count of cold night spell days
 
     """
+    _check_threshold_arguments(tmin, thresholds)
 
-    if not isinstance(tmin, pd.Series):
-        raise TypeError("Error: expecting pandas.Series as array.")
-    if not isinstance(thresholds, pd.Series):
-        raise TypeError("Error: expecting pandas.Series as array.")
+    return _number_of_thresholds(tmin, thresholds, below=True)
+
+
+@instrument
+def number_of_cd(tmax: pd.Series,
+                 thresholds: pd.Series) -> Union[float, int]:
+    """Function for count of days in cold day spells (at least 6 consecutive days where maximum
+    temperature lower then the day of year threshold, e.g. the 10th percentile)
+
+    Args:
+        tmax (pd.Series): value array of maximum temperature
+        thresholds (pd.Series): 365 day of year thresholds, e.g. of calculate_percentile_threshold
+
+    Returns:
+        np.nan or number: the count of cold day spell days
 
-    return _number_of_thresholds(tmin, thresholds)
+    """
+    _check_threshold_arguments(tmax, thresholds)
+
+    return _number_of_thresholds(tmax, thresholds, below=True)
 
 
-def number_of_cd(tmean):
-    # todo implement function for cold days
-    pass
+@instrument
+def number_of_wn(tmin: pd.Series,
+                 thresholds: pd.Series) -> Union[float, int]:
+    """Function for count of days in warm night spells (at least 6 consecutive days where minimum
+    temperature greater then the day of year threshold, e.g. the 90th percentile)
 
+    Args:
+        tmin (pd.Series): value array of minimum temperature
+        thresholds (pd.Series): 365 day of year thresholds, e.g. of calculate_percentile_threshold
+
+    Returns:
+        np.nan or number: the count of warm night spell days
+
+    """
+    _check_threshold_arguments(tmin, thresholds)
 
-def number_of_wn(tmin):
-    # todo implement function for warm nights
-    pass
+    return _number_of_thresholds(tmin, thresholds, below=False)
 
 
-def number_of_wd(tmax_or_tmean):
-    # todo implement function for warm days
-    pass
+@instrument
+def number_of_wd(tmax: pd.Series,
+                 thresholds: pd.Series) -> Union[float, int]:
+    """Function for count of days in warm day spells (at least 6 consecutive days where maximum
+    temperature greater then the day of year threshold, e.g. the 90th percentile; WSDI)
+
+    Args:
+        tmax (pd.Series): value array of maximum temperature
+        thresholds (pd.Series): 365 day of year thresholds, e.g. of calculate_percentile_threshold
+
+    Returns:
+        np.nan or number: the count of warm day spell days
+
+    """
+    _check_threshold_arguments(tmax, thresholds)
 
+    return _number_of_thresholds(tmax, thresholds, below=False)
 
+
+@instrument
 def growing_season_length(tmean: pd.Series) -> Union[float, int]:
     """Function for determining the growing-season-length
 
@@ -397,41 +896,18 @@ def growing_season_length(tmean: pd.Series) -> Union[float, int]:
     num = 5.0
     min_length = 6
 
-    # Begin of growing season
-    values, lengths = rle(operator.gt(tmean, num))
-    values, lengths = np.repeat(values, lengths), np.repeat(lengths, lengths)
-
-    start_arr = np.where(values & operator.ge(lengths, min_length))[0]
-
-    if not start_arr.size > 0:
-        return 0
-
-    start = start_arr[0]
-
-    # End of growing season
+    # End of growing season is searched after the 1st of July
     if tmean.size == 366:
         jday_1jul = 183
     else:  # tmean.size == 365:
         jday_1jul = 182
 
-    values, lengths = rle(operator.lt(tmean, num))
-    values, lengths = np.repeat(values, lengths), np.repeat(lengths, lengths)
-
-    end_arr = (values & operator.ge(lengths, min_length)).nonzero()[0]
-
-    if not end_arr.size > 0:
-        return 0
-
-    end = end_arr[(end_arr > jday_1jul).nonzero()]
+    gsl = spell_kernels.growing_season_length(tmean.to_numpy(), jday_1jul, num, min_length)[0]
 
-    if not end:
-        return 0
-
-    gsl = end - start + 1
-
-    return gsl
+    return int(gsl)
 
 
+@instrument
 def rr10(prec: pd.Series) -> Union[float, int]:
     """Function for count of heavy precipitation (days where rr greater equal 10mm)
 
@@ -450,6 +926,7 @@ def rr10(prec: pd.Series) -> Union[float, int]:
     return number_of(prec, num, op)
 
 
+@instrument
 def rr20(prec: pd.Series) -> Union[float, int]:
     """Function for count of heavy precipitation (days where rr greater equal 20mm)
 
@@ -471,6 +948,7 @@ def rr20(prec: pd.Series) -> Union[float, int]:
 # 8. Number of consecutive dry days
 
 
+@instrument
 def consecutive_dd(prec: pd.Series) -> Union[float, int]:
     """Function for determining greatest number of consecutive dry days (rr < 1mm)
 
@@ -488,6 +966,149 @@ def consecutive_dd(prec: pd.Series) -> Union[float, int]:
 
     num = 1.0
 
-    values, lengths = rle(operator.lt(prec, num))
+    return int(spell_kernels.longest_spell(prec.to_numpy(), num, below=True)[0])
+
+
+# Definition of the indices of compute_indices: kind of reduction, variable and the comparison of
+# the daily values, indices with the same comparison share one mask
+COMPUTE_INDICES = {
+    "number_of_fd": ("count", "tmin", operator.lt, 0.0),
+    "number_of_sd": ("count", "tmax", operator.gt, 25.0),
+    "number_of_id": ("count", "tmax", operator.lt, 0.0),
+    "number_of_tn": ("count", "tmin", operator.gt, 20.0),
+    "consecutive_fd": ("spell", "tmin", operator.lt, 0.0),
+    "consecutive_sd": ("spell", "tmax", operator.gt, 25.0),
+    "sum_of_hdd": ("degree_days", "tmean", operator.lt, 17.0),
+    "growing_season_length": ("growing_season", "tmean", operator.gt, 5.0),
+    "rr10": ("count", "prec", operator.ge, 10.0),
+    "rr20": ("count", "prec", operator.ge, 20.0),
+    "consecutive_dd": ("spell", "prec", operator.lt, 1.0),
+}
+
+
+def _year_matrix_of(arr: pd.Series,
+                    first_year: int,
+                    n_years: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Function for arranging a daily series in a (years, 366) matrix, slot i holding day of year i + 1
+
+    Args:
+        arr (pandas.Series): daily values with a DatetimeIndex
+        first_year (int): year of the first row
+        n_years (int): number of rows
+
+    Returns:
+        tuple: matrix padded with NaN (float32 for float32 values, else float64) and the count of days per year
+
+    """
+    year_index = arr.index.year.to_numpy() - first_year
+    day_index = arr.index.dayofyear.to_numpy() - 1
+
+    dtype = np.float32 if arr.dtype == np.float32 else np.float64
+
+    values = np.full((n_years, 366), np.nan, dtype=dtype)
+    values[year_index, day_index] = arr.to_numpy(dtype=dtype)
+
+    return values, np.bincount(year_index, minlength=n_years)
+
+
+@instrument
+def compute_indices(tmin: Optional[pd.Series] = None,
+                    tmax: Optional[pd.Series] = None,
+                    tmean: Optional[pd.Series] = None,
+                    prec: Optional[pd.Series] = None,
+                    indices: Optional[Sequence[str]] = None,
+                    compact: bool = False) -> pd.DataFrame:
+    """Function for computing several annual indices of daily series at once. The series are
+    validated and arranged by year once, every comparison of the daily values is evaluated once for
+    all years and shared by the indices that need it (e.g. tmin < 0°C for number_of_fd and
+    consecutive_fd)
+
+    Args:
+        tmin (pd.Series): daily minimum temperature with a DatetimeIndex
+        tmax (pd.Series): daily maximum temperature with a DatetimeIndex
+        tmean (pd.Series): daily mean temperature with a DatetimeIndex
+        prec (pd.Series): daily precipitation with a DatetimeIndex
+        indices (list): names of the indices (keys of COMPUTE_INDICES), None for all indices whose
+            variables are given
+        compact (bool): return counts and spell lengths as int16 with batch_indices.COMPACT_MISSING
+            instead of np.nan, and sums as float32
+
+    Returns:
+        pd.DataFrame: one row per year and one column per index, np.nan for years without 365 or
+            366 days (same results as the single index functions applied to each year)
+
+    """
+    variables = {"tmin": tmin, "tmax": tmax, "tmean": tmean, "prec": prec}
+
+    for name, arr in variables.items():
+        if arr is None:
+            continue
+        if not isinstance(arr, pd.Series):
+            raise TypeError("Error: expecting pandas.Series as array.")
+        if not isinstance(arr.index, pd.DatetimeIndex):
+            raise TypeError(f"Error: expecting pandas.DatetimeIndex as index of {name}.")
+
+    if indices is None:
+        indices = [index for index, (_, variable, _, _) in COMPUTE_INDICES.items()
+                   if variables[variable] is not None]
+
+    for index in indices:
+        if index not in COMPUTE_INDICES:
+            raise ValueError(f"Error: unknown index '{index}'.")
+        if variables[COMPUTE_INDICES[index][1]] is None:
+            raise ValueError(f"Error: index '{index}' requires {COMPUTE_INDICES[index][1]}.")
+
+    used = {COMPUTE_INDICES[index][1] for index in indices}
+
+    if not used:
+        return pd.DataFrame(index=pd.Index([], name="YEAR", dtype=int))
+
+    first_year = min(variables[name].index.year.min() for name in used)
+    last_year = max(variables[name].index.year.max() for name in used)
+    years = np.arange(first_year, last_year + 1)
+
+    matrices = {}
+    days = {}
+    for name in used:
+        matrices[name], days[name] = _year_matrix_of(variables[name], first_year, years.size)
+
+    masks = {}
+
+    def mask_of(variable, op, num):
+        key = (variable, op, num)
+        if key not in masks:
+            masks[key] = op(matrices[variable], num)
+        return masks[key]
+
+    result = pd.DataFrame(index=pd.Index(years, name="YEAR"))
+
+    for index in indices:
+        kind, variable, op, num = COMPUTE_INDICES[index]
+
+        mask = mask_of(variable, op, num)
+
+        if kind == "count":
+            values = mask.sum(axis=1)
+        elif kind == "spell":
+            values = longest_run(mask)
+        elif kind == "degree_days":
+            values = np.where(mask, num - matrices[variable], 0.0).sum(axis=1, dtype=np.float64)
+        else:
+            # End of growing season is searched after the 1st of July
+            jday_1jul = np.where(days[variable] == 366, 183, 182)
+
+            start = first_spell_start(mask, 6)
+            end = first_spell_start(mask_of(variable, operator.lt, num), 6, after=jday_1jul + 1)
+
+            values = np.where((start >= 0) & (end >= 0), end - start + 1, 0)
+
+        valid = np.isin(days[variable], [365, 366])
+
+        if not compact:
+            result[index] = np.where(valid, values, np.nan)
+        elif kind == "degree_days":
+            result[index] = np.where(valid, values, np.nan).astype(np.float32)
+        else:
+            result[index] = np.where(valid, values, COMPACT_MISSING).astype(np.int16)
 
-    return int(np.max(lengths[np.array(values).nonzero()]))
+    return result
@@ -0,0 +1,76 @@
+""" Cumulative-sum primitives working on arrays of shape (..., n_days)
+
+Sums over sliding windows are taken as differences of one cumulative sum along the day axis, so
+they cost O(n_days) independently of the window length. Missing values (NaN) are counted by a
+second cumulative sum; windows containing a missing value are NaN.
+"""
+
+import numpy as np
+
+
+def _cumulative_sum(values: np.ndarray) -> np.ndarray:
+    # Cumulative sum with a leading zero, accumulated in float64
+    cumulative = np.zeros(values.shape[:-1] + (values.shape[-1] + 1, ), dtype=np.float64)
+    np.cumsum(values, axis=-1, dtype=np.float64, out=cumulative[..., 1:])
+
+    return cumulative
+
+
+def window_sums(values: np.ndarray,
+                window: int) -> np.ndarray:
+    """Function for the sums of all windows of window consecutive days
+
+    Args:
+        values (np.ndarray): value array of shape (..., n_days)
+        window (int): length of the windows in days
+
+    Returns:
+        np.ndarray: sums of shape (..., n_days - window + 1), the sum of days i to i + window - 1 at
+            position i, NaN for windows with missing values
+
+    """
+    values = np.asarray(values)
+
+    if not 0 < window <= values.shape[-1]:
+        raise ValueError("Error: expecting window between 1 and the number of days.")
+
+    missing = np.isnan(values)
+
+    total = _cumulative_sum(np.where(missing, 0.0, values))
+    missing_total = np.zeros(total.shape, dtype=np.intp)
+    np.cumsum(missing, axis=-1, out=missing_total[..., 1:])
+
+    sums = total[..., window:] - total[..., :-window]
+    complete = missing_total[..., window:] == missing_total[..., :-window]
+
+    return np.where(complete, sums, np.nan)
+
+
+def max_window_sum(values: np.ndarray,
+                   window: int) -> np.ndarray:
+    """Function for the greatest sum of window consecutive days per series
+
+    Args:
+        values (np.ndarray): value array of shape (..., n_days)
+        window (int): length of the windows in days
+
+    Returns:
+        np.ndarray: greatest sum of a window without missing values of shape (...), NaN if no such window exists
+
+    """
+    return np.fmax.reduce(window_sums(values, window), axis=-1)
+
+
+def masked_sum(values: np.ndarray,
+               mask: np.ndarray) -> np.ndarray:
+    """Function for the sum of the values where the mask is True per series, accumulated in float64
+
+    Args:
+        values (np.ndarray): value array of shape (..., n_days)
+        mask (np.ndarray): boolean array broadcast against the values
+
+    Returns:
+        np.ndarray: sums of shape (...)
+
+    """
+    return np.sum(np.where(mask, values, 0.0), axis=-1, dtype=np.float64)
@@ -1,10 +1,12 @@
-from numpy import Inf
+import numpy as np
+from numpy import inf
 
 SOLAR_CONST = 1367.0
 GRAVITY = 9.81
 GAS_CONSTANT = 287.0
 HEAT_CAPACITY_WATER = 4186.8
 MELTING_HEAT_WATER = 334000
+HEAT_CAPACITY_ICE = 2100.0
 
 GLOB_RAD_DAILY_PAR_a = 0.24
 GLOB_RAD_DAILY_PAR_b_summer = 0.55
@@ -36,7 +38,7 @@ WETTINGLOSS_VALS = {(0, 0): (0, 0),
                     (3.5, 4.4): (0.34, 0.20),
                     (4.5, 6.0): (0.36, 0.22),
                     (6.1, 8.9): (0.41, 0.26),
-                    (9.0, Inf): (0.47, 0.30)}
+                    (9.0, inf): (0.47, 0.30)}
 
 LAI_TYPICAL = {
     "SEALED": {"JAN": 10, "FEB": 10, "MAR": 10, "APR": 10, "MAY": 10, "JUN": 10, "JUL": 10, "AUG": 10, "SEP": 10, "OCT": 10, "NOV": 10, "DEC": 10},
@@ -67,3 +69,10 @@ LAI_TYPICAL = {
 
     "WATER": {"JAN": 0.0, "FEB": 0.0, "MAR": 0.0, "APR": 0.0, "MAY": 0.0, "JUN": 0.0, "JUL": 0.0, "AUG": 0.0, "SEP": 0.0, "OCT": 0.0, "NOV": 0.0, "DEC": 0.0}
 }
+
+# LAI_TYPICAL as lookup table of shape (land use code, month), the land use code is the position
+# in LAND_USE_TYPES, the month index is month - 1
+LAND_USE_TYPES = list(LAI_TYPICAL)
+MONTH_ABBREVIATIONS = ["JAN", "FEB", "MAR", "APR", "MAY", "JUN", "JUL", "AUG", "SEP", "OCT", "NOV", "DEC"]
+LAI_TABLE = np.array([[LAI_TYPICAL[land_use][month] for month in MONTH_ABBREVIATIONS]
+                      for land_use in LAND_USE_TYPES], dtype=float)
@@ -0,0 +1,211 @@
+""" Chunked engine for computing annual climate indices on gridded cubes (time, lat, lon)
+
+Input cubes are opened lazily (raw .npy files memory-mapped, NetCDF and Zarr variables through
+their own lazy slicing), spatial tiles are read one after another (fill values of NetCDF and Zarr
+cubes become NaN, i.e. missing days), converted into a year matrix
+and reduced by the batch index kernels. The annual grids (years, lat, lon) are written into
+memory-mapped .npy files, so the peak memory is bounded by the tile size. In the compact mode the
+tiles are reduced as float32 and the grids are stored as int16 (counts) or float32 (sums), see
+batch_indices.
+"""
+
+from typing import Dict, Optional, Sequence
+import os
+import numpy as np
+
+from climate_tools.year_matrix import YearMatrix, DAYS_PER_YEAR_MATRIX
+from climate_tools.batch_indices import BATCH_INDICES, INDEX_COMPACT_DTYPES
+from climate_tools.quality import validity_bitmap, MAX_MISSING_DAYS_MONTH, MAX_MISSING_DAYS_YEAR
+from climate_tools.profiling import instrument, phase
+
+DEFAULT_MAX_CHUNK_BYTES = 256 * 1024 ** 2
+
+
+def open_cube(path: str,
+              variable: Optional[str] = None):
+    """Function for opening a cube of shape (time, lat, lon) without reading it into memory
+
+    Args:
+        path (str): path of a .npy file, a NetCDF file (.nc) or a Zarr store (.zarr)
+        variable (str): name of the variable in NetCDF files and Zarr groups
+
+    Returns:
+        array like: memory-mapped array or lazily sliced variable
+
+    """
+    extension = os.path.splitext(path.rstrip(os.sep))[1].lower()
+
+    if extension == ".npy":
+        return np.load(path, mmap_mode="r")
+
+    if extension in [".nc", ".nc4"]:
+        try:
+            import netCDF4
+        except ImportError:
+            raise ImportError("Error: reading NetCDF cubes requires the package 'netCDF4'.")
+
+        if variable is None:
+            raise ValueError("Error: expecting variable name for NetCDF cubes.")
+
+        dataset = netCDF4.Dataset(path, mode="r")
+
+        # Values equal to _FillValue/missing_value are read as masked values, see _read_tile
+        return dataset.variables[variable]
+
+    if extension == ".zarr":
+        try:
+            import zarr
+        except ImportError:
+            raise ImportError("Error: reading Zarr cubes requires the package 'zarr'.")
+
+        store = zarr.open(path, mode="r")
+
+        if variable is not None:
+            return store[variable]
+
+        return store
+
+    raise ValueError(f"Error: unsupported cube format '{extension}'.")
+
+
+def _read_tile(cube,
+               lat: slice,
+               lon: slice) -> np.ndarray:
+    """Function for reading a tile of a cube with the missing values as NaN: masked values (NetCDF variables
+    mask _FillValue and missing_value) and values equal to the fill_value of Zarr arrays
+
+    Args:
+        cube (array like): cube of shape (time, lat, lon)
+        lat (slice): latitudes of the tile
+        lon (slice): longitudes of the tile
+
+    Returns:
+        np.ndarray: values of shape (time, lat, lon), floating point if missing values were replaced
+
+    """
+    slab = cube[:, lat, lon]
+
+    if np.ma.isMaskedArray(slab):
+        return np.ma.filled(slab.astype(np.result_type(slab.dtype, np.float32)), np.nan)
+
+    slab = np.asarray(slab)
+
+    # Zarr arrays hold the value of missing chunks and elements in fill_value, .npy files have none
+    fill_value = getattr(cube, "fill_value", None)
+
+    if fill_value is not None and not np.isnan(fill_value):
+        slab = np.where(slab == fill_value, np.nan, slab)
+
+    return slab
+
+
+def _tile_shape(n_time: int,
+                n_years: int,
+                n_lat: int,
+                n_lon: int,
+                itemsize: int,
+                matrix_itemsize: int,
+                max_chunk_bytes: int):
+    # Raw slab, year matrix and the boolean/float temporaries of the kernels per grid cell
+    bytes_per_cell = n_time * itemsize + n_years * DAYS_PER_YEAR_MATRIX * (2 * matrix_itemsize + 1)
+
+    cells = max(1, max_chunk_bytes // bytes_per_cell)
+
+    if cells < n_lon:
+        return 1, cells
+
+    return min(n_lat, cells // n_lon), n_lon
+
+
+@instrument
+def compute_grid_indices(cube,
+                         dates: Sequence,
+                         indices: Sequence[str],
+                         output_directory: str,
+                         max_chunk_bytes: int = DEFAULT_MAX_CHUNK_BYTES,
+                         etccdi_missing_rules: bool = False,
+                         compact: bool = False) -> Dict[str, np.ndarray]:
+    """Function for computing annual indices of every grid cell of a cube tile by tile
+
+    Args:
+        cube (array like): daily values of shape (time, lat, lon), e.g. from open_cube
+        dates (sequence): dates of the time axis
+        indices (list): names of the batch indices, e.g. ["number_of_fd", "rr10"]
+        output_directory (str): directory receiving one file <index>.npy of shape (years, lat, lon) per
+            index and years.npy
+        max_chunk_bytes (int): upper bound of the memory used by one tile
+        etccdi_missing_rules (bool): accept years with up to 3 missing days per month and 15 per year
+            (ETCCDI) instead of complete years only
+        compact (bool): reduce the tiles as float32 and store counts as int16 with
+            batch_indices.COMPACT_MISSING for invalid years, sums as float32
+
+    Returns:
+        dict: memory-mapped result grid per index
+
+    """
+    for index in indices:
+        if index not in BATCH_INDICES:
+            raise ValueError(f"Error: unknown index '{index}'.")
+
+    if len(cube.shape) != 3:
+        raise ValueError("Error: expecting cube of shape (time, lat, lon).")
+
+    dates = np.asarray(dates, dtype="datetime64[D]")
+
+    n_time, n_lat, n_lon = cube.shape
+
+    if dates.size != n_time:
+        raise ValueError("Error: number of dates does not match the time axis of the cube.")
+
+    years_of_dates = dates.astype("datetime64[Y]").astype(int) + 1970
+    years = np.arange(years_of_dates.min(), years_of_dates.max() + 1)
+
+    max_missing = (MAX_MISSING_DAYS_MONTH, MAX_MISSING_DAYS_YEAR) if etccdi_missing_rules else (0, 0)
+
+    if compact:
+        matrix_dtype = np.dtype(np.float32)
+    elif np.issubdtype(cube.dtype, np.floating):
+        matrix_dtype = np.dtype(cube.dtype)
+    else:
+        matrix_dtype = np.dtype(np.float64)
+
+    itemsize = np.dtype(cube.dtype).itemsize
+    rows, cols = _tile_shape(n_time, years.size, n_lat, n_lon, itemsize, matrix_dtype.itemsize, max_chunk_bytes)
+
+    os.makedirs(output_directory, exist_ok=True)
+    np.save(os.path.join(output_directory, "years.npy"), years)
+
+    results = {index: np.lib.format.open_memmap(os.path.join(output_directory, f"{index}.npy"),
+                                                mode="w+",
+                                                dtype=INDEX_COMPACT_DTYPES[index] if compact else np.float64,
+                                                shape=(years.size, n_lat, n_lon))
+               for index in indices}
+
+    for lat_start in range(0, n_lat, rows):
+        lat_end = min(lat_start + rows, n_lat)
+
+        for lon_start in range(0, n_lon, cols):
+            lon_end = min(lon_start + cols, n_lon)
+
+            with phase("read tile"):
+                slab = _read_tile(cube, slice(lat_start, lat_end), slice(lon_start, lon_end))
+            tile_shape = slab.shape[1:]
+
+            with phase("year matrix"):
+                year_matrix = YearMatrix.from_array(slab.reshape(n_time, -1), dates, dtype=matrix_dtype)
+
+            # Gaps are checked once per tile and shared by all indices
+            with phase("validity"):
+                validity = validity_bitmap(year_matrix, *max_missing)
+
+            for index in indices:
+                # Result of shape (cells, years) -> (years, rows, cols)
+                result = BATCH_INDICES[index](year_matrix, validity, compact=compact)
+                results[index][:, lat_start:lat_end, lon_start:lon_end] = result.T.reshape((years.size,) + tile_shape)
+
+            del slab, year_matrix
+
+    for result in results.values():
+        result.flush()
+
+    return results
@@ -1,2 +1,128 @@
+from typing import Dict, Sequence, Union
+import numpy as np
+
+from climate_tools.general_variables import LAI_TABLE, LAND_USE_TYPES
+from climate_tools.meteorological_funtions import get_evapotranspiration
+
+
 def get_interception_storage(lai):
     return 0.2 * lai
+
+
+def get_land_use_code(land_use: Union[str, Sequence[str], np.ndarray]) -> np.ndarray:
+    """Function for converting land use names (keys of LAI_TYPICAL) into land use codes
+
+    Args:
+        land_use (str, list, np.ndarray): land use name(s), e.g. "ACRE"
+
+    Returns:
+        np.ndarray: land use code(s), the position of the name in LAND_USE_TYPES
+
+    """
+    land_use = np.asarray(land_use)
+
+    unknown = np.setdiff1d(land_use, LAND_USE_TYPES)
+
+    if unknown.size > 0:
+        raise ValueError(f"Error: unknown land use {unknown.tolist()}.")
+
+    names = np.asarray(LAND_USE_TYPES)
+    sorter = np.argsort(names)
+
+    return sorter[np.searchsorted(names, land_use, sorter=sorter)]
+
+
+def _months_of(dates: Sequence) -> np.ndarray:
+    return np.asarray(dates, dtype="datetime64[M]").astype(int) % 12 + 1
+
+
+def get_lai(land_use: np.ndarray,
+            month: Union[int, np.ndarray]) -> np.ndarray:
+    """Function for looking up the typical LAI of land use codes and months
+
+    Args:
+        land_use (np.ndarray): land use codes (see get_land_use_code), negative codes mark cells
+            without data
+        month (int, np.ndarray): month(s) 1 - 12, broadcast against the land use codes
+
+    Returns:
+        np.ndarray: LAI, NaN for cells without data
+
+    """
+    land_use = np.asarray(land_use)
+    month = np.asarray(month)
+
+    if np.any(land_use >= len(LAND_USE_TYPES)):
+        raise ValueError("Error: unknown land use code.")
+
+    # Month 0 would wrap around to December
+    if np.any((month < 1) | (month > 12)):
+        raise ValueError("Error: expecting months between 1 and 12.")
+
+    lai = LAI_TABLE[np.maximum(land_use, 0), month - 1]
+
+    return np.where(land_use >= 0, lai, np.nan)
+
+
+def get_interception_grid(land_use: np.ndarray,
+                          dates: Sequence,
+                          prec: np.ndarray,
+                          e_pot: np.ndarray,
+                          e_a: np.ndarray,
+                          storage: Union[float, np.ndarray] = 0.0) -> Dict[str, np.ndarray]:
+    """Function for the daily interception storage and actual evapotranspiration of a land use raster
+
+    The interception capacity of every cell and day follows from the typical LAI of its land use
+    and month. The interception store is filled by precipitation up to the capacity and emptied by
+    the interception evaporation, which is limited by the potential evapotranspiration.
+
+    Args:
+        land_use (np.ndarray): land use codes of shape (lat, lon) (see get_land_use_code),
+            negative codes mark cells without data
+        dates (sequence): dates of the time axis
+        prec (np.ndarray): daily precipitation of shape (time, lat, lon) (mm)
+        e_pot (np.ndarray): potential evapotranspiration of shape (time, lat, lon) (mm)
+        e_a (np.ndarray): actual evapotranspiration without interception of shape (time, lat, lon) (mm)
+        storage (float, np.ndarray): interception storage at the beginning (mm)
+
+    Returns:
+        dict: interception capacity, interception storage at the end of the day, interception
+        evaporation and actual evapotranspiration (mm) of shape (time, lat, lon)
+
+    """
+    land_use = np.asarray(land_use)
+    months = _months_of(dates)
+
+    shape = (months.size, ) + land_use.shape
+
+    prec = np.broadcast_to(prec, shape)
+    e_pot = np.broadcast_to(e_pot, shape)
+
+    # Capacity grid of all days in one lookup: (time, 1, 1) x (lat, lon)
+    capacity = get_interception_storage(get_lai(land_use, months.reshape((-1, ) + (1, ) * land_use.ndim)))
+
+    storage_grid = np.empty(shape)
+    e_izp = np.empty(shape)
+
+    current = np.empty(land_use.shape)
+    current[:] = storage
+
+    for day in range(months.size):
+        np.add(current, prec[day], out=current)
+        np.minimum(current, capacity[day], out=current)
+
+        np.minimum(current, e_pot[day], out=e_izp[day])
+        np.subtract(current, e_izp[day], out=current)
+
+        storage_grid[day] = current
+
+    # Without potential evapotranspiration there is no interception evaporation
+    with np.errstate(divide="ignore", invalid="ignore"):
+        e_act = get_evapotranspiration(e_pot, e_izp, e_a)
+
+    e_act = np.where((e_pot > 0) | np.isnan(e_izp), e_act, e_a)
+
+    return {"capacity": capacity,
+            "storage": storage_grid,
+            "e_izp": e_izp,
+            "e_act": e_act}
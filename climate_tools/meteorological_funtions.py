@@ -1,51 +1,111 @@
-from math import exp, cos, acos, tan, sin, radians, log
-from math import pi
+""" Meteorological conversion formulas
 
-from general_variables import SOLAR_CONST, GRAVITY, GAS_CONSTANT, HEAT_CAPACITY_WATER, MELTING_HEAT_WATER
+The conversion formulas are NumPy ufunc chains: every argument can be a scalar or an array
+(broadcast against each other) and an optional out buffer receives the result, so no result
+array is allocated (get_air_pressure and get_windspeed_height allocate one temporary of the shape of
+their height arguments). The out buffer must not overlap with the arguments, except for the air
+temperature of get_sat_wvp. Scalar arguments without out buffer return a scalar.
+"""
 
-from general_variables import GLOB_RAD_DAILY_PAR_a
-from general_variables import GLOB_RAD_DAILY_PAR_b_summer
-from general_variables import GLOB_RAD_DAILY_PAR_b_winter
-from general_variables import GLOB_RAD_DAILY_PAR_c
+from functools import lru_cache
+from math import radians
+import numpy as np
 
-from general_variables import GLOB_RAD_HOURLY_PAR_a
-from general_variables import GLOB_RAD_HOURLY_PAR_b
+from climate_tools.general_variables import SOLAR_CONST, GRAVITY, GAS_CONSTANT, HEAT_CAPACITY_WATER, MELTING_HEAT_WATER
 
-from general_variables import MONTHS_SUMMER, MONTHS_WINTER
+from climate_tools.general_variables import GLOB_RAD_DAILY_PAR_a
+from climate_tools.general_variables import GLOB_RAD_DAILY_PAR_b_summer
+from climate_tools.general_variables import GLOB_RAD_DAILY_PAR_b_winter
+from climate_tools.general_variables import GLOB_RAD_DAILY_PAR_c
 
+from climate_tools.general_variables import GLOB_RAD_HOURLY_PAR_a
+from climate_tools.general_variables import GLOB_RAD_HOURLY_PAR_b
 
-def get_sat_wvp(temperature_air):
-    saturated_wvp = 6.1078 * \
-        exp((17.08085 * temperature_air) / (234.175 + temperature_air))
+from climate_tools.general_variables import MONTHS_SUMMER, MONTHS_WINTER
 
-    return saturated_wvp
+
+def _result_buffer(out, *args):
+    if out is not None:
+        return out
+
+    # Sequences (e.g. lists) become arrays, Python scalars are kept so they don't promote float32 arrays
+    args = [arg if np.isscalar(arg) else np.asarray(arg) for arg in args]
+
+    return np.empty(np.broadcast(*args).shape, dtype=np.result_type(*args, 1.0))
+
+
+def _result(out, buffer):
+    if out is None:
+        return buffer[()]
+
+    return buffer
+
+
+def get_sat_wvp(temperature_air,
+                out=None):
+    buffer = _result_buffer(out, temperature_air)
+
+    # 17.08085 * t / (234.175 + t) written as 17.08085 - 17.08085 * 234.175 / (234.175 + t) to work in place
+    np.add(temperature_air, 234.175, out=buffer)
+    np.divide(-17.08085 * 234.175, buffer, out=buffer)
+    np.add(buffer, 17.08085, out=buffer)
+    np.exp(buffer, out=buffer)
+    np.multiply(buffer, 6.1078, out=buffer)
+
+    return _result(out, buffer)
 
 
 def get_humidity(water_vapor_pressure,
-                 temperature_air):
-    humidity = water_vapor_pressure / get_sat_wvp(temperature_air)
+                 temperature_air,
+                 out=None):
+    buffer = _result_buffer(out, water_vapor_pressure, temperature_air)
 
-    return humidity
+    get_sat_wvp(temperature_air, out=buffer)
+    np.divide(water_vapor_pressure, buffer, out=buffer)
+
+    return _result(out, buffer)
 
 
 def get_wvp(temperature_air,
-            humidity):
-    water_vapor_pressure = get_sat_wvp(temperature_air) * humidity
+            humidity,
+            out=None):
+    buffer = _result_buffer(out, temperature_air, humidity)
+
+    get_sat_wvp(temperature_air, out=buffer)
+    np.multiply(buffer, humidity, out=buffer)
 
-    return water_vapor_pressure
+    return _result(out, buffer)
 
 
 def get_sun_decl(julian_day):
-    sun_decl = 0.41 * cos(2 * pi * (julian_day - 172) / 365)
+    sun_decl = 0.41 * np.cos(2 * np.pi * (np.asarray(julian_day) - 172) / 365)
 
     return sun_decl
 
 
+def _get_sunrise(sun_decl,
+                 latitude):
+    return 12 / np.pi * np.arccos(np.tan(sun_decl) * np.tan(latitude) +
+                                  0.0145 / (np.cos(sun_decl) * np.cos(latitude)))
+
+
+def _get_sun_rad(sun_decl,
+                 sunrise,
+                 latitude):
+    sunset = 24 - sunrise
+
+    pos_sun_dur = sunset - sunrise
+
+    return SOLAR_CONST * (pos_sun_dur * np.sin(sun_decl) * np.sin(latitude) + 12 / np.pi * np.cos(
+        sun_decl) * np.cos(latitude) * (np.sin(np.pi * sunrise / 12) - np.sin(np.pi * sunset / 12)))
+
+
 def get_sunrise(julian_day,
                 latitude):
     sun_decl = get_sun_decl(julian_day)
-    sunrise = 12 / pi * acos(tan(sun_decl) * tan(latitude) +
-                             0.0145 / (cos(sun_decl) * cos(latitude)))
+
+    sunrise = _get_sunrise(sun_decl,
+                           latitude)
 
     return sunrise
 
@@ -64,22 +124,117 @@ def get_pos_sun_dur(julian_day,
 
 def get_sun_rad(julian_day,
                 latitude):
-    pos_sun_dur = get_pos_sun_dur(julian_day,
-                                  latitude)
-
     sun_decl = get_sun_decl(julian_day)
 
-    sunrise = get_sunrise(julian_day,
-                          latitude)
-
-    sunset = 24 - sunrise
+    sunrise = _get_sunrise(sun_decl,
+                           latitude)
 
-    sun_rad = SOLAR_CONST * (pos_sun_dur * sin(sun_decl) * sin(latitude) + 12 / pi * cos(
-        sun_decl) * cos(latitude) * (sin(pi * sunrise / 12) - sin(pi * sunset / 12)))
+    sun_rad = _get_sun_rad(sun_decl,
+                           sunrise,
+                           latitude)
 
     return sun_rad
 
 
+# Tolerance of the latitude range check of the solar geometry tables in radians, absorbs the rounding of
+# grid latitudes
+LATITUDE_TOLERANCE = 1e-9
+
+
+class SolarGeometryTable:
+    """Lookup table of the solar geometry for all 366 julian days and a set of latitudes
+
+    The table holds sun declination, sunrise, day length (positive sun duration) and extraterrestrial
+    radiation. Lookups of latitudes that are part of the table return the exact values of the
+    formulas, other latitudes are linearly interpolated between the neighbouring table latitudes.
+    Latitudes outside the range of the table are not extrapolated but raise a ValueError.
+
+    Args:
+        latitudes (array): latitudes in radians, e.g. the latitudes of the stations or a regular grid
+
+    """
+
+    def __init__(self,
+                 latitudes):
+        latitudes = np.unique(np.asarray(latitudes, dtype=float))
+
+        if latitudes.size == 0:
+            raise ValueError("Error: expecting at least one latitude.")
+
+        julian_days = np.arange(1, 367)
+
+        self.latitudes = latitudes
+        self.sun_decl = get_sun_decl(julian_days)
+        self.sunrise = _get_sunrise(self.sun_decl[np.newaxis, :],
+                                    latitudes[:, np.newaxis])
+        self.pos_sun_dur = (24 - self.sunrise) - self.sunrise
+        self.sun_rad = _get_sun_rad(self.sun_decl[np.newaxis, :],
+                                    self.sunrise,
+                                    latitudes[:, np.newaxis])
+
+    def _lookup(self,
+                table,
+                julian_day,
+                latitude):
+        day_index = np.asarray(julian_day) - 1
+        latitude = np.asarray(latitude, dtype=float)
+
+        if np.any((latitude < self.latitudes[0] - LATITUDE_TOLERANCE) |
+                  (latitude > self.latitudes[-1] + LATITUDE_TOLERANCE)):
+            raise ValueError("Error: latitude outside of the latitude range of the solar geometry table.")
+
+        # Latitudes within the tolerance of the range limits are looked up at the limits
+        latitude = np.clip(latitude, self.latitudes[0], self.latitudes[-1])
+
+        if self.latitudes.size == 1:
+            return table[0, day_index] + 0 * latitude
+
+        upper = np.clip(np.searchsorted(self.latitudes, latitude), 1, self.latitudes.size - 1)
+        lower = upper - 1
+
+        weight = (latitude - self.latitudes[lower]) / (self.latitudes[upper] - self.latitudes[lower])
+
+        lower_values = table[lower, day_index]
+        upper_values = table[upper, day_index]
+
+        return np.where(weight == 1, upper_values, lower_values + weight * (upper_values - lower_values))
+
+    def get_sunrise(self,
+                    julian_day,
+                    latitude):
+        return self._lookup(self.sunrise, julian_day, latitude)
+
+    def get_pos_sun_dur(self,
+                        julian_day,
+                        latitude):
+        return self._lookup(self.pos_sun_dur, julian_day, latitude)
+
+    def get_sun_rad(self,
+                    julian_day,
+                    latitude):
+        return self._lookup(self.sun_rad, julian_day, latitude)
+
+
+@lru_cache(maxsize=32)
+def _get_solar_geometry_table(latitudes):
+    return SolarGeometryTable(latitudes)
+
+
+def get_solar_geometry_table(latitudes):
+    """Function for the cached solar geometry table of a set of latitudes (radians)"""
+    return _get_solar_geometry_table(tuple(np.unique(np.asarray(latitudes, dtype=float)).tolist()))
+
+
+def get_solar_geometry_grid(resolution_degree=0.1,
+                            latitude_min=-65.0,
+                            latitude_max=65.0):
+    """Function for the cached solar geometry table of a regular latitude grid given in degree, limited to
+    latitudes without polar day or night by default"""
+    latitudes = np.radians(np.arange(latitude_min, latitude_max + resolution_degree / 2, resolution_degree))
+
+    return get_solar_geometry_table(latitudes)
+
+
 def get_glob_rad_daily(julian_day,
                        month,
                        latitude,
@@ -88,17 +243,20 @@ def get_glob_rad_daily(julian_day,
                        a=GLOB_RAD_DAILY_PAR_a,
                        b_summer=GLOB_RAD_DAILY_PAR_b_summer,
                        b_winter=GLOB_RAD_DAILY_PAR_b_winter,
-                       c=GLOB_RAD_DAILY_PAR_c):
-    if month in MONTHS_SUMMER:
-        b = b_summer
-    elif month in MONTHS_WINTER:
-        b = b_winter
+                       c=GLOB_RAD_DAILY_PAR_c,
+                       table=None):
+    b = np.where(np.isin(month, MONTHS_SUMMER), b_summer,
+                 np.where(np.isin(month, MONTHS_WINTER), b_winter, np.nan))
 
-    sun_rad = get_sun_rad(julian_day,
-                          latitude)
+    if table is None:
+        sun_decl = get_sun_decl(julian_day)
+        sunrise = _get_sunrise(sun_decl, latitude)
 
-    pos_sun_dur = get_pos_sun_dur(julian_day,
-                                  latitude)
+        sun_rad = _get_sun_rad(sun_decl, sunrise, latitude)
+        pos_sun_dur = (24 - sunrise) - sunrise
+    else:
+        sun_rad = table.get_sun_rad(julian_day, latitude)
+        pos_sun_dur = table.get_pos_sun_dur(julian_day, latitude)
 
     glob_rad_daily = sun_rad * (sun_radiation_direct * (a + b * sunshine_duration /
                                                         pos_sun_dur) + c * (1 - sun_radiation_direct))
@@ -111,13 +269,18 @@ def get_glob_rad_hourly(julian_day,
                         sun_radiation_direct,
                         sunshine_duration,
                         a=GLOB_RAD_HOURLY_PAR_a,
-                        b=GLOB_RAD_HOURLY_PAR_b):
+                        b=GLOB_RAD_HOURLY_PAR_b,
+                        table=None):
 
-    sun_rad = get_sun_rad(julian_day,
-                          latitude)
+    if table is None:
+        sun_decl = get_sun_decl(julian_day)
+        sunrise = _get_sunrise(sun_decl, latitude)
 
-    pos_sun_dur = get_pos_sun_dur(julian_day,
-                                  latitude)
+        sun_rad = _get_sun_rad(sun_decl, sunrise, latitude)
+        pos_sun_dur = (24 - sunrise) - sunrise
+    else:
+        sun_rad = table.get_sun_rad(julian_day, latitude)
+        pos_sun_dur = table.get_pos_sun_dur(julian_day, latitude)
 
     glob_rad_hourly = sun_rad * (a + b * sunshine_duration / pos_sun_dur)
 
@@ -128,26 +291,69 @@ def get_air_pressure(p1,
                      h1,
                      h2,
                      T1,
-                     T2):
+                     T2,
+                     out=None):
+    buffer = _result_buffer(out, p1, h1, h2, T1, T2)
 
-    return exp(-(GRAVITY * (h2 - h1)) / (GAS_CONSTANT * ((T1 + T2) / 2)) + log(p1))
+    # Temporary of the broadcast shape of the heights only, usually scalars
+    height_difference = np.subtract(h1, h2)
+
+    # exp(-(g * (h2 - h1)) / (R * ((T1 + T2) / 2)) + log(p1)) = p1 * exp(2 * g * (h1 - h2) / (R * (T1 + T2)))
+    np.add(T1, T2, out=buffer)
+    np.divide(2 * GRAVITY / GAS_CONSTANT, buffer, out=buffer)
+    np.multiply(buffer, height_difference, out=buffer)
+    np.exp(buffer, out=buffer)
+    np.multiply(buffer, p1, out=buffer)
+
+    return _result(out, buffer)
 
 
 def get_windspeed_height(h1,
                          h2,
                          u1,
-                         z0):
-    u2 = log(h2 / z0) / log(h1 / z0) * u1
+                         z0,
+                         out=None):
+    buffer = _result_buffer(out, h1, h2, u1, z0)
+
+    # Temporary of the broadcast shape of the measurement height and the roughness length only, usually scalars
+    log_height = np.log(np.divide(h1, z0))
 
-    return u2
+    np.divide(h2, z0, out=buffer)
+    np.log(buffer, out=buffer)
+    np.divide(buffer, log_height, out=buffer)
+    np.multiply(buffer, u1, out=buffer)
+
+    return _result(out, buffer)
 
 
 def get_evapotranspiration(e_pot,
                            e_izp,
-                           e_a):
-    e_ai = ((e_pot - e_izp) / e_pot) * e_a + e_izp
+                           e_a,
+                           out=None):
+    buffer = _result_buffer(out, e_pot, e_izp, e_a)
+
+    # ((e_pot - e_izp) / e_pot) * e_a + e_izp = (1 - e_izp / e_pot) * e_a + e_izp
+    np.divide(e_izp, e_pot, out=buffer)
+    np.subtract(1, buffer, out=buffer)
+    np.multiply(buffer, e_a, out=buffer)
+    np.add(buffer, e_izp, out=buffer)
 
-    return e_ai
+    return _result(out, buffer)
+
+
+def get_hf_prec(prec,
+                t_prec,
+                ta,
+                out=None):
+    buffer = _result_buffer(out, prec, t_prec, ta)
+
+    # Heat brought by precipitation of temperature t_prec within ta hours (W/m2)
+    np.maximum(t_prec, 0, out=buffer)
+    np.multiply(buffer, prec, out=buffer)
+    np.multiply(buffer, HEAT_CAPACITY_WATER, out=buffer)
+    np.divide(buffer, np.multiply(ta, 3600), out=buffer)
+
+    return _result(out, buffer)
 
 
 def get_eb_snowpack_dd(prec,
@@ -155,32 +361,53 @@ def get_eb_snowpack_dd(prec,
                        t_boundary,
                        ta,
                        degree_day_factor,
-                       also_snowmelt):
+                       also_snowmelt,
+                       out=None,
+                       work=None):
+    buffer = _result_buffer(out, prec, t_air, t_boundary, ta, degree_day_factor)
+
     if also_snowmelt:
-        t_prec = max(t_air - t_boundary, 0)
         t_ref = t_boundary
     else:
-        t_prec = max(t_air, 0)
         t_ref = 0
 
-    hf_prec = (prec * t_prec * HEAT_CAPACITY_WATER) / (ta * 3600)
+    # work: optional scratch buffer of the result shape, e.g. reused over the timesteps of a simulation
+    t_prec = np.subtract(t_air, t_ref, out=_result_buffer(work, t_air, t_ref, degree_day_factor))
+
+    hf_prec = get_hf_prec(prec, t_prec, ta, out=buffer)
 
     # pot_snowmelt_dd = degree_day_factor * (ta / 24) * (t_air - t_ref)
 
-    hf_dd = degree_day_factor * (t_air - t_ref) * \
-        MELTING_HEAT_WATER / (24 * 3600)
+    hf_dd = np.multiply(t_prec, degree_day_factor, out=t_prec)
+    np.multiply(hf_dd, MELTING_HEAT_WATER / (24 * 3600), out=hf_dd)
+
+    np.add(hf_prec, hf_dd, out=buffer)
 
-    return hf_dd + hf_prec
+    return _result(out, buffer)
 
 
 def get_eb_snowpack_knauf(a0,
                           a1,
                           v,
-                          t_air):
+                          t_air,
+                          prec,
+                          ta,
+                          hf_ground=0.0,
+                          out=None,
+                          work=None):
+    buffer = _result_buffer(out, a0, a1, v, t_air, prec, ta, hf_ground)
+
+    hf_prec = get_hf_prec(prec, t_air, ta, out=buffer)
+
+    # work: optional scratch buffer of the result shape, e.g. reused over the timesteps of a simulation
+    hf_sense = np.multiply(a1, v, out=_result_buffer(work, a1, v, t_air))
+    np.add(hf_sense, a0, out=hf_sense)
+    np.multiply(hf_sense, t_air, out=hf_sense)
 
-    hf_sense = (a0 + a1 * v) * t_air
+    np.add(hf_prec, hf_sense, out=buffer)
+    np.add(buffer, hf_ground, out=buffer)
 
-    return hf_ground + hf_prec + hf_sense
+    return _result(out, buffer)
 
 
 if __name__ == "__main__":
@@ -1,4 +1,60 @@
-from general_variables import MONTHS_SUMMER, MONTHS_WINTER, RICHTER_VALUES, WETTINGLOSS_VALS
+""" Precipitation correction formulas
+
+prec_correction_method1 and prec_correction_method2 accept scalars, sequences or arrays for every
+argument (broadcast against each other). The lookup tables of general_variables are compiled into arrays
+once: the wetting loss intervals into a sorted array of lower limits searched with searchsorted,
+the Richter coefficients into arrays indexed by precipitation type and horizon shielding class.
+"""
+
+import numpy as np
+
+from climate_tools.general_variables import MONTHS_SUMMER, MONTHS_WINTER, RICHTER_VALUES, WETTINGLOSS_VALS
+
+# Lower limits of the wetting loss intervals and their summer/winter values; values between two
+# intervals are assigned to the lower interval
+_WETTINGLOSS_KEYS = sorted(WETTINGLOSS_VALS)
+WETTINGLOSS_LOWER_LIMITS = np.array([lower_limit for lower_limit, _ in _WETTINGLOSS_KEYS])
+WETTINGLOSS_SUMMER = np.array([WETTINGLOSS_VALS[key][0] for key in _WETTINGLOSS_KEYS])
+WETTINGLOSS_WINTER = np.array([WETTINGLOSS_VALS[key][1] for key in _WETTINGLOSS_KEYS])
+
+RICHTER_TYPES = ('RAIN_SUMMER', 'RAIN_WINTER', 'SLEET', 'SNOW')
+RICHTER_SHIELDING = ('2D', '5D', '9.5D', '16D')
+RICHTER_EPSILON = np.array([RICHTER_VALUES[precipitation_type][0] for precipitation_type in RICHTER_TYPES])
+RICHTER_B = np.array([[RICHTER_VALUES[precipitation_type][1][shielding] for shielding in RICHTER_SHIELDING]
+                      for precipitation_type in RICHTER_TYPES])
+
+
+def _result(precipitation_corrected):
+    # Scalar arguments return a scalar, pandas objects are passed through
+    if isinstance(precipitation_corrected, np.ndarray) and precipitation_corrected.ndim == 0:
+        return precipitation_corrected[()]
+
+    return precipitation_corrected
+
+
+def get_wettingloss(precipitation,
+                    month):
+    month = np.asarray(month)
+
+    index = np.searchsorted(WETTINGLOSS_LOWER_LIMITS, precipitation, side='right') - 1
+
+    wettingloss_value = np.where((month >= 5) & (month <= 10),
+                                 WETTINGLOSS_SUMMER[index],
+                                 WETTINGLOSS_WINTER[index])
+
+    # Precipitation below the first interval and unknown months have no wetting loss value
+    return np.where((index >= 0) & (month >= 1) & (month <= 12), wettingloss_value, np.nan)
+
+
+def get_shielding_class(horizon_shielding):
+    horizon_shielding = np.asarray(horizon_shielding)
+
+    if np.issubdtype(horizon_shielding.dtype, np.integer):
+        return horizon_shielding
+
+    names, inverse = np.unique(horizon_shielding, return_inverse=True)
+
+    return np.array([RICHTER_SHIELDING.index(name) for name in names.tolist()])[inverse].reshape(horizon_shielding.shape)
 
 
 def prec_correction_method1(precipitation,
@@ -6,54 +62,56 @@ def prec_correction_method1(precipitation,
                             windspeed_1m,
                             temperature_air,
                             temperature_min):
+    temperature_air = np.asarray(temperature_air)
 
     # Wind correction of precipitation
-    if temperature_air < -27:
-        wind_factor = 1 + (0.550 * windspeed_1m ** 1.40)
-    elif temperature_air >= - 27 and temperature_air < -8:
-        wind_factor = 1 + (0.280 * windspeed_1m ** 1.30)
-    elif temperature_air >= - 8 and temperature_air < temperature_min:
-        wind_factor = 1 + (0.150 * windspeed_1m ** 1.15)
-    elif temperature_air >= temperature_min:
-        wind_factor = min(1 + (0.015 * windspeed_1m ** 1.00),
-                          1.12)
+    wind_factor = np.select([temperature_air < -27,
+                             temperature_air < -8,
+                             temperature_air < temperature_min,
+                             temperature_air >= temperature_min],
+                            [1 + (0.550 * np.power(windspeed_1m, 1.40)),
+                             1 + (0.280 * np.power(windspeed_1m, 1.30)),
+                             1 + (0.150 * np.power(windspeed_1m, 1.15)),
+                             np.minimum(1 + (0.015 * np.power(windspeed_1m, 1.00)), 1.12)],
+                            default=np.nan)
 
     # Wetting correction of precipitation
-    for key in WETTINGLOSS_VALS:
-        lower_limit, upper_limit = key
-        if lower_limit <= precipitation <= upper_limit:
-            if 5 <= month <= 10:
-                wettingloss_value = WETTINGLOSS_VALS[key][0]
-            else:
-                wettingloss_value = WETTINGLOSS_VALS[key][1]
-            break
+    wettingloss_value = get_wettingloss(precipitation,
+                                        month)
 
     precipitation_corrected = (precipitation * wind_factor) - wettingloss_value
 
-    return precipitation_corrected
+    return _result(precipitation_corrected)
 
 
 def prec_correction_method2(precipitation,
                             month,
                             temperature_air,
                             horizon_shielding):
-    if temperature_air > 3:
-        if month in MONTHS_SUMMER:
-            precipitation_type = 'RAIN_SUMMER'
-        elif month in MONTHS_WINTER:
-            precipitation_type = 'RAIN_WINTER'
-    elif -0.7 <= temperature_air <= 3:
-        precipitation_type = 'SLEET'
-    elif temperature_air < -0.7:
-        precipitation_type = 'SNOW'
+    month = np.asarray(month)
+    temperature_air = np.asarray(temperature_air)
 
-    epsilon, b_values = RICHTER_VALUES[precipitation_type]
+    precipitation_type = np.select([(temperature_air > 3) & np.isin(month, MONTHS_SUMMER),
+                                    (temperature_air > 3) & np.isin(month, MONTHS_WINTER),
+                                    (temperature_air >= -0.7) & (temperature_air <= 3),
+                                    temperature_air < -0.7],
+                                   [RICHTER_TYPES.index('RAIN_SUMMER'),
+                                    RICHTER_TYPES.index('RAIN_WINTER'),
+                                    RICHTER_TYPES.index('SLEET'),
+                                    RICHTER_TYPES.index('SNOW')],
+                                   default=-1)
 
-    b = b_values[horizon_shielding]
+    shielding_class = get_shielding_class(horizon_shielding)
 
-    precipitation_corrected = precipitation + b * precipitation ** epsilon
+    epsilon = RICHTER_EPSILON[precipitation_type]
 
-    return precipitation_corrected
+    b = RICHTER_B[precipitation_type, shielding_class]
+
+    # NaN for values without precipitation type, added so pandas objects keep their index
+    precipitation_corrected = (precipitation + b * np.power(precipitation, epsilon)) + \
+        np.where(precipitation_type >= 0, 0.0, np.nan)
+
+    return _result(precipitation_corrected)
 
 
 def prec_areal_correction(precipitation,
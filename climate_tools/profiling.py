@@ -0,0 +1,311 @@
+""" Optional instrumentation of the public functions and internal phases
+
+The public functions are decorated with instrument and their internal phases (calendar build, rolling
+mean, quantiles, run-length encoding, ...) are wrapped in phase. While a profiler is active, every call
+records its wall time and the bytes it allocated, i.e. the peak of the memory traced by tracemalloc
+above its level at the start of the call (temporaries freed before the call returns are included);
+the profiler aggregates call counts, cumulative time and bytes per name and keeps the single calls
+for a Chrome trace (chrome://tracing, https://ui.perfetto.dev). Without an active profiler,
+instrumented functions only check one global and phase returns a shared no-op context.
+
+A profiler is activated with the context manager
+
+    with profiling.profile() as profiler:
+        compute_indices(...)
+    profiler.write_json("profile.json")
+    profiler.write_chrome_trace("profile.trace.json")
+
+or for the whole process with the environment variable CLIMATE_TOOLS_PROFILE=<path>: the results are
+written to the path at exit, as Chrome trace if it ends with .trace.json, else as JSON summary. A
+"{pid}" in the path is replaced by the process id; worker processes (multiprocessing children) insert
+their process id before the suffix of a path without "{pid}", so they never overwrite the file of the
+main process.
+"""
+
+from typing import Callable, Dict, List, Optional
+from contextlib import contextmanager, nullcontext
+import atexit
+import functools
+import json
+import os
+import threading
+import time
+import tracemalloc
+
+PROFILE_ENV_VARIABLE = "CLIMATE_TOOLS_PROFILE"
+
+CHROME_TRACE_SUFFIX = ".trace.json"
+
+_NO_PHASE = nullcontext()
+
+_profiler = None
+
+
+class Profiler:
+    """Collector of the calls of instrumented functions and phases
+
+    Args:
+        track_memory (bool): record the allocated bytes per call (starts tracemalloc, which slows down the
+            allocations while the profiler is active)
+
+    """
+
+    def __init__(self,
+                 track_memory: bool = True):
+        self.track_memory = track_memory
+        self.stats = {}
+        self.events = []
+        self._open_records = threading.local()
+        self._started_tracemalloc = False
+        self._start = time.perf_counter()
+
+    def start(self) -> None:
+        if self.track_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracemalloc = True
+
+    def stop(self) -> None:
+        if self._started_tracemalloc:
+            tracemalloc.stop()
+            self._started_tracemalloc = False
+
+    def _thread_records(self) -> List[List[int]]:
+        # Records are nested within a thread, every thread has its own stack of open records
+        if not hasattr(self._open_records, "stack"):
+            self._open_records.stack = []
+
+        return self._open_records.stack
+
+    def _start_memory(self) -> Optional[List[int]]:
+        if not (self.track_memory and tracemalloc.is_tracing()):
+            return None
+
+        open_records = self._thread_records()
+
+        current, peak = tracemalloc.get_traced_memory()
+
+        # The peak is reset for the new record, the enclosing record keeps the peak reached so far
+        if open_records:
+            open_records[-1][1] = max(open_records[-1][1], peak)
+
+        tracemalloc.reset_peak()
+
+        memory = [current, current]
+        open_records.append(memory)
+
+        return memory
+
+    def _stop_memory(self,
+                     memory: Optional[List[int]]) -> int:
+        if memory is None:
+            return 0
+
+        open_records = self._thread_records()
+
+        memory[1] = max(memory[1], tracemalloc.get_traced_memory()[1])
+
+        open_records.remove(memory)
+
+        if open_records:
+            open_records[-1][1] = max(open_records[-1][1], memory[1])
+
+        return memory[1] - memory[0]
+
+    @contextmanager
+    def record(self,
+               name: str,
+               category: str):
+        """Context manager recording one call of a function or phase
+
+        Args:
+            name (str): name of the function or phase
+            category (str): "function" or "phase"
+
+        """
+        memory = self._start_memory()
+        start = time.perf_counter()
+
+        try:
+            yield
+        finally:
+            seconds = time.perf_counter() - start
+            allocated = self._stop_memory(memory)
+
+            stats = self.stats.setdefault(name, {"category": category, "calls": 0, "seconds": 0.0, "bytes": 0})
+            stats["calls"] += 1
+            stats["seconds"] += seconds
+            stats["bytes"] += allocated
+
+            self.events.append((name, category, start - self._start, seconds, allocated, threading.get_ident()))
+
+    def summary(self) -> Dict[str, Dict]:
+        """Function for the aggregated calls per function and phase
+
+        Returns:
+            dict: category, call count, cumulative wall time in seconds and allocated bytes (sum of the peaks
+            of the calls) per name, sorted by the cumulative time
+
+        """
+        return dict(sorted(self.stats.items(), key=lambda item: item[1]["seconds"], reverse=True))
+
+    def chrome_trace(self) -> Dict[str, List[Dict]]:
+        """Function for the single calls in the Chrome trace event format
+
+        Returns:
+            dict: trace with one complete event per call, times in microseconds
+
+        """
+        pid = os.getpid()
+
+        return {"traceEvents": [{"name": name,
+                                 "cat": category,
+                                 "ph": "X",
+                                 "ts": start * 1e6,
+                                 "dur": seconds * 1e6,
+                                 "pid": pid,
+                                 "tid": tid,
+                                 "args": {"bytes": allocated}}
+                                for name, category, start, seconds, allocated, tid in self.events],
+                "displayTimeUnit": "ms"}
+
+    def write_json(self,
+                   path: str) -> None:
+        with open(path, "w") as file:
+            json.dump(self.summary(), file, indent=2)
+
+    def write_chrome_trace(self,
+                           path: str) -> None:
+        with open(path, "w") as file:
+            json.dump(self.chrome_trace(), file)
+
+    def write(self,
+              path: str) -> None:
+        """Function for writing the Chrome trace (paths ending with .trace.json) or the JSON summary
+
+        Args:
+            path (str): output path
+
+        """
+        if path.endswith(CHROME_TRACE_SUFFIX):
+            self.write_chrome_trace(path)
+        else:
+            self.write_json(path)
+
+
+def get_profiler() -> Optional[Profiler]:
+    """Function for the active profiler, None if profiling is disabled"""
+    return _profiler
+
+
+@contextmanager
+def profile(track_memory: bool = True):
+    """Context manager activating a profiler for the enclosed code
+
+    Args:
+        track_memory (bool): record the allocated bytes per call
+
+    Returns:
+        Profiler: the active profiler, holding the results after the block
+
+    """
+    global _profiler
+
+    previous = _profiler
+
+    profiler = Profiler(track_memory)
+    profiler.start()
+    _profiler = profiler
+
+    try:
+        yield profiler
+    finally:
+        _profiler = previous
+        profiler.stop()
+
+
+def instrument(function: Optional[Callable] = None,
+               name: Optional[str] = None) -> Callable:
+    """Decorator recording the calls of a function while a profiler is active
+
+    Args:
+        function (callable): decorated function
+        name (str): recorded name, defaults to <module>.<function>
+
+    Returns:
+        callable: instrumented function
+
+    """
+    if function is None:
+        return functools.partial(instrument, name=name)
+
+    if name is None:
+        name = f"{function.__module__.rpartition('.')[2]}.{function.__qualname__}"
+
+    @functools.wraps(function)
+    def wrapper(*args, **kwargs):
+        if _profiler is None:
+            return function(*args, **kwargs)
+
+        with _profiler.record(name, "function"):
+            return function(*args, **kwargs)
+
+    return wrapper
+
+
+def phase(name: str):
+    """Function for a context manager recording an internal phase while a profiler is active
+
+    Args:
+        name (str): name of the phase, e.g. "rolling mean"
+
+    Returns:
+        context manager: recording context, a shared no-op context if profiling is disabled
+
+    """
+    if _profiler is None:
+        return _NO_PHASE
+
+    return _profiler.record(name, "phase")
+
+
+def _process_path(path: str) -> str:
+    """Function for the output path of the current process
+
+    Args:
+        path (str): output path, optionally holding "{pid}"
+
+    Returns:
+        str: path with the process id, inserted before the suffix in worker processes if "{pid}" is missing
+
+    """
+    import multiprocessing
+
+    pid = str(os.getpid())
+
+    if "{pid}" in path:
+        return path.replace("{pid}", pid)
+
+    if multiprocessing.parent_process() is None:
+        return path
+
+    suffix = CHROME_TRACE_SUFFIX if path.endswith(CHROME_TRACE_SUFFIX) else os.path.splitext(path)[1]
+
+    return f"{path[:len(path) - len(suffix)]}.{pid}{suffix}"
+
+
+def _profile_process(path: str) -> None:
+    global _profiler
+
+    profiler = Profiler()
+    profiler.start()
+    _profiler = profiler
+
+    def write():
+        profiler.stop()
+        profiler.write(_process_path(path))
+
+    atexit.register(write)
+
+
+if os.environ.get(PROFILE_ENV_VARIABLE):
+    _profile_process(os.environ[PROFILE_ENV_VARIABLE])
@@ -0,0 +1,149 @@
+""" ETCCDI completeness rules for year matrices
+
+A station-year is valid if no month misses more than 3 days and the year misses no more than 15
+days (ETCCDI/RClimDEX). The missing days of all months and years of a year matrix are counted in
+one scan, and the resulting validity is stored as a compact bitmap (one bit per station-year).
+The batch index kernels accept the validity through their validity argument and then mask invalid
+station-years without scanning the values for gaps again.
+"""
+
+from typing import Tuple, Union
+import numpy as np
+
+from climate_tools.year_matrix import YearMatrix, DAYS_PER_YEAR_MATRIX
+
+MAX_MISSING_DAYS_MONTH = 3
+MAX_MISSING_DAYS_YEAR = 15
+
+# Slot after the last day of every month in the year matrix layout, for non-leap and leap years
+MONTH_END_SLOTS = np.cumsum([[31, 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31],
+                             [31, 29, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31]], axis=1)
+
+
+class ValidityBitmap:
+    """Validity of station-years packed into bits
+
+    Args:
+        bits (np.ndarray): packed bits (numpy.packbits of the flattened mask)
+        shape (tuple): shape of the mask, e.g. (stations, years)
+
+    """
+
+    def __init__(self,
+                 bits: np.ndarray,
+                 shape: Tuple[int, ...]):
+        self.bits = np.asarray(bits, dtype=np.uint8)
+        self.shape = tuple(shape)
+
+    @classmethod
+    def from_mask(cls,
+                  mask: np.ndarray) -> "ValidityBitmap":
+        """Function for packing a boolean validity mask
+
+        Args:
+            mask (np.ndarray): True for valid station-years
+
+        Returns:
+            ValidityBitmap: packed mask
+
+        """
+        mask = np.asarray(mask, dtype=bool)
+
+        return cls(np.packbits(mask.ravel()), mask.shape)
+
+    @property
+    def mask(self) -> np.ndarray:
+        """Boolean validity mask of the station-years"""
+        return np.unpackbits(self.bits, count=int(np.prod(self.shape))).reshape(self.shape).astype(bool)
+
+    @property
+    def nbytes(self) -> int:
+        return self.bits.nbytes
+
+
+VALIDITY = Union[ValidityBitmap, np.ndarray]
+
+
+def missing_days(data: Union[YearMatrix, np.ndarray]) -> Tuple[np.ndarray, np.ndarray]:
+    """Function for counting the missing days of every month and year of a year matrix
+
+    Args:
+        data (YearMatrix, np.ndarray): year matrix of daily values, plain arrays of shape (..., 366) are
+            treated as non-leap years
+
+    Returns:
+        tuple: missing days per month of shape (..., 12) and per year of shape (...)
+
+    """
+    if isinstance(data, YearMatrix):
+        values, day_mask, is_leap = data.values, data.day_mask, data.is_leap
+    else:
+        values = np.asarray(data)
+
+        if values.shape[-1] != DAYS_PER_YEAR_MATRIX:
+            raise ValueError("Error: expecting array with 366 days on the last axis.")
+
+        day_mask = np.arange(DAYS_PER_YEAR_MATRIX) < DAYS_PER_YEAR_MATRIX - 1
+        is_leap = np.zeros(values.shape[:-1], dtype=bool)
+
+    missing = np.cumsum(np.isnan(values) & day_mask, axis=-1, dtype=np.int16)
+
+    month_end = np.broadcast_to(MONTH_END_SLOTS[is_leap.astype(np.intp)], values.shape[:-1] + (12, ))
+
+    missing_until_month_end = np.take_along_axis(missing, month_end - 1, axis=-1)
+
+    missing_per_month = np.diff(missing_until_month_end, axis=-1, prepend=0)
+
+    return missing_per_month, missing_until_month_end[..., -1]
+
+
+def validity_mask(data: Union[YearMatrix, np.ndarray],
+                  max_missing_month: int = MAX_MISSING_DAYS_MONTH,
+                  max_missing_year: int = MAX_MISSING_DAYS_YEAR) -> np.ndarray:
+    """Function for applying the completeness rules to every station-year of a year matrix
+
+    Args:
+        data (YearMatrix, np.ndarray): year matrix of daily values
+        max_missing_month (int): maximal number of missing days per month
+        max_missing_year (int): maximal number of missing days per year
+
+    Returns:
+        np.ndarray: True for valid station-years
+
+    """
+    missing_per_month, missing_per_year = missing_days(data)
+
+    return np.all(missing_per_month <= max_missing_month, axis=-1) & (missing_per_year <= max_missing_year)
+
+
+def validity_bitmap(data: Union[YearMatrix, np.ndarray],
+                    max_missing_month: int = MAX_MISSING_DAYS_MONTH,
+                    max_missing_year: int = MAX_MISSING_DAYS_YEAR) -> ValidityBitmap:
+    """Function for the completeness rules of a year matrix as compact bitmap
+
+    Args:
+        data (YearMatrix, np.ndarray): year matrix of daily values
+        max_missing_month (int): maximal number of missing days per month
+        max_missing_year (int): maximal number of missing days per year
+
+    Returns:
+        ValidityBitmap: validity of the station-years
+
+    """
+    return ValidityBitmap.from_mask(validity_mask(data, max_missing_month, max_missing_year))
+
+
+def as_mask(validity: VALIDITY) -> np.ndarray:
+    """Function for the boolean mask of a validity bitmap or mask
+
+    Args:
+        validity (ValidityBitmap, np.ndarray): validity of the station-years
+
+    Returns:
+        np.ndarray: True for valid station-years
+
+    """
+    if isinstance(validity, ValidityBitmap):
+        return validity.mask
+
+    return np.asarray(validity, dtype=bool)
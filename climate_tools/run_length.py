@@ -0,0 +1,163 @@
+""" Vectorized run-length engine working on arrays of shape (n_series, n_days)
+
+All functions operate on whole arrays at once; the run boundaries are derived from
+comparisons of neighbouring days, so no Python level loop over the days is needed.
+"""
+
+from typing import Tuple, Union
+import numpy as np
+
+from climate_tools.profiling import phase
+
+
+def rle_2d(arr: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """Function for runlength encoding of every row of a two dimensional array. Runs never
+    cross row boundaries. A one dimensional array is treated as a single series.
+
+    Args:
+        arr (np.ndarray): value array of shape (n_series, n_days) or (n_days, )
+
+    Returns:
+        tuple: arrays of the series (row) index, start day, runlength and value of every run
+
+    """
+    arr = np.asarray(arr)
+
+    if arr.ndim == 1:
+        arr = arr[np.newaxis, :]
+
+    if arr.ndim != 2:
+        raise ValueError("Error: expecting array of shape (n_series, n_days).")
+
+    n_series, n_days = arr.shape
+
+    if arr.size == 0:
+        empty = np.zeros(0, dtype=np.intp)
+        return empty, empty, empty, arr.reshape(-1)
+
+    with phase("rle"):
+        change = np.ones(arr.shape, dtype=bool)
+        change[:, 1:] = arr[:, 1:] != arr[:, :-1]
+
+        series, starts = np.nonzero(change)
+
+        flat_starts = series * n_days + starts
+        lengths = np.diff(np.append(flat_starts, arr.size))
+
+        values = arr[series, starts]
+
+    return series, starts, lengths, values
+
+
+def longest_run(mask: np.ndarray) -> np.ndarray:
+    """Function for determining the greatest runlength of True values per series
+
+    Args:
+        mask (np.ndarray): boolean array of shape (n_series, n_days) or (n_days, )
+
+    Returns:
+        np.ndarray: greatest runlength per series, 0 if a series has no True value
+
+    """
+    mask = np.asarray(mask, dtype=bool)
+    mask_2d = np.atleast_2d(mask)
+
+    series, _, lengths, values = rle_2d(mask_2d)
+
+    result = np.zeros(mask_2d.shape[0], dtype=np.intp)
+    np.maximum.at(result, series[values], lengths[values])
+
+    if mask.ndim == 1:
+        return result[0]
+
+    return result
+
+
+def spell_mask(mask: np.ndarray,
+               min_length: int) -> np.ndarray:
+    """Function for marking all days that are part of a run of True values with a runlength of
+    at least min_length
+
+    Args:
+        mask (np.ndarray): boolean array of shape (n_series, n_days) or (n_days, )
+        min_length (int): minimal runlength of a spell
+
+    Returns:
+        np.ndarray: boolean array of the same shape, True where a day belongs to a spell
+
+    """
+    mask = np.asarray(mask, dtype=bool)
+    mask_2d = np.atleast_2d(mask)
+
+    n_series, n_days = mask_2d.shape
+
+    series, starts, lengths, values = rle_2d(mask_2d)
+
+    is_spell = values & (lengths >= min_length)
+
+    flat_starts = series[is_spell] * n_days + starts[is_spell]
+
+    delta = np.zeros(mask_2d.size + 1, dtype=np.intp)
+    np.add.at(delta, flat_starts, 1)
+    np.add.at(delta, flat_starts + lengths[is_spell], -1)
+
+    result = (np.cumsum(delta[:-1]) > 0).reshape(mask_2d.shape)
+
+    return result.reshape(mask.shape)
+
+
+def spell_days(mask: np.ndarray,
+               min_length: int) -> np.ndarray:
+    """Function for counting the days that are part of runs of True values with a runlength of
+    at least min_length
+
+    Args:
+        mask (np.ndarray): boolean array of shape (n_series, n_days) or (n_days, )
+        min_length (int): minimal runlength of a spell
+
+    Returns:
+        np.ndarray: count of spell days per series
+
+    """
+    mask = np.asarray(mask, dtype=bool)
+    mask_2d = np.atleast_2d(mask)
+
+    series, _, lengths, values = rle_2d(mask_2d)
+
+    is_spell = values & (lengths >= min_length)
+
+    result = np.zeros(mask_2d.shape[0], dtype=np.intp)
+    np.add.at(result, series[is_spell], lengths[is_spell])
+
+    if mask.ndim == 1:
+        return result[0]
+
+    return result
+
+
+def first_spell_start(mask: np.ndarray,
+                      min_length: int,
+                      after: Union[int, np.ndarray] = 0) -> np.ndarray:
+    """Function for finding the first day (index) at or after a given day that belongs to a run of
+    True values with a runlength of at least min_length
+
+    Args:
+        mask (np.ndarray): boolean array of shape (n_series, n_days) or (n_days, )
+        min_length (int): minimal runlength of a spell
+        after (int, np.ndarray): first day index that is considered, one per series or for all
+
+    Returns:
+        np.ndarray: day index per series, -1 if there is no such day
+
+    """
+    mask = np.asarray(mask, dtype=bool)
+    in_spell = np.atleast_2d(spell_mask(mask, min_length))
+    in_spell &= np.arange(in_spell.shape[1]) >= np.reshape(after, (-1, 1))
+
+    found = in_spell.any(axis=1)
+    result = np.where(found, np.argmax(in_spell, axis=1), -1)
+
+    if mask.ndim == 1:
+        return result[0]
+
+    return result
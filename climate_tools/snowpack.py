@@ -0,0 +1,229 @@
+""" Snowpack simulator advancing the degree-day and the Knauf energy balance for many cells at once
+
+The state of all cells (snow water equivalent and cold content) is kept in preallocated buffers of
+shape (n_cells, ) and updated in place by every step, so a catchment is simulated with one loop
+over the timesteps while all cells are handled by array operations. Timesteps are given in hours
+(1 for hourly, 24 for daily data).
+
+Per timestep and cell:
+    - precipitation at or below t_boundary falls as snow and adds to the snow water equivalent,
+      cold snow also adds the energy needed to warm it to 0 degC to the cold content
+    - the heat flux of the energy balance (W/m2) is converted into the energy of the timestep
+    - a negative energy increases the cold content (not beyond the energy of cooling the
+      snowpack down to the air temperature), a positive energy first reduces the cold content
+      and then melts snow
+    - the outflow is the melt water plus the rain
+"""
+
+from typing import Dict, Optional, Union
+import numpy as np
+
+from climate_tools.general_variables import MELTING_HEAT_WATER, HEAT_CAPACITY_ICE
+from climate_tools.meteorological_funtions import get_eb_snowpack_dd, get_eb_snowpack_knauf
+
+SNOWPACK_METHODS = ["dd", "knauf"]
+
+SNOWPACK_OUTPUTS = ["swe", "melt", "outflow"]
+
+
+class SnowpackSimulator:
+    """Simulator of the snowpack of n_cells cells
+
+    Args:
+        n_cells (int): number of cells
+        method (str): energy balance, "dd" (degree-day) or "knauf"
+        ta (float): length of a timestep in hours, e.g. 1 or 24
+        t_boundary (float): air temperature up to which precipitation falls as snow (degC)
+        degree_day_factor (float, np.ndarray): degree-day factor (mm/(degC*d)), method "dd"
+        also_snowmelt (bool): degree-day reference temperature is t_boundary instead of 0 degC,
+            method "dd"
+        a0 (float, np.ndarray): wind independent heat transfer coefficient (W/(m2*K)), method "knauf"
+        a1 (float, np.ndarray): wind dependent heat transfer coefficient (J/(m3*K)), method "knauf"
+        hf_ground (float, np.ndarray): ground heat flux (W/m2), method "knauf"
+        swe (float, np.ndarray): initial snow water equivalent (mm)
+        cold_content (float, np.ndarray): initial cold content (J/m2)
+
+    """
+
+    def __init__(self,
+                 n_cells: int,
+                 method: str = "dd",
+                 ta: float = 24,
+                 t_boundary: float = 0.0,
+                 degree_day_factor: Optional[Union[float, np.ndarray]] = None,
+                 also_snowmelt: bool = True,
+                 a0: Optional[Union[float, np.ndarray]] = None,
+                 a1: Optional[Union[float, np.ndarray]] = None,
+                 hf_ground: Union[float, np.ndarray] = 0.0,
+                 swe: Union[float, np.ndarray] = 0.0,
+                 cold_content: Union[float, np.ndarray] = 0.0):
+        if method not in SNOWPACK_METHODS:
+            raise ValueError(f"Error: method has to be one of {SNOWPACK_METHODS}.")
+
+        if ta <= 0:
+            raise ValueError("Error: expecting positive timestep length.")
+
+        if method == "dd" and degree_day_factor is None:
+            raise ValueError("Error: method 'dd' requires degree_day_factor.")
+
+        if method == "knauf" and (a0 is None or a1 is None):
+            raise ValueError("Error: method 'knauf' requires a0 and a1.")
+
+        self.n_cells = n_cells
+        self.method = method
+        self.ta = ta
+        self.t_boundary = t_boundary
+        self.degree_day_factor = degree_day_factor
+        self.also_snowmelt = also_snowmelt
+        self.a0 = a0
+        self.a1 = a1
+        self.hf_ground = hf_ground
+
+        # State
+        self.swe = np.empty(n_cells)
+        self.cold_content = np.empty(n_cells)
+        self.swe[:] = swe
+        self.cold_content[:] = cold_content
+
+        # Results of the last step
+        self.melt = np.zeros(n_cells)
+        self.outflow = np.zeros(n_cells)
+
+        # Scratch buffers
+        self._energy = np.empty(n_cells)
+        self._snowfall = np.empty(n_cells)
+        self._cold = np.empty(n_cells)
+        self._work = np.empty(n_cells)
+
+    def step(self,
+             prec: Union[float, np.ndarray],
+             t_air: Union[float, np.ndarray],
+             v: Optional[Union[float, np.ndarray]] = None) -> None:
+        """Function for advancing all cells by one timestep
+
+        Args:
+            prec (float, np.ndarray): precipitation of the timestep per cell (mm)
+            t_air (float, np.ndarray): air temperature per cell (degC)
+            v (float, np.ndarray): wind speed per cell (m/s), method "knauf"
+
+        """
+        energy, snowfall, cold, work = self._energy, self._snowfall, self._cold, self._work
+
+        # Heat flux (W/m2) -> energy of the timestep (J/m2)
+        if self.method == "dd":
+            get_eb_snowpack_dd(prec, t_air, self.t_boundary, self.ta, self.degree_day_factor, self.also_snowmelt,
+                               out=energy, work=work)
+        else:
+            if v is None:
+                raise ValueError("Error: method 'knauf' requires the wind speed v.")
+
+            get_eb_snowpack_knauf(self.a0, self.a1, v, t_air, prec, self.ta, self.hf_ground, out=energy, work=work)
+
+        np.multiply(energy, self.ta * 3600, out=energy)
+
+        # Temperature deficit of the air below 0 degC
+        np.negative(t_air, out=cold)
+        np.maximum(cold, 0, out=cold)
+
+        # Snowfall and its cold content, rain goes to the outflow
+        np.copyto(snowfall, 0.0)
+        np.copyto(snowfall, prec, where=np.less_equal(t_air, self.t_boundary))
+        np.subtract(prec, snowfall, out=self.outflow)
+
+        np.add(self.swe, snowfall, out=self.swe)
+        np.multiply(snowfall, cold, out=work)
+        np.multiply(work, HEAT_CAPACITY_ICE, out=work)
+        np.add(self.cold_content, work, out=self.cold_content)
+
+        # Cooling, limited by the cold content of a snowpack at air temperature
+        np.multiply(self.swe, cold, out=cold)
+        np.multiply(cold, HEAT_CAPACITY_ICE, out=cold)
+        np.subtract(self.cold_content, energy, out=work)
+        np.minimum(work, cold, out=work)
+        np.maximum(self.cold_content, work, out=work)
+        np.copyto(self.cold_content, work, where=np.less(energy, 0))
+
+        # Warming: reduce the cold content, melt with the remaining energy
+        np.maximum(energy, 0, out=energy)
+        np.minimum(energy, self.cold_content, out=work)
+        np.subtract(self.cold_content, work, out=self.cold_content)
+        np.subtract(energy, work, out=energy)
+
+        np.divide(energy, MELTING_HEAT_WATER, out=self.melt)
+        np.minimum(self.melt, self.swe, out=self.melt)
+        np.subtract(self.swe, self.melt, out=self.swe)
+        np.add(self.outflow, self.melt, out=self.outflow)
+
+        # Without snow there is no cold content
+        np.copyto(self.cold_content, 0.0, where=np.less_equal(self.swe, 0))
+
+    def run(self,
+            prec: np.ndarray,
+            t_air: np.ndarray,
+            v: Optional[np.ndarray] = None,
+            out: Optional[Dict[str, np.ndarray]] = None) -> Dict[str, np.ndarray]:
+        """Function for advancing all cells through a period
+
+        Args:
+            prec (np.ndarray): precipitation of shape (n_cells, n_timesteps), or broadcastable to it
+            t_air (np.ndarray): air temperature of shape (n_cells, n_timesteps), or broadcastable to it
+            v (np.ndarray): wind speed of shape (n_cells, n_timesteps), or broadcastable to it,
+                method "knauf"
+            out (dict): preallocated result arrays of shape (n_cells, n_timesteps) for some or all
+                of "swe", "melt" and "outflow"; only these are recorded if given
+
+        Returns:
+            dict: snow water equivalent, melt and outflow (mm) of shape (n_cells, n_timesteps) at
+            the end of every timestep
+
+        """
+        n_timesteps = np.shape(t_air)[-1]
+        shape = (self.n_cells, n_timesteps)
+
+        prec = np.broadcast_to(prec, shape)
+        t_air = np.broadcast_to(t_air, shape)
+
+        if v is not None:
+            v = np.broadcast_to(v, shape)
+
+        if out is None:
+            out = {output: np.empty(shape) for output in SNOWPACK_OUTPUTS}
+
+        for output, result in out.items():
+            if output not in SNOWPACK_OUTPUTS:
+                raise ValueError(f"Error: output has to be one of {SNOWPACK_OUTPUTS}.")
+
+            if result.shape != shape:
+                raise ValueError(f"Error: expecting output array of shape {shape}.")
+
+        for timestep in range(n_timesteps):
+            self.step(prec[:, timestep], t_air[:, timestep], None if v is None else v[:, timestep])
+
+            for output, result in out.items():
+                result[:, timestep] = getattr(self, output)
+
+        return out
+
+
+def simulate_snowpack(prec: np.ndarray,
+                      t_air: np.ndarray,
+                      v: Optional[np.ndarray] = None,
+                      **parameters) -> Dict[str, np.ndarray]:
+    """Function for simulating the snowpack of all cells of (n_cells, n_timesteps) arrays from an
+    empty snowpack
+
+    Args:
+        prec (np.ndarray): precipitation of shape (n_cells, n_timesteps) (mm)
+        t_air (np.ndarray): air temperature of shape (n_cells, n_timesteps) (degC)
+        v (np.ndarray): wind speed of shape (n_cells, n_timesteps) (m/s), method "knauf"
+        **parameters: parameters of SnowpackSimulator, e.g. method, ta, degree_day_factor
+
+    Returns:
+        dict: snow water equivalent, melt and outflow (mm) of shape (n_cells, n_timesteps)
+
+    """
+    n_cells = np.shape(t_air)[0]
+
+    simulator = SnowpackSimulator(n_cells, **parameters)
+
+    return simulator.run(prec, t_air, v)
@@ -0,0 +1,216 @@
+""" Single-pass kernels for the spell-based indices (CFD, CSU, CDD, threshold spells, GSL)
+
+The kernels scan an array of shape (n_series, n_days) once per series without building
+intermediate arrays. They are compiled with Numba if it is installed; otherwise the NumPy
+run-length engine is used, which returns identical results. The environment variable
+CLIMATE_TOOLS_KERNEL_BACKEND=numpy forces the NumPy backend. Numba is only imported (and the
+kernels compiled or loaded from its cache) on the first call of a kernel, which keeps the import
+of this module cheap.
+"""
+
+from typing import Union
+import importlib.util
+import os
+import operator
+import numpy as np
+
+from climate_tools.run_length import longest_run, spell_days, first_spell_start
+
+if importlib.util.find_spec("numba") is not None and \
+        os.environ.get("CLIMATE_TOOLS_KERNEL_BACKEND", "numba") != "numpy":
+    BACKEND = "numba"
+else:
+    BACKEND = "numpy"
+
+# Replaced by numba.prange before the kernels are compiled
+prange = range
+
+
+def _longest_spell_loop(values, thresholds, below, out):
+    for i in prange(values.shape[0]):
+        current = 0
+        maximum = 0
+        for j in range(values.shape[1]):
+            if (values[i, j] < thresholds[i, j]) if below else (values[i, j] > thresholds[i, j]):
+                current += 1
+                if current > maximum:
+                    maximum = current
+            else:
+                current = 0
+        out[i] = maximum
+
+
+def _spell_days_loop(values, thresholds, below, min_length, out):
+    for i in prange(values.shape[0]):
+        current = 0
+        total = 0
+        for j in range(values.shape[1]):
+            if (values[i, j] < thresholds[i, j]) if below else (values[i, j] > thresholds[i, j]):
+                current += 1
+            else:
+                if current >= min_length:
+                    total += current
+                current = 0
+        if current >= min_length:
+            total += current
+        out[i] = total
+
+
+def _growing_season_length_loop(values, num, min_length, jday_1jul, out):
+    for i in prange(values.shape[0]):
+        start = -1
+        end = -1
+        warm = 0
+        cold = 0
+        cold_start = 0
+        for j in range(values.shape[1]):
+            if values[i, j] > num:
+                warm += 1
+            else:
+                warm = 0
+            if start < 0 and warm >= min_length:
+                start = j - min_length + 1
+
+            if values[i, j] < num:
+                if cold == 0:
+                    cold_start = j
+                cold += 1
+            else:
+                cold = 0
+            if end < 0 and cold >= min_length and j > jday_1jul[i]:
+                end = max(cold_start, jday_1jul[i] + 1)
+
+            if start >= 0 and end >= 0:
+                break
+
+        if start < 0 or end < 0:
+            out[i] = 0
+        else:
+            out[i] = end - start + 1
+
+
+_compiled_kernels = {}
+
+
+def _kernel(loop):
+    """Compiled version of a loop kernel, compiled on first use"""
+    global prange
+
+    if loop not in _compiled_kernels:
+        import numba
+
+        prange = numba.prange
+        _compiled_kernels[loop] = numba.njit(parallel=True, cache=True)(loop)
+
+    return _compiled_kernels[loop]
+
+
+def _as_2d(values: np.ndarray) -> np.ndarray:
+    values = np.asarray(values)
+
+    if values.ndim == 1:
+        return values[np.newaxis, :]
+
+    if values.ndim != 2:
+        raise ValueError("Error: expecting array of shape (n_series, n_days).")
+
+    return values
+
+
+def _prepare(values: np.ndarray,
+             thresholds: Union[float, np.ndarray]):
+    values = _as_2d(values)
+
+    dtype = np.result_type(values, thresholds)
+
+    values = values.astype(dtype, copy=False)
+    thresholds = np.broadcast_to(np.asarray(thresholds, dtype=dtype), values.shape)
+
+    return values, thresholds
+
+
+def longest_spell(values: np.ndarray,
+                  thresholds: Union[float, np.ndarray],
+                  below: bool) -> np.ndarray:
+    """Function for the greatest number of consecutive days below (or above) a threshold per series
+
+    Args:
+        values (np.ndarray): value array of shape (n_series, n_days)
+        thresholds (float, np.ndarray): threshold, broadcast against the values
+        below (bool): True for days with values lower than the threshold, False for greater
+
+    Returns:
+        np.ndarray: greatest spell length per series
+
+    """
+    values, thresholds = _prepare(values, thresholds)
+
+    if BACKEND == "numba":
+        out = np.empty(values.shape[0], dtype=np.intp)
+        _kernel(_longest_spell_loop)(values, thresholds, below, out)
+        return out
+
+    op = operator.lt if below else operator.gt
+
+    return np.atleast_1d(longest_run(op(values, thresholds)))
+
+
+def threshold_spell_days(values: np.ndarray,
+                         thresholds: Union[float, np.ndarray],
+                         min_length: int,
+                         below: bool) -> np.ndarray:
+    """Function for the count of days in spells of at least min_length days below (or above) a threshold
+
+    Args:
+        values (np.ndarray): value array of shape (n_series, n_days)
+        thresholds (float, np.ndarray): threshold, broadcast against the values
+        min_length (int): minimal length of a spell
+        below (bool): True for days with values lower than the threshold, False for greater
+
+    Returns:
+        np.ndarray: count of spell days per series
+
+    """
+    values, thresholds = _prepare(values, thresholds)
+
+    if BACKEND == "numba":
+        out = np.empty(values.shape[0], dtype=np.intp)
+        _kernel(_spell_days_loop)(values, thresholds, below, min_length, out)
+        return out
+
+    op = operator.lt if below else operator.gt
+
+    return np.atleast_1d(spell_days(op(values, thresholds), min_length))
+
+
+def growing_season_length(values: np.ndarray,
+                          jday_1jul: Union[int, np.ndarray],
+                          num: float = 5.0,
+                          min_length: int = 6) -> np.ndarray:
+    """Function for the growing season length per series: from the first day of the first spell of
+    min_length days above num to the first day after the 1st of July that belongs to a spell of
+    min_length days below num, 0 if one of them does not exist
+
+    Args:
+        values (np.ndarray): daily mean temperature of shape (n_series, n_days)
+        jday_1jul (int, np.ndarray): day index of the 1st of July, one per series or for all
+        num (float): temperature threshold
+        min_length (int): minimal length of a spell
+
+    Returns:
+        np.ndarray: growing season length per series
+
+    """
+    values = _as_2d(values)
+    values = values.astype(np.result_type(values, num), copy=False)
+    jday_1jul = np.broadcast_to(np.asarray(jday_1jul, dtype=np.intp), values.shape[:1])
+
+    if BACKEND == "numba":
+        out = np.empty(values.shape[0], dtype=np.intp)
+        _kernel(_growing_season_length_loop)(values, values.dtype.type(num), min_length, jday_1jul, out)
+        return out
+
+    start = first_spell_start(values > num, min_length)
+    end = first_spell_start(values < num, min_length, after=jday_1jul + 1)
+
+    return np.where((start >= 0) & (end >= 0), end - start + 1, 0)
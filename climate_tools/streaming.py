@@ -0,0 +1,165 @@
+""" Streaming computation of annual indices for long station series
+
+The series is consumed as an iterator of chunks of daily records (e.g. pandas.DataFrames read with
+chunksize, or dicts of arrays), whose boundaries need not coincide with years. The records are
+written into a year buffer of 366 slots per variable; as soon as a record of a later year arrives,
+the buffered year is closed, reduced by the batch index kernels and yielded. At no time more than
+one year (plus the current chunk) is held in memory, so the length of the series is unbounded.
+
+Percentile based indices require their thresholds upfront (e.g. computed from the reference period
+with calculate_percentile_threshold and kept in a threshold cache).
+"""
+
+from typing import Dict, Iterable, Iterator, Mapping, Optional, Sequence, Tuple, Union
+import numpy as np
+
+from climate_tools.year_matrix import YearMatrix, DAYS_PER_YEAR_MATRIX
+from climate_tools.batch_indices import BATCH_INDICES, INDEX_VARIABLES, PERCENTILE_INDICES, \
+    WET_DAY_PERCENTILE_INDICES
+from climate_tools.quality import validity_bitmap, MAX_MISSING_DAYS_MONTH, MAX_MISSING_DAYS_YEAR
+
+
+def _index_variable(index: str) -> str:
+    if index in BATCH_INDICES:
+        return INDEX_VARIABLES[index]
+    if index in PERCENTILE_INDICES:
+        return PERCENTILE_INDICES[index][1]
+    if index in WET_DAY_PERCENTILE_INDICES:
+        return "prec"
+
+    raise ValueError(f"Error: unknown index '{index}'.")
+
+
+def _chunk_arrays(chunk: Mapping,
+                  date_column: str,
+                  variables: Sequence[str]) -> Tuple[np.ndarray, Dict[str, np.ndarray]]:
+    try:
+        dates = np.asarray(chunk[date_column]).astype("datetime64[D]")
+        values = {variable: np.asarray(chunk[variable], dtype=np.float64) for variable in variables}
+    except KeyError as error:
+        raise ValueError(f"Error: chunk has no column {error}.")
+
+    for variable, variable_values in values.items():
+        if variable_values.shape != dates.shape:
+            raise ValueError(f"Error: number of dates does not match the values of {variable}.")
+
+    return dates, values
+
+
+def _year_buffers(variables: Sequence[str]) -> Dict[str, np.ndarray]:
+    return {variable: np.full(DAYS_PER_YEAR_MATRIX, np.nan) for variable in variables}
+
+
+def split_years(chunks: Iterable[Mapping],
+                variables: Sequence[str],
+                date_column: str = "DATE") -> Iterator[Tuple[int, Dict[str, np.ndarray]]]:
+    """Function for regrouping chronological chunks of daily records into calendar years
+
+    Args:
+        chunks (iterable): chunks holding a date column and one column per variable, chronologically
+            ordered (a year may be spread over several chunks, a chunk may hold several years)
+        variables (list): variables to read, e.g. ["tmin", "prec"]
+        date_column (str): name of the date column
+
+    Returns:
+        iterator: tuples of the year and the values of every variable of shape (366, ) (slot i holds day of
+            year i + 1, NaN where missing), one per year from the first to the last year of the records
+
+    """
+    year = None
+    buffers = _year_buffers(variables)
+    last_date = None
+
+    for chunk in chunks:
+        dates, values = _chunk_arrays(chunk, date_column, variables)
+
+        if dates.size == 0:
+            continue
+
+        if np.any(dates[1:] < dates[:-1]) or (last_date is not None and dates[0] < last_date):
+            raise ValueError("Error: expecting chronologically ordered records.")
+
+        last_date = dates[-1]
+
+        years = dates.astype("datetime64[Y]").astype(int) + 1970
+        day_index = (dates - dates.astype("datetime64[Y]")).astype(int)
+
+        # Boundaries of the years within the (sorted) chunk
+        chunk_years, starts = np.unique(years, return_index=True)
+        ends = np.append(starts[1:], dates.size)
+
+        for chunk_year, start, end in zip(chunk_years.tolist(), starts, ends):
+            if year is not None and chunk_year > year:
+                # The buffered year is complete, followed by the years without records
+                for closed_year in range(year, chunk_year):
+                    yield closed_year, buffers
+
+                    buffers = _year_buffers(variables)
+
+            year = chunk_year
+
+            for variable, buffer in buffers.items():
+                buffer[day_index[start:end]] = values[variable][start:end]
+
+    if year is not None:
+        yield year, buffers
+
+
+def stream_indices(chunks: Iterable[Mapping],
+                   indices: Sequence[str],
+                   thresholds: Optional[Dict[str, Union[float, np.ndarray]]] = None,
+                   date_column: str = "DATE",
+                   etccdi_missing_rules: bool = False) -> Iterator[Tuple[int, Dict[str, float]]]:
+    """Function for computing annual indices of a station series that is read chunk by chunk, every
+    year is yielded as soon as the records of the following year arrive
+
+    Args:
+        chunks (iterable): chunks holding a date column and one column per variable, chronologically
+            ordered, e.g. pandas.read_csv(path, chunksize=100000, parse_dates=["DATE"])
+        indices (list): names of the batch indices, including the percentile indices (e.g. "tx90p", "r95p")
+        thresholds (dict): thresholds per percentile index, 365 day of year thresholds for the indices of
+            batch_indices.PERCENTILE_INDICES and one wet day threshold for batch_indices.WET_DAY_PERCENTILE_INDICES
+        date_column (str): name of the date column
+        etccdi_missing_rules (bool): accept years with up to 3 missing days per month and 15 per year
+            (ETCCDI) instead of complete years only
+
+    Returns:
+        iterator: tuples of the year and the value of every index, NaN for invalid years
+
+    """
+    thresholds = thresholds or {}
+
+    variables = sorted({_index_variable(index) for index in indices})
+
+    for index in indices:
+        if index not in BATCH_INDICES and index not in thresholds:
+            raise ValueError(f"Error: index '{index}' requires thresholds.")
+
+    max_missing = (MAX_MISSING_DAYS_MONTH, MAX_MISSING_DAYS_YEAR) if etccdi_missing_rules else (0, 0)
+
+    for year, values in split_years(chunks, variables, date_column):
+        year_matrices = {variable: YearMatrix(values[variable].reshape(1, 1, DAYS_PER_YEAR_MATRIX), [year])
+                         for variable in variables}
+
+        validities = {variable: validity_bitmap(year_matrix, *max_missing)
+                      for variable, year_matrix in year_matrices.items()}
+
+        results = {}
+
+        for index in indices:
+            variable = _index_variable(index)
+
+            if index in BATCH_INDICES:
+                result = BATCH_INDICES[index](year_matrices[variable], validities[variable])
+            elif index in PERCENTILE_INDICES:
+                result = PERCENTILE_INDICES[index][0](year_matrices[variable],
+                                                      np.reshape(thresholds[index], (1, -1)),
+                                                      validities[variable])
+            else:
+                result = WET_DAY_PERCENTILE_INDICES[index][0](year_matrices[variable],
+                                                              np.reshape(thresholds[index], (1, )),
+                                                              validities[variable])
+
+            results[index] = float(result[0, 0])
+
+        yield year, results
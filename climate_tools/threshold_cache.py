@@ -0,0 +1,306 @@
+""" Two-tier cache for the percentile thresholds of calculate_percentile_threshold
+
+The thresholds only depend on the data of the (window extended) reference period, its type and the
+parameters, so they are keyed by a content hash of exactly that data. The first tier is an
+in-process LRU, the second an optional directory of .npy files with a size cap; the least
+recently used files are evicted first.
+"""
+
+from __future__ import annotations
+
+from typing import Optional, Sequence, Tuple, Union
+from collections import OrderedDict
+import hashlib
+import os
+import tempfile
+import numpy as np
+
+from climate_tools._lazy import LazyModule
+from climate_tools.climate_indices import calculate_percentile_threshold
+from climate_tools.calendars import get_calendar_index
+from climate_tools.profiling import instrument
+
+# pandas is imported on first use
+pd = LazyModule("pandas")
+
+CACHE_DIR_ENV_VARIABLE = "CLIMATE_TOOLS_CACHE_DIR"
+DEFAULT_MAXSIZE = 128
+DEFAULT_MAX_DISK_BYTES = 512 * 1024 ** 2
+
+
+def threshold_cache_key(timeseries: pd.DataFrame,
+                        percentile: Union[float, Sequence[float]],
+                        reference_period: Tuple[int, int],
+                        window: int,
+                        min_percentage: float,
+                        calendar: str = "standard") -> str:
+    """Function for building the cache key of a threshold calculation from a content hash of the
+    reference period data, its type (float32 values are reduced in float32) and the parameters
+
+    Args:
+        timeseries (pd.DataFrame) - frame with dates in the first and values in the second column
+        percentile (float, list) - one percentile or a list of percentiles between 0 and 1
+        reference_period (tuple) - first and last year of the reference period
+        window (int) - length of the rolling mean in days
+        min_percentage (float) - minimal share of valid values per day of year
+        calendar (str) - calendar of the dates: "standard", "noleap" or "360_day" (see calendars)
+
+    Returns:
+        str: hexadecimal sha256 digest
+
+    """
+    if not isinstance(timeseries, pd.DataFrame):
+        raise TypeError("Error: expecting pandas.DataFrame as timeseries.")
+
+    half_window = int(window / 2)
+
+    # Positions of the dates in the calendar, extended by whole years beyond the reference period
+    padding = half_window // 360 + 1
+    calendar_index = get_calendar_index(calendar, reference_period[0] - padding, reference_period[1] + padding)
+
+    positions = calendar_index.date_positions(timeseries.iloc[:, 0].to_numpy())
+    dtype = timeseries.iloc[:, 1].dtype
+    values = timeseries.iloc[:, 1].to_numpy(dtype=np.float64)
+
+    # Days of the reference period and its rolling mean windows
+    selection = (positions >= calendar_index.year_start[padding] - half_window) & \
+        (positions < calendar_index.year_start[-padding] + half_window)
+    order = np.argsort(positions[selection], kind="stable")
+
+    digest = hashlib.sha256()
+    digest.update(positions[selection][order].astype(np.int64).tobytes())
+    digest.update(values[selection][order].tobytes())
+    digest.update(repr((np.atleast_1d(percentile).tolist(),
+                        tuple(reference_period),
+                        window,
+                        min_percentage,
+                        calendar_index.calendar,
+                        str(dtype))).encode())
+
+    return digest.hexdigest()
+
+
+class ThresholdCache:
+    """Cache for percentile thresholds with an in-process LRU and an optional on-disk tier
+
+    Args:
+        maxsize (int): maximal number of threshold sets kept in memory
+        directory (str): directory of the on-disk tier, None disables it
+        max_disk_bytes (int): size cap of the on-disk tier in bytes
+
+    """
+
+    def __init__(self,
+                 maxsize: int = DEFAULT_MAXSIZE,
+                 directory: Optional[str] = None,
+                 max_disk_bytes: int = DEFAULT_MAX_DISK_BYTES):
+        if not maxsize >= 0:
+            raise ValueError("Error: maxsize has to be greater equal 0.")
+        if not max_disk_bytes >= 0:
+            raise ValueError("Error: max_disk_bytes has to be greater equal 0.")
+
+        self.maxsize = maxsize
+        self.directory = directory
+        self.max_disk_bytes = max_disk_bytes
+
+        self._memory = OrderedDict()
+
+        if directory is not None:
+            os.makedirs(directory, exist_ok=True)
+
+    def _path(self,
+              key: str) -> str:
+        return os.path.join(self.directory, f"{key}.npy")
+
+    def get(self,
+            key: str) -> Optional[np.ndarray]:
+        """Function for looking up thresholds, first in memory and then on disk
+
+        Args:
+            key (str): cache key
+
+        Returns:
+            np.ndarray or None: thresholds of shape (days, percentiles) or None if not cached
+
+        """
+        if key in self._memory:
+            self._memory.move_to_end(key)
+            return self._memory[key]
+
+        if self.directory is None:
+            return None
+
+        path = self._path(key)
+
+        try:
+            thresholds = np.load(path)
+        except (OSError, ValueError):
+            return None
+
+        # Refresh the modification time that the eviction order is based on
+        os.utime(path)
+
+        self._put_memory(key, thresholds)
+
+        return thresholds
+
+    def put(self,
+            key: str,
+            thresholds: np.ndarray) -> None:
+        """Function for storing thresholds in both tiers
+
+        Args:
+            key (str): cache key
+            thresholds (np.ndarray): thresholds of shape (days, percentiles), days being 365 (360 for the
+                360-day calendar)
+
+        """
+        thresholds = np.array(thresholds, dtype=np.float64)
+        thresholds.flags.writeable = False
+
+        self._put_memory(key, thresholds)
+
+        if self.directory is None:
+            return
+
+        file_descriptor, temp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        with os.fdopen(file_descriptor, "wb") as file:
+            np.save(file, thresholds)
+        os.replace(temp_path, self._path(key))
+
+        self._evict_disk()
+
+    def _put_memory(self,
+                    key: str,
+                    thresholds: np.ndarray) -> None:
+        if self.maxsize == 0:
+            return
+
+        self._memory[key] = thresholds
+        self._memory.move_to_end(key)
+
+        while len(self._memory) > self.maxsize:
+            self._memory.popitem(last=False)
+
+    def _evict_disk(self) -> None:
+        entries = []
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith(".npy"):
+                stat = entry.stat()
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+
+        total_bytes = sum(size for _, size, _ in entries)
+
+        for _, size, path in sorted(entries):
+            if total_bytes <= self.max_disk_bytes:
+                break
+
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+            total_bytes -= size
+
+    def clear(self) -> None:
+        """Function for removing all entries of both tiers"""
+        self._memory.clear()
+
+        if self.directory is None:
+            return
+
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith(".npy"):
+                os.remove(entry.path)
+
+    def percentile_threshold(self,
+                             timeseries: pd.DataFrame,
+                             percentile: Union[float, Sequence[float]],
+                             reference_period: Tuple[int, int],
+                             window: int,
+                             min_percentage: float,
+                             calendar: str = "standard") -> Union[pd.Series, pd.DataFrame]:
+        """Function for calculate_percentile_threshold that returns cached thresholds if available
+
+        Args:
+            timeseries (pd.DataFrame) - frame with dates in the first and values in the second column
+            percentile (float, list) - one percentile or a list of percentiles between 0 and 1
+            reference_period (tuple) - first and last year of the 30 year reference period
+            window (int) - length of the rolling mean in days
+            min_percentage (float) - minimal share of valid values per day of year
+            calendar (str) - calendar of the dates: "standard", "noleap" or "360_day" (see calendars)
+
+        Returns:
+            pd.Series or pd.DataFrame: the 365 thresholds (360 for the 360-day calendar), one column per
+                percentile if a list is given
+
+        """
+        key = threshold_cache_key(timeseries, percentile, reference_period, window, min_percentage, calendar)
+
+        thresholds = self.get(key)
+
+        if thresholds is None:
+            result = calculate_percentile_threshold(timeseries, percentile, reference_period, window, min_percentage,
+                                                    calendar)
+
+            self.put(key, result.to_numpy().reshape(result.shape[0], -1))
+
+            return result
+
+        # Thresholds of float32 values are the rounded float64 thresholds
+        if timeseries.iloc[:, 1].dtype == np.float32:
+            thresholds = thresholds.astype(np.float32)
+
+        if isinstance(percentile, float):
+            return pd.Series(thresholds[:, 0])
+
+        return pd.DataFrame(thresholds, columns=np.asarray(percentile, dtype=float))
+
+
+_default_cache = None
+
+
+def get_default_cache() -> ThresholdCache:
+    """Function for the process wide threshold cache, its on-disk tier is located in the directory
+    given by the environment variable CLIMATE_TOOLS_CACHE_DIR (disabled if unset)
+
+    Returns:
+        ThresholdCache: the shared cache
+
+    """
+    global _default_cache
+
+    if _default_cache is None:
+        _default_cache = ThresholdCache(directory=os.environ.get(CACHE_DIR_ENV_VARIABLE))
+
+    return _default_cache
+
+
+@instrument
+def cached_percentile_threshold(timeseries: pd.DataFrame,
+                                percentile: Union[float, Sequence[float]],
+                                reference_period: Tuple[int, int],
+                                window: int,
+                                min_percentage: float,
+                                cache: Optional[ThresholdCache] = None,
+                                calendar: str = "standard") -> Union[pd.Series, pd.DataFrame]:
+    """Function for calculate_percentile_threshold backed by a threshold cache
+
+    Args:
+        timeseries (pd.DataFrame) - frame with dates in the first and values in the second column
+        percentile (float, list) - one percentile or a list of percentiles between 0 and 1
+        reference_period (tuple) - first and last year of the 30 year reference period
+        window (int) - length of the rolling mean in days
+        min_percentage (float) - minimal share of valid values per day of year
+        cache (ThresholdCache) - cache to use, defaults to the process wide cache
+        calendar (str) - calendar of the dates: "standard", "noleap" or "360_day" (see calendars)
+
+    Returns:
+        pd.Series or pd.DataFrame: the 365 thresholds (360 for the 360-day calendar), one column per
+            percentile if a list is given
+
+    """
+    if cache is None:
+        cache = get_default_cache()
+
+    return cache.percentile_threshold(timeseries, percentile, reference_period, window, min_percentage, calendar)
@@ -0,0 +1,256 @@
+""" Year-matrix data layout for batch computation of annual indices
+
+Daily values of many stations are stored in one padded array of shape (stations, years, 366).
+Day slot i of a year holds the day with day-of-year i + 1, so non-leap years leave the last slot
+empty (NaN). The layout keeps consecutive days next to each other, which is required by the
+spell-based indices.
+"""
+
+from typing import Optional, Sequence
+import numpy as np
+
+DAYS_PER_YEAR_MATRIX = 366
+
+
+def _years_of(dates: np.ndarray) -> np.ndarray:
+    return dates.astype("datetime64[Y]").astype(int) + 1970
+
+
+def _day_positions(dates: np.ndarray):
+    years_of_dates = _years_of(dates)
+    years = np.arange(years_of_dates.min(), years_of_dates.max() + 1)
+
+    year_index = years_of_dates - years[0]
+    day_index = (dates - dates.astype("datetime64[Y]")).astype(int)
+
+    return years, year_index, day_index
+
+
+def _matrix_dtype(data: np.ndarray,
+                  dtype: Optional[np.dtype]) -> np.dtype:
+    if dtype is not None:
+        if not np.issubdtype(dtype, np.floating):
+            raise ValueError("Error: expecting floating point dtype for the year matrix.")
+        return np.dtype(dtype)
+
+    return data.dtype if np.issubdtype(data.dtype, np.floating) else np.dtype(np.float64)
+
+
+def _is_leap(years: np.ndarray) -> np.ndarray:
+    return (years % 4 == 0) & ((years % 100 != 0) | (years % 400 == 0))
+
+
+class YearMatrix:
+    """Container for daily values of several stations in the layout (stations, years, 366)
+
+    Args:
+        values (np.ndarray): value array of shape (stations, years, 366), NaN where no value exists
+        years (np.ndarray): calendar years of the second axis
+        stations (sequence): station labels of the first axis, defaults to 0..n-1
+
+    """
+
+    def __init__(self,
+                 values: np.ndarray,
+                 years: Sequence[int],
+                 stations: Optional[Sequence] = None):
+        values = np.asarray(values)
+        years = np.asarray(years, dtype=int)
+
+        if values.ndim != 3 or values.shape[2] != DAYS_PER_YEAR_MATRIX:
+            raise ValueError("Error: expecting array of shape (stations, years, 366).")
+        if values.shape[1] != years.size:
+            raise ValueError("Error: number of years does not match the value array.")
+
+        if stations is None:
+            stations = np.arange(values.shape[0])
+        stations = np.asarray(stations)
+
+        if values.shape[0] != stations.size:
+            raise ValueError("Error: number of stations does not match the value array.")
+
+        self.values = values
+        self.years = years
+        self.stations = stations
+
+    @property
+    def shape(self):
+        return self.values.shape
+
+    @property
+    def is_leap(self) -> np.ndarray:
+        """Boolean array of shape (years, ) that is True for leap years"""
+        return _is_leap(self.years)
+
+    @property
+    def day_mask(self) -> np.ndarray:
+        """Boolean array of shape (years, 366) that is True for slots holding a calendar day"""
+        day_mask = np.ones((self.years.size, DAYS_PER_YEAR_MATRIX), dtype=bool)
+        day_mask[:, -1] = self.is_leap
+
+        return day_mask
+
+    @property
+    def leap_day_mask(self) -> np.ndarray:
+        """Boolean array of shape (years, 366) that is True for the slot of the 29th of February"""
+        leap_day_mask = np.zeros((self.years.size, DAYS_PER_YEAR_MATRIX), dtype=bool)
+        leap_day_mask[:, 59] = self.is_leap
+
+        return leap_day_mask
+
+    @property
+    def dates(self) -> np.ndarray:
+        """Array of shape (years, 366) with the date of every slot, NaT for padding slots"""
+        year_start = (self.years - 1970).astype("datetime64[Y]").astype("datetime64[D]")
+        dates = year_start[:, np.newaxis] + np.arange(DAYS_PER_YEAR_MATRIX)
+
+        return np.where(self.day_mask, dates, np.datetime64("NaT"))
+
+    @classmethod
+    def from_array(cls,
+                   data: np.ndarray,
+                   dates: Sequence,
+                   stations: Optional[Sequence] = None,
+                   dtype: Optional[np.dtype] = None) -> "YearMatrix":
+        """Function for building a year matrix from daily values of shape (days, ) or (days, stations)
+
+        Args:
+            data (np.ndarray): value array with the time axis first
+            dates (sequence): dates of the time axis
+            stations (sequence): station labels of the second axis
+            dtype (np.dtype): floating point type of the year matrix, e.g. np.float32 to halve the
+                memory, None for the type of the data (float64 for integer data)
+
+        Returns:
+            YearMatrix: padded year matrix spanning all years of the dates
+
+        """
+        data = np.asarray(data)
+        dates = np.asarray(dates, dtype="datetime64[D]")
+
+        if data.ndim == 1:
+            data = data[:, np.newaxis]
+
+        if data.shape[0] != dates.size:
+            raise ValueError("Error: number of dates does not match the value array.")
+
+        dtype = _matrix_dtype(data, dtype)
+
+        years, year_index, day_index = _day_positions(dates)
+
+        values = np.full((data.shape[1], years.size, DAYS_PER_YEAR_MATRIX), np.nan, dtype=dtype)
+        values[:, year_index, day_index] = data.T
+
+        return cls(values, years, stations)
+
+    @classmethod
+    def from_frame(cls,
+                   frame,
+                   date_column: str = "DATE",
+                   value_column: str = "VALUES",
+                   station_column: Optional[str] = None,
+                   dtype: Optional[np.dtype] = None) -> "YearMatrix":
+        """Function for building a year matrix from a long pandas.DataFrame with one row per
+        date (and station)
+
+        Args:
+            frame (pd.DataFrame): frame holding dates, values and optionally station labels
+            date_column (str): name of the date column
+            value_column (str): name of the value column
+            station_column (str): name of the station column, None for a single station
+            dtype (np.dtype): floating point type of the year matrix, None for the type of the data
+
+        Returns:
+            YearMatrix: padded year matrix of all stations
+
+        """
+        import pandas as pd
+
+        if not isinstance(frame, pd.DataFrame):
+            raise TypeError("Error: expecting pandas.DataFrame as frame.")
+
+        if station_column is None:
+            return cls.from_array(frame[value_column].to_numpy(),
+                                  frame[date_column].to_numpy(),
+                                  dtype=dtype)
+
+        station_codes, stations = pd.factorize(frame[station_column], sort=True)
+
+        return cls.from_long_arrays(frame[value_column].to_numpy(),
+                                    frame[date_column].to_numpy(),
+                                    station_codes,
+                                    np.asarray(stations),
+                                    dtype)
+
+    @classmethod
+    def from_long_arrays(cls,
+                         data: np.ndarray,
+                         dates: Sequence,
+                         station_codes: np.ndarray,
+                         stations: Sequence,
+                         dtype: Optional[np.dtype] = None) -> "YearMatrix":
+        """Function for building a year matrix from long arrays with one entry per date and station
+
+        Args:
+            data (np.ndarray): values
+            dates (sequence): date of every value
+            station_codes (np.ndarray): station of every value as position in stations
+            stations (sequence): station labels
+            dtype (np.dtype): floating point type of the year matrix, None for the type of the data
+
+        Returns:
+            YearMatrix: padded year matrix of all stations
+
+        """
+        data = np.asarray(data)
+        dates = np.asarray(dates).astype("datetime64[D]")
+        stations = np.asarray(stations)
+
+        if not data.size == dates.size == np.size(station_codes):
+            raise ValueError("Error: number of dates and stations does not match the value array.")
+
+        dtype = _matrix_dtype(data, dtype)
+
+        years, year_index, day_index = _day_positions(dates)
+
+        values = np.full((stations.size, years.size, DAYS_PER_YEAR_MATRIX), np.nan, dtype=dtype)
+        values[station_codes, year_index, day_index] = data
+
+        return cls(values, years, stations)
+
+    @classmethod
+    def from_series(cls,
+                    series) -> "YearMatrix":
+        """Function for building a year matrix of a single station from a pandas.Series with a
+        DatetimeIndex
+
+        Args:
+            series (pd.Series): daily values indexed by date
+
+        Returns:
+            YearMatrix: padded year matrix with one station
+
+        """
+        import pandas as pd
+
+        if not isinstance(series, pd.Series):
+            raise TypeError("Error: expecting pandas.Series as array.")
+
+        return cls.from_array(series.to_numpy(), series.index.to_numpy(), [series.name])
+
+    def to_frame(self,
+                 result: np.ndarray):
+        """Function for labelling a result array of shape (stations, years) as pandas.DataFrame
+
+        Args:
+            result (np.ndarray): result of a batch index
+
+        Returns:
+            pd.DataFrame: result with years as index and stations as columns
+
+        """
+        import pandas as pd
+
+        return pd.DataFrame(np.asarray(result).T,
+                            index=pd.Index(self.years, name="YEAR"),
+                            columns=pd.Index(self.stations, name="STATION"))
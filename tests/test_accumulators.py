@@ -0,0 +1,90 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from climate_tools import climate_indices
+from climate_tools.accumulators import ACCUMULATORS, AnnualIndexStream, IndexAccumulator, make_accumulator
+
+VARIABLES = {"number_of_fd": "tmin", "number_of_sd": "tmax", "number_of_id": "tmax", "number_of_tn": "tmin",
+             "rr10": "prec", "rr20": "prec", "consecutive_fd": "tmin", "consecutive_sd": "tmax",
+             "consecutive_dd": "prec", "sum_of_hdd": "tmean"}
+
+
+def _daily_values():
+    dates = pd.date_range("1999-01-01", "2001-12-31")
+    rng = np.random.default_rng(7)
+
+    seasonal_cycle = 9.0 + 12.0 * np.sin(2 * np.pi * (dates.dayofyear.to_numpy() - 105) / 365.25)
+    tmean = (seasonal_cycle + rng.normal(0.0, 4.0, dates.size)).round(1)
+
+    frame = pd.DataFrame({"tmin": tmean - 4.0, "tmax": tmean + 4.0, "tmean": tmean,
+                          "prec": np.where(rng.random(dates.size) < 0.4, rng.gamma(0.8, 8.0, dates.size), 0.0)},
+                         index=dates)
+
+    # The 1st of May 2001 is missing
+    return frame.drop(pd.Timestamp("2001-05-01"))
+
+
+def test_stream_matches_per_year_functions():
+    frame = _daily_values()
+
+    stream = AnnualIndexStream(VARIABLES)
+
+    results = []
+    for date, values in frame.iterrows():
+        result = stream.update(date.to_datetime64(), values.to_dict())
+
+        if result is not None:
+            results.append(result)
+
+    results.append(stream.finalize())
+
+    assert [result["YEAR"] for result in results] == [1999, 2000, 2001]
+
+    for result in results:
+        year = frame.loc[str(result["YEAR"])].reset_index(drop=True)
+
+        for index, variable in VARIABLES.items():
+            expected = getattr(climate_indices, index)(year[variable])
+
+            np.testing.assert_allclose(result[index], expected, err_msg=index)
+
+    assert np.isnan(results[-1]["number_of_fd"])
+
+
+def test_provisional_values():
+    accumulator = make_accumulator("consecutive_fd")
+
+    for value in [-1.0, -2.0, 3.0, -1.0]:
+        accumulator.update(value)
+
+    assert accumulator.value == 2
+
+    # Incomplete years are not finalized, the accumulator starts over
+    assert np.isnan(accumulator.finalize())
+    assert accumulator.value == 0
+
+
+def test_unknown_index_and_unordered_dates():
+    assert set(ACCUMULATORS) == set(VARIABLES)
+
+    with pytest.raises(ValueError):
+        make_accumulator("rx1day")
+
+    stream = AnnualIndexStream({"rr10": "prec"})
+    stream.update(np.datetime64("2000-01-02"), {"prec": 0.0})
+
+    with pytest.raises(ValueError):
+        stream.update(np.datetime64("2000-01-02"), {"prec": 0.0})
+
+
+def test_base_class_is_abstract():
+    class PartialAccumulator(IndexAccumulator):
+        def _update(self, value):
+            pass
+
+    with pytest.raises(TypeError):
+        IndexAccumulator()
+
+    with pytest.raises(TypeError):
+        PartialAccumulator()
@@ -0,0 +1,81 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+pa = pytest.importorskip("pyarrow")
+
+from climate_tools.arrow_io import read_station_arrays, read_year_matrices, write_index_results, \
+    write_index_table  # noqa: E402
+from climate_tools.year_matrix import YearMatrix  # noqa: E402
+
+
+def _long_frame():
+    dates = pd.date_range("1999-01-01", "2002-12-31")
+    rng = np.random.default_rng(9)
+
+    frames = [pd.DataFrame({"STATION": station, "DATE": dates, "YEAR": dates.year,
+                            "tmin": rng.normal(3.0, 6.0, dates.size).round(1)})
+              for station in ["b", "a"]]
+
+    return pd.concat(frames, ignore_index=True)
+
+
+def test_year_matrices_match_frame(tmp_path):
+    frame = _long_frame()
+    frame.to_parquet(tmp_path / "stations.parquet", index=False)
+
+    year_matrices = read_year_matrices(str(tmp_path / "stations.parquet"), ["tmin"], partitioning=None)
+    expected = YearMatrix.from_frame(frame, value_column="tmin", station_column="STATION")
+
+    np.testing.assert_array_equal(year_matrices["tmin"].stations, ["a", "b"])
+    np.testing.assert_array_equal(year_matrices["tmin"].years, expected.years)
+    np.testing.assert_array_equal(year_matrices["tmin"].values, expected.values)
+
+
+def test_year_range_of_partitioned_dataset(tmp_path):
+    frame = _long_frame()
+    frame.to_parquet(tmp_path / "dataset", partition_cols=["YEAR"], index=False)
+
+    arrays = read_station_arrays(str(tmp_path / "dataset"), ["tmin"], years=(2000, 2001))
+
+    selection = frame["DATE"].dt.year.isin([2000, 2001])
+
+    assert arrays["dates"].min() == np.datetime64("2000-01-01")
+    assert arrays["dates"].max() == np.datetime64("2001-12-31")
+    assert arrays["tmin"].size == selection.sum()
+    np.testing.assert_allclose(np.sort(arrays["tmin"]), np.sort(frame.loc[selection, "tmin"]))
+
+
+def test_year_range_without_records(tmp_path):
+    _long_frame().to_parquet(tmp_path / "dataset", partition_cols=["YEAR"], index=False)
+
+    with pytest.raises(ValueError, match="no records in the years 2010 to 2011"):
+        read_year_matrices(str(tmp_path / "dataset"), ["tmin"], years=(2010, 2011))
+
+
+def test_index_results_round_trip(tmp_path):
+    results = {"number_of_fd": np.array([[10.0, np.nan, 12.0], [1.0, 2.0, 3.0]]),
+               "rr10": np.array([[5.0, 6.0, 7.0], [8.0, 9.0, 10.0]])}
+    years = [2009, 2010, 2011]
+
+    write_index_results(results, years, ["a", "b"], str(tmp_path / "results"))
+
+    table = pa.dataset.dataset(str(tmp_path / "results"), partitioning="hive").to_table().to_pandas()
+
+    assert sorted(table["DECADE"].unique()) == [2000, 2010]
+
+    for index, result in results.items():
+        rows = table[table["INDEX"] == index].sort_values(["STATION", "YEAR"])
+
+        np.testing.assert_array_equal(rows["VALUE"].to_numpy().reshape(2, 3), result)
+
+    # The results table of the command line runner gives the same dataset
+    wide = pd.DataFrame({"STATION": np.repeat(["a", "b"], 3), "YEAR": years * 2,
+                         "number_of_fd": results["number_of_fd"].ravel(), "rr10": results["rr10"].ravel()})
+
+    write_index_table(wide, str(tmp_path / "table"))
+
+    written = pa.dataset.dataset(str(tmp_path / "table"), partitioning="hive").to_table().to_pandas()
+
+    pd.testing.assert_frame_equal(written.sort_values(["INDEX", "STATION", "YEAR"], ignore_index=True),
+                                  table.sort_values(["INDEX", "STATION", "YEAR"], ignore_index=True))
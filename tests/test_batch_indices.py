@@ -0,0 +1,132 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from climate_tools import batch_indices, climate_indices, spell_kernels
+from climate_tools.quality import validity_bitmap
+from climate_tools.year_matrix import YearMatrix
+
+
+def test_growing_season_length_leap_year_with_missing_last_day():
+    dates = pd.date_range("2000-01-01", "2000-12-31")
+
+    # Warm from the 10th of January, cold from the 20th of June on
+    tmean = np.where((dates.dayofyear >= 10) & (dates.dayofyear < 172), 10.0, 0.0)
+
+    complete = YearMatrix.from_array(tmean[:, np.newaxis], dates.values)
+
+    tmean[-1] = np.nan
+    incomplete = YearMatrix.from_array(tmean[:, np.newaxis], dates.values)
+
+    expected = batch_indices.growing_season_length(complete)
+
+    assert expected[0, 0] == 176
+    assert batch_indices.growing_season_length(incomplete, validity_bitmap(incomplete))[0, 0] == expected[0, 0]
+
+
+PER_YEAR_INDICES = ["number_of_fd", "number_of_sd", "number_of_id", "number_of_tn", "sum_of_hdd", "rr10", "rr20",
+                    "consecutive_fd", "consecutive_sd", "consecutive_dd", "growing_season_length"]
+
+MISSING_DAY = 800
+
+
+def _station_values(variable, n_stations=4):
+    dates = pd.date_range("1999-01-01", "2002-12-31")
+    rng = np.random.default_rng(4)
+
+    shape = (dates.size, n_stations)
+
+    if variable == "prec":
+        values = np.where(rng.random(shape) < 0.4, rng.gamma(0.8, 8.0, shape), 0.0).round(1)
+    else:
+        offset = {"tmin": -4.0, "tmean": 0.0, "tmax": 4.0}[variable]
+        seasonal_cycle = 9.0 + offset + 12.0 * np.sin(2 * np.pi * (dates.dayofyear.to_numpy() - 105) / 365.25)
+        values = (seasonal_cycle[:, np.newaxis] + rng.normal(0.0, 4.0, shape)).round(1)
+
+    # One day of the second station is missing in 2001
+    values[MISSING_DAY, 1] = np.nan
+
+    return dates, values
+
+
+def _year_series(dates, values, station, year):
+    series = pd.Series(values[:, station], index=dates)[str(year)]
+
+    return series.dropna().reset_index(drop=True)
+
+
+def test_batch_indices_match_per_year_functions():
+    for index in PER_YEAR_INDICES:
+        dates, values = _station_values(batch_indices.INDEX_VARIABLES[index])
+        year_matrix = YearMatrix.from_array(values, dates.values)
+
+        result = batch_indices.BATCH_INDICES[index](year_matrix)
+
+        function = getattr(climate_indices, index)
+        expected = [[function(_year_series(dates, values, station, year)) for year in year_matrix.years]
+                    for station in range(values.shape[1])]
+
+        np.testing.assert_allclose(result, np.array(expected, dtype=float), err_msg=index)
+
+    assert np.isnan(result[1, 2])
+
+
+def test_precipitation_indices_match_pandas():
+    dates, values = _station_values("prec")
+    year_matrix = YearMatrix.from_array(values, dates.values)
+
+    frame = pd.DataFrame(values, index=dates)
+    complete = frame.notna().groupby(frame.index.year).all().to_numpy().T
+    wet = frame.where(frame >= 1.0)
+
+    expected = {
+        "rx1day": frame.groupby(frame.index.year).max(),
+        "rx5day": frame.groupby(frame.index.year).apply(lambda year: year.rolling(5).sum().max()),
+        "prcptot": wet.groupby(wet.index.year).sum(),
+        "sdii": wet.groupby(wet.index.year).mean(),
+    }
+
+    for index, reference in expected.items():
+        reference = np.where(complete, reference.to_numpy().T, np.nan)
+
+        np.testing.assert_allclose(batch_indices.BATCH_INDICES[index](year_matrix), reference, err_msg=index)
+
+    thresholds = climate_indices.calculate_batch_wet_day_percentile(year_matrix, 0.95, (1980, 2009))
+    r95p = wet.where(wet > thresholds).groupby(wet.index.year).sum().to_numpy().T
+
+    np.testing.assert_allclose(batch_indices.r95p(year_matrix, thresholds), np.where(complete, r95p, np.nan))
+
+
+def _all_batch_results(tmax):
+    thresholds = climate_indices.calculate_batch_percentile_threshold(tmax, 0.9, (1980, 2009), 5, 0.1)
+
+    results = {index: function(tmax) for index, function in batch_indices.BATCH_INDICES.items()}
+    results["wsdi"] = batch_indices.wsdi(tmax, thresholds)
+    results["csdi"] = batch_indices.csdi(tmax, thresholds)
+
+    return results
+
+
+@pytest.mark.skipif(spell_kernels.BACKEND != "numba", reason="Numba is not installed")
+def test_numba_and_numpy_backends_agree(monkeypatch):
+    dates, values = _station_values("tmax")
+    tmax = YearMatrix.from_array(values, dates.values)
+
+    numba_results = _all_batch_results(tmax)
+
+    monkeypatch.setattr(spell_kernels, "BACKEND", "numpy")
+    numpy_results = _all_batch_results(tmax)
+
+    for index, result in numba_results.items():
+        np.testing.assert_array_equal(result, numpy_results[index], err_msg=index)
+
+
+def test_compact_mode_matches_float_results():
+    dates, values = _station_values("tmin")
+    year_matrix = YearMatrix.from_array(values, dates.values, dtype=np.float32)
+
+    for index in ["number_of_fd", "consecutive_fd", "sum_of_hdd"]:
+        compact = batch_indices.BATCH_INDICES[index](year_matrix, compact=True)
+
+        np.testing.assert_allclose(batch_indices.from_compact(compact), batch_indices.BATCH_INDICES[index](year_matrix),
+                                   rtol=1e-6, err_msg=index)
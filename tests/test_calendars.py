@@ -0,0 +1,65 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from climate_tools.calendars import CalendarIndex, date_fields, get_calendar_index, normalize_calendar
+
+
+def test_standard_calendar_matches_pandas():
+    calendar_index = CalendarIndex("standard", 1999, 2001)
+
+    dates = pd.date_range("1999-01-01", "2001-12-31")
+
+    assert calendar_index.n_days == dates.size
+    np.testing.assert_array_equal(calendar_index.date_positions(dates.values), np.arange(dates.size))
+    np.testing.assert_array_equal(calendar_index.day_of_year, dates.dayofyear)
+    np.testing.assert_array_equal(calendar_index.is_leap_day, (dates.month == 2) & (dates.day == 29))
+
+    # The 29th of February and the 28th of February share their reference day
+    leap_day = calendar_index.date_positions(np.array(["2000-02-29"], dtype="datetime64[D]"))[0]
+    assert calendar_index.reference_day_of_year[leap_day] == 59
+    assert calendar_index.reference_day_of_year[-1] == 365
+
+
+def test_noleap_and_360_day_calendars():
+    noleap = CalendarIndex("365_day", 2000, 2001)
+
+    assert noleap.calendar == "noleap"
+    assert noleap.n_days == 730
+    assert noleap.positions(np.array([2000]), np.array([2]), np.array([29]))[0] == -1
+
+    calendar_360 = CalendarIndex("360_day", 2000, 2001)
+
+    assert calendar_360.n_days == 720
+    assert calendar_360.n_reference_days == 360
+    np.testing.assert_array_equal(calendar_360.date_positions(["2000-02-30", "2001-12-30", "2001-12-31"]),
+                                  [59, 719, -1])
+
+
+def test_date_fields_of_strings_and_objects():
+    class Date:
+        def __init__(self, year, month, day):
+            self.year, self.month, self.day = year, month, day
+
+    expected = ([2000, 2001], [2, 12], [30, 1])
+
+    for dates in [["2000-02-30", "2001-12-01T12:00"], np.array([Date(2000, 2, 30), Date(2001, 12, 1)])]:
+        for fields, expected_fields in zip(date_fields(dates), expected):
+            np.testing.assert_array_equal(fields, expected_fields)
+
+
+def test_window_neighbours():
+    calendar_index = CalendarIndex("noleap", 2000, 2000)
+
+    neighbours = calendar_index.window_neighbours(5)
+
+    np.testing.assert_array_equal(neighbours[0], [-1, -1, 0, 1, 2])
+    np.testing.assert_array_equal(neighbours[100], [98, 99, 100, 101, 102])
+    assert not neighbours.flags.writeable
+
+
+def test_calendar_index_is_shared():
+    assert get_calendar_index("gregorian", 1961, 1990) is get_calendar_index("standard", 1961, 1990)
+
+    with pytest.raises(ValueError):
+        normalize_calendar("julian")
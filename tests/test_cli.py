@@ -0,0 +1,93 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+from climate_tools import batch_indices
+from climate_tools.cli import compute_station_batch, find_station_files, main, parse_size
+from climate_tools.year_matrix import YearMatrix
+
+INDICES = ["number_of_fd", "rr10", "consecutive_dd"]
+
+
+def _station_frame(seed):
+    dates = pd.date_range("2000-01-01", "2002-12-31")
+    rng = np.random.default_rng(seed)
+
+    return pd.DataFrame({"Date": dates,
+                         "TN": rng.normal(3.0, 6.0, dates.size).round(1),
+                         "prec": np.where(rng.random(dates.size) < 0.4, rng.gamma(0.8, 8.0, dates.size), 0.0).round(1)})
+
+
+def _expected(frame, index):
+    variable = {"tmin": "TN", "prec": "prec"}[batch_indices.INDEX_VARIABLES[index]]
+    year_matrix = YearMatrix.from_array(frame[variable].to_numpy(), frame["Date"].values)
+
+    return batch_indices.BATCH_INDICES[index](year_matrix)[0]
+
+
+def _station_directory(tmp_path):
+    frames = {"s1": _station_frame(1), "s2": _station_frame(2)}
+
+    frames["s1"].to_csv(tmp_path / "s1.csv", index=False)
+    frames["s2"].to_parquet(tmp_path / "s2.parquet", index=False)
+    (tmp_path / "notes.txt").write_text("not a station file")
+
+    return frames
+
+
+def test_compute_station_batch(tmp_path):
+    frames = _station_directory(tmp_path)
+
+    pd.DataFrame({"Date": ["2000-01-01"]}).to_csv(tmp_path / "broken.csv", index=False)
+
+    paths = find_station_files(str(tmp_path))
+
+    assert [os.path.basename(path) for path in paths] == ["broken.csv", "s1.csv", "s2.parquet"]
+
+    result, errors = compute_station_batch(paths, INDICES, date_column="date", columns={"tmin": "TN"})
+
+    assert list(errors) == [paths[0]]
+    assert result["STATION"].tolist() == ["s1"] * 3 + ["s2"] * 3
+    assert result["YEAR"].tolist() == [2000, 2001, 2002] * 2
+
+    for station, frame in frames.items():
+        for index in INDICES:
+            np.testing.assert_array_equal(result.loc[result["STATION"] == station, index], _expected(frame, index))
+
+
+def test_main(tmp_path):
+    directory = tmp_path / "stations"
+    directory.mkdir()
+
+    frames = _station_directory(directory)
+    output = tmp_path / "indices.csv"
+
+    status = main([str(directory), "--indices", *INDICES, "--output", str(output), "--workers", "1",
+                   "--batch-size", "1", "--column", "tmin=TN", "--date-column", "Date", "--quiet"])
+
+    assert status == 0
+
+    table = pd.read_csv(output)
+
+    assert table.columns.tolist() == ["STATION", "YEAR"] + INDICES
+    np.testing.assert_array_equal(table.loc[table["STATION"] == "s2", "rr10"], _expected(frames["s2"], "rr10"))
+
+
+def test_duplicate_station_labels(tmp_path, capsys):
+    frames = _station_directory(tmp_path)
+    frames["s1"].to_parquet(tmp_path / "s1.parquet", index=False)
+
+    output = tmp_path / "indices.csv"
+
+    status = main([str(tmp_path), "--indices", "rr10", "--output", str(output), "--workers", "1", "--quiet"])
+
+    assert status == 1
+    assert pd.read_csv(output)["STATION"].unique().tolist() == ["s2"]
+    assert capsys.readouterr().err.count("station label 's1' is shared") == 2
+
+
+def test_parse_size():
+    assert parse_size("512") == 512
+    assert parse_size("2K") == 2048
+    assert parse_size("1.5gb") == 3 * 1024 ** 3 // 2
@@ -0,0 +1,123 @@
+import numpy as np
+import pandas as pd
+
+from climate_tools import batch_indices, climate_indices
+from climate_tools.year_matrix import YearMatrix
+
+REFERENCE_PERIOD = (1961, 1990)
+
+
+def _station_frames(n_stations=2):
+    dates = pd.date_range("1960-01-01", "1991-12-31")
+    rng = np.random.default_rng(5)
+
+    seasonal_cycle = 9.0 + 10.0 * np.sin(2 * np.pi * (dates.dayofyear.to_numpy() - 105) / 365.25)
+    values = (seasonal_cycle[:, np.newaxis] + rng.normal(0.0, 3.5, (dates.size, n_stations))).round(1)
+
+    # A gap in the reference period of the first station
+    values[3000:3100, 0] = np.nan
+
+    return dates, values, [pd.DataFrame({"DATE": dates, "VALUE": values[:, station]})
+                           for station in range(n_stations)]
+
+
+def test_percentile_list_matches_single_percentiles():
+    _, _, frames = _station_frames()
+
+    thresholds = climate_indices.calculate_percentile_threshold(frames[0], [0.1, 0.9], REFERENCE_PERIOD, 5, 0.9)
+
+    assert thresholds.shape == (365, 2)
+
+    for percentile in [0.1, 0.9]:
+        single = climate_indices.calculate_percentile_threshold(frames[0], percentile, REFERENCE_PERIOD, 5, 0.9)
+
+        np.testing.assert_array_equal(thresholds[percentile].to_numpy(), single.to_numpy())
+
+
+def test_batch_thresholds_match_single_stations():
+    dates, values, frames = _station_frames()
+
+    year_matrix = YearMatrix.from_array(values, dates.values)
+
+    thresholds = climate_indices.calculate_batch_percentile_threshold(year_matrix, [0.1, 0.9], REFERENCE_PERIOD, 5, 0.9)
+
+    for station, frame in enumerate(frames):
+        expected = climate_indices.calculate_percentile_threshold(frame, [0.1, 0.9], REFERENCE_PERIOD, 5, 0.9)
+
+        np.testing.assert_allclose(thresholds[station], expected.to_numpy())
+
+
+def test_bootstrap_thresholds():
+    _, _, frames = _station_frames()
+
+    thresholds = climate_indices.calculate_bootstrap_percentile_threshold(frames[1], 0.9, REFERENCE_PERIOD, 5, 0.9,
+                                                                          n_replicates=3, seed=1)
+
+    assert sorted(thresholds) == list(range(REFERENCE_PERIOD[0], REFERENCE_PERIOD[1] + 1))
+    assert thresholds[1961].shape == (3, 365)
+
+    # The draws of every year are independent of the distribution on workers
+    distributed = climate_indices.calculate_bootstrap_percentile_threshold(frames[1], 0.9, REFERENCE_PERIOD, 5, 0.9,
+                                                                           n_replicates=3, seed=1, workers=2)
+
+    for year, year_thresholds in thresholds.items():
+        np.testing.assert_array_equal(year_thresholds, distributed[year])
+
+    # Replacing a year by itself leaves the thresholds of the reference period unchanged, so the
+    # replicates of all 29 other years scatter around them
+    complete = climate_indices.calculate_bootstrap_percentile_threshold(frames[1], 0.9, REFERENCE_PERIOD, 5, 0.9)
+    reference = climate_indices.calculate_percentile_threshold(frames[1], 0.9, REFERENCE_PERIOD, 5, 0.9)
+
+    assert complete[1975].shape == (29, 365)
+    assert np.abs(complete[1975].mean(axis=0) - reference.to_numpy()).max() < 1.0
+
+
+def test_calendars_of_thresholds():
+    _, _, frames = _station_frames()
+
+    frame = frames[1]
+
+    standard = climate_indices.calculate_percentile_threshold(frame, 0.9, REFERENCE_PERIOD, 5, 0.9)
+    gregorian = climate_indices.calculate_percentile_threshold(frame, 0.9, REFERENCE_PERIOD, 5, 0.9,
+                                                               calendar="gregorian")
+
+    np.testing.assert_array_equal(standard.to_numpy(), gregorian.to_numpy())
+
+    # The 29th of February does not exist in the noleap calendar
+    not_leap_day = ~((frame["DATE"].dt.month == 2) & (frame["DATE"].dt.day == 29))
+    noleap = climate_indices.calculate_percentile_threshold(frame[not_leap_day], 0.9, REFERENCE_PERIOD, 5, 0.9,
+                                                            calendar="noleap")
+
+    assert noleap.size == 365
+
+    # A 360-day calendar has 30 days in every month
+    dates_360 = [f"{year}-{month:02d}-{day:02d}" for year in range(1960, 1992) for month in range(1, 13)
+                 for day in range(1, 31)]
+    frame_360 = pd.DataFrame({"DATE": dates_360, "VALUE": np.random.default_rng(6).normal(0.0, 1.0, len(dates_360))})
+
+    thresholds_360 = climate_indices.calculate_percentile_threshold(frame_360, 0.9, REFERENCE_PERIOD, 5, 0.9,
+                                                                    calendar="360_day")
+
+    assert thresholds_360.size == 360
+    assert not thresholds_360.isna().any()
+
+
+def test_exceedance_spells_match_per_year_function():
+    dates, values, frames = _station_frames()
+
+    year_matrix = YearMatrix.from_array(values, dates.values)
+    thresholds = climate_indices.calculate_batch_percentile_threshold(year_matrix, 0.9, REFERENCE_PERIOD, 5, 0.9)
+
+    result = batch_indices.wsdi(year_matrix, thresholds)
+
+    for station in range(values.shape[1]):
+        series = pd.Series(values[:, station], index=dates)
+
+        for year_index, year in enumerate(year_matrix.years):
+            year_series = series[str(year)].reset_index(drop=True)
+            expected = climate_indices.number_of_wd(year_series, pd.Series(thresholds[station]))
+
+            if year_series.isna().any():
+                assert np.isnan(result[station, year_index])
+            else:
+                assert result[station, year_index] == expected
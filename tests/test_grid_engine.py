@@ -0,0 +1,79 @@
+import numpy as np
+import pandas as pd
+
+from climate_tools import batch_indices
+from climate_tools.grid_engine import compute_grid_indices
+from climate_tools.year_matrix import YearMatrix
+
+FILL_VALUE = -9999.0
+
+
+class ZarrLikeCube:
+    """Array with a fill_value attribute, sliced like a Zarr array"""
+
+    def __init__(self, values, fill_value):
+        self.values = values
+        self.fill_value = fill_value
+        self.shape = values.shape
+        self.dtype = values.dtype
+
+    def __getitem__(self, key):
+        return self.values[key]
+
+
+class NetCDFLikeCube(ZarrLikeCube):
+    """Array returning masked slices like a NetCDF variable with auto masking"""
+
+    def __getitem__(self, key):
+        return np.ma.masked_equal(self.values[key], self.fill_value)
+
+
+def _cube():
+    dates = pd.date_range("2000-01-01", "2002-12-31")
+    rng = np.random.default_rng(0)
+
+    values = rng.normal(2.0, 5.0, (dates.size, 3, 4)).round(1)
+
+    # One day of cell (1, 2) is missing in the second year
+    values[400, 1, 2] = FILL_VALUE
+
+    return dates, values
+
+
+def _expected(dates, values, index):
+    values = np.where(values == FILL_VALUE, np.nan, values)
+    year_matrix = YearMatrix.from_array(values.reshape(dates.size, -1), dates.values)
+
+    return batch_indices.BATCH_INDICES[index](year_matrix).T.reshape(-1, *values.shape[1:])
+
+
+def test_plain_cube(tmp_path):
+    dates, values = _cube()
+    values[400, 1, 2] = np.nan
+
+    results = compute_grid_indices(values, dates.values, ["number_of_fd"], str(tmp_path))
+
+    np.testing.assert_array_equal(results["number_of_fd"], _expected(dates, values, "number_of_fd"))
+
+
+def test_fill_values_are_missing(tmp_path):
+    dates, values = _cube()
+
+    for cube in [ZarrLikeCube(values, FILL_VALUE), NetCDFLikeCube(values, FILL_VALUE)]:
+        results = compute_grid_indices(cube, dates.values, ["number_of_fd", "rx1day"], str(tmp_path))
+
+        for index in ["number_of_fd", "rx1day"]:
+            np.testing.assert_array_equal(results[index], _expected(dates, values, index))
+
+        assert np.isnan(results["number_of_fd"][1, 1, 2])
+        assert not np.isnan(results["number_of_fd"][0, 1, 2])
+
+
+def test_tiles_match_whole_cube(tmp_path):
+    dates, values = _cube()
+
+    whole = compute_grid_indices(values, dates.values, ["consecutive_fd"], str(tmp_path / "whole"))
+    tiled = compute_grid_indices(values, dates.values, ["consecutive_fd"], str(tmp_path / "tiled"),
+                                 max_chunk_bytes=1)
+
+    np.testing.assert_array_equal(whole["consecutive_fd"], tiled["consecutive_fd"])
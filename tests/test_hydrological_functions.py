@@ -0,0 +1,21 @@
+import numpy as np
+import pytest
+
+from climate_tools.general_variables import LAI_TABLE
+from climate_tools.hydrological_functions import get_lai, get_land_use_code
+
+
+def test_lai_lookup():
+    land_use = np.array([get_land_use_code("ACRE"), -1])
+
+    lai = get_lai(land_use, np.array([[1], [12]]))
+
+    assert lai[0, 0] == LAI_TABLE[land_use[0], 0]
+    assert lai[1, 0] == LAI_TABLE[land_use[0], 11]
+    assert np.isnan(lai[:, 1]).all()
+
+
+@pytest.mark.parametrize("month", [0, 13, [1, 13]])
+def test_lai_of_invalid_months(month):
+    with pytest.raises(ValueError):
+        get_lai(get_land_use_code(["ACRE", "ACRE"]), month)
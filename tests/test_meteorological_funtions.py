@@ -0,0 +1,36 @@
+import numpy as np
+
+from climate_tools.general_variables import GRAVITY, GAS_CONSTANT
+from climate_tools.meteorological_funtions import get_sat_wvp, get_humidity, get_air_pressure, get_windspeed_height
+
+
+def test_list_arguments():
+    np.testing.assert_allclose(get_sat_wvp([1.0, 2.0]), [get_sat_wvp(1.0), get_sat_wvp(2.0)])
+    np.testing.assert_allclose(get_humidity([5.0, 6.0], [1.0, 2.0]), [5.0 / get_sat_wvp(1.0), 6.0 / get_sat_wvp(2.0)])
+
+
+def test_scalars_keep_float32_arrays():
+    temperature_air = np.array([1.0, 2.0], dtype=np.float32)
+
+    assert get_sat_wvp(temperature_air).dtype == np.float32
+    assert get_air_pressure(1000.0, 100.0, 500.0, temperature_air, temperature_air).dtype == np.float32
+    assert isinstance(get_sat_wvp(1.0), float)
+
+
+def test_out_buffer():
+    t1 = np.array([10.0, 12.0, 14.0])
+    t2 = np.array([8.0, 9.0, 10.0])
+
+    out = np.empty(3)
+    result = get_air_pressure(1000.0, 100.0, [500.0, 600.0, 700.0], t1, t2, out=out)
+
+    assert result is out
+
+    expected = np.exp(-(GRAVITY * (np.array([500.0, 600.0, 700.0]) - 100.0)) / (GAS_CONSTANT * (t1 + t2) / 2)
+                      + np.log(1000.0))
+    np.testing.assert_allclose(out, expected)
+
+    u1 = np.array([2.0, 3.0, 4.0])
+    get_windspeed_height(10.0, 2.0, u1, 0.1, out=out)
+
+    np.testing.assert_allclose(out, u1 * np.log(2.0 / 0.1) / np.log(10.0 / 0.1))
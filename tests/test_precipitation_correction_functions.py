@@ -0,0 +1,30 @@
+import numpy as np
+import pandas as pd
+
+from climate_tools.precipitation_correction_functions import get_wettingloss, prec_correction_method1, \
+    prec_correction_method2
+
+
+def test_sequences_match_scalars():
+    precipitation = [0.5, 3.0, 12.0]
+    month = [1, 6, 13]
+
+    expected = [prec_correction_method1(p, m, 2.0, t, 2.0) for p, m, t in zip(precipitation, month, [-10.0, 5.0, 5.0])]
+
+    np.testing.assert_allclose(prec_correction_method1(precipitation, month, 2.0, [-10.0, 5.0, 5.0], 2.0), expected)
+    np.testing.assert_allclose(get_wettingloss(precipitation, month),
+                               [get_wettingloss(p, m) for p, m in zip(precipitation, month)])
+
+    # Month 13 has no wetting loss value
+    assert np.isnan(expected[2])
+
+    expected = [prec_correction_method2(p, m, t, "5D") for p, m, t in zip(precipitation, month, [-10.0, 5.0, 1.0])]
+
+    np.testing.assert_allclose(prec_correction_method2(precipitation, month, [-10.0, 5.0, 1.0], "5D"), expected)
+
+
+def test_series_keep_their_index():
+    precipitation = pd.Series([1.0, 2.0], index=[10, 20])
+
+    assert prec_correction_method1(precipitation, [5, 12], 1.0, 5.0, 2.0).index.tolist() == [10, 20]
+    assert prec_correction_method2(precipitation, [5, 12], 5.0, "2D").index.tolist() == [10, 20]
@@ -0,0 +1,48 @@
+import multiprocessing
+import os
+import threading
+
+import numpy as np
+
+from climate_tools import profiling
+
+
+def test_nested_records_of_threads():
+    barrier = threading.Barrier(2)
+
+    def work(profiler, name):
+        with profiler.record(name, "function"):
+            barrier.wait()
+            with profiler.record(f"{name} inner", "phase"):
+                np.ones(100000)
+            barrier.wait()
+
+    with profiling.profile() as profiler:
+        threads = [threading.Thread(target=work, args=(profiler, name)) for name in ["a", "b"]]
+
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    summary = profiler.summary()
+
+    assert sorted(summary) == ["a", "a inner", "b", "b inner"]
+    assert all(stats["calls"] == 1 for stats in summary.values())
+
+    # The outer records include the peak of their inner records
+    for name in ["a", "b"]:
+        assert summary[name]["bytes"] >= summary[f"{name} inner"]["bytes"] >= 800000
+
+
+def test_process_path(monkeypatch):
+    pid = os.getpid()
+
+    assert profiling._process_path("profile-{pid}.json") == f"profile-{pid}.json"
+    assert profiling._process_path("{a}/profile.json") == "{a}/profile.json"
+
+    monkeypatch.setattr(multiprocessing, "parent_process", lambda: object())
+
+    assert profiling._process_path("out/profile.trace.json") == f"out/profile.{pid}.trace.json"
+    assert profiling._process_path("out/profile.json") == f"out/profile.{pid}.json"
+    assert profiling._process_path("{a}/profile-{pid}.json") == f"{{a}}/profile-{pid}.json"
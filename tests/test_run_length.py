@@ -0,0 +1,100 @@
+from itertools import groupby
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from climate_tools import climate_indices, spell_kernels
+from climate_tools.run_length import rle_2d, longest_run, spell_mask, spell_days, first_spell_start
+
+
+def _reference_runs(row):
+    """Runs of a row as (start, length, value), like the groupby based rle of the per-year functions"""
+    runs = []
+    start = 0
+
+    for value, group in groupby(row.tolist()):
+        length = len(list(group))
+        runs.append((start, length, value))
+        start += length
+
+    return runs
+
+
+def _masks():
+    rng = np.random.default_rng(1)
+
+    masks = rng.random((20, 60)) < np.linspace(0.1, 0.9, 20)[:, np.newaxis]
+    masks[0] = False
+    masks[1] = True
+
+    return masks
+
+
+def test_rle_2d_matches_groupby():
+    values = np.random.default_rng(2).integers(0, 3, (5, 40))
+
+    series, starts, lengths, run_values = rle_2d(values)
+
+    expected = [(row, start, length, value)
+                for row in range(values.shape[0])
+                for start, length, value in _reference_runs(values[row])]
+
+    assert list(zip(series.tolist(), starts.tolist(), lengths.tolist(), run_values.tolist())) == expected
+
+
+def test_rle_of_series():
+    values, lengths = climate_indices.rle(pd.Series([0, 0, 1, 1, 1, 0]))
+
+    np.testing.assert_array_equal(values, [0, 1, 0])
+    np.testing.assert_array_equal(lengths, [2, 3, 1])
+
+
+def test_spell_functions_match_reference():
+    masks = _masks()
+    min_length = 4
+    after = 20
+
+    for row, mask in enumerate(masks):
+        runs = [(start, length) for start, length, value in _reference_runs(mask) if value]
+        spells = [(start, length) for start, length in runs if length >= min_length]
+
+        expected_mask = np.zeros(mask.size, dtype=bool)
+        for start, length in spells:
+            expected_mask[start:start + length] = True
+
+        expected_start = next((day for day in range(after, mask.size) if expected_mask[day]), -1)
+
+        assert longest_run(mask) == max([length for _, length in runs], default=0)
+        assert spell_days(mask, min_length) == sum(length for _, length in spells)
+        np.testing.assert_array_equal(spell_mask(mask, min_length), expected_mask)
+        assert first_spell_start(mask, min_length, after) == expected_start
+
+    # All series at once equal the single series
+    np.testing.assert_array_equal(longest_run(masks), [longest_run(mask) for mask in masks])
+    np.testing.assert_array_equal(spell_days(masks, min_length), [spell_days(mask, min_length) for mask in masks])
+
+
+@pytest.mark.skipif(spell_kernels.BACKEND != "numba", reason="Numba is not installed")
+def test_numba_and_numpy_backends_agree(monkeypatch):
+    rng = np.random.default_rng(3)
+
+    values = rng.normal(3.0, 6.0, (30, 366))
+    thresholds = rng.normal(0.0, 1.0, (30, 366))
+    jday_1jul = rng.integers(150, 200, 30)
+
+    def kernels():
+        return [spell_kernels.longest_spell(values, 0.0, below=True),
+                spell_kernels.longest_spell(values, thresholds, below=False),
+                spell_kernels.threshold_spell_days(values, thresholds, 6, below=True),
+                spell_kernels.threshold_spell_days(values, 5.0, 6, below=False),
+                spell_kernels.growing_season_length(values, jday_1jul),
+                spell_kernels.growing_season_length(values.astype(np.float32), 182)]
+
+    numba_results = kernels()
+
+    monkeypatch.setattr(spell_kernels, "BACKEND", "numpy")
+    numpy_results = kernels()
+
+    for numba_result, numpy_result in zip(numba_results, numpy_results):
+        np.testing.assert_array_equal(numba_result, numpy_result)
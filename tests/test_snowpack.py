@@ -0,0 +1,80 @@
+import tracemalloc
+
+import numpy as np
+import pytest
+
+from climate_tools.snowpack import SnowpackSimulator, simulate_snowpack
+
+
+def _weather(n_cells=4, n_timesteps=120):
+    rng = np.random.default_rng(10)
+
+    t_air = np.linspace(-8.0, 8.0, n_timesteps) + rng.normal(0.0, 3.0, (n_cells, n_timesteps))
+    prec = np.where(rng.random((n_cells, n_timesteps)) < 0.5, rng.gamma(1.0, 4.0, (n_cells, n_timesteps)), 0.0)
+
+    return prec, t_air
+
+
+@pytest.mark.parametrize("parameters", [{"method": "dd", "degree_day_factor": 3.0},
+                                        {"method": "knauf", "a0": 2.0, "a1": 1.5}])
+def test_water_balance(parameters):
+    prec, t_air = _weather()
+
+    result = simulate_snowpack(prec, t_air, np.full(prec.shape, 2.0), **parameters)
+
+    assert (result["swe"] >= 0).all()
+    assert result["swe"][:, 60].max() > 0
+    np.testing.assert_allclose(np.cumsum(prec, axis=1), result["swe"] + np.cumsum(result["outflow"], axis=1))
+
+
+def test_cells_are_independent():
+    prec, t_air = _weather()
+    degree_day_factor = np.array([1.0, 2.0, 3.0, 4.0])
+
+    result = simulate_snowpack(prec, t_air, degree_day_factor=degree_day_factor, t_boundary=1.0)
+
+    for cell in range(prec.shape[0]):
+        cell_result = simulate_snowpack(prec[cell:cell + 1], t_air[cell:cell + 1],
+                                        degree_day_factor=degree_day_factor[cell], t_boundary=1.0)
+
+        for output, values in cell_result.items():
+            np.testing.assert_allclose(result[output][cell], values[0], err_msg=output)
+
+
+def test_rain_and_recorded_outputs():
+    prec, t_air = _weather()
+
+    simulator = SnowpackSimulator(prec.shape[0], degree_day_factor=3.0)
+
+    swe = np.empty(prec.shape)
+    out = simulator.run(prec, np.abs(t_air) + 1.0, out={"swe": swe})
+
+    # Without snowfall all precipitation runs off
+    assert list(out) == ["swe"]
+    np.testing.assert_array_equal(swe, 0.0)
+    np.testing.assert_array_equal(simulator.outflow, prec[:, -1])
+
+    with pytest.raises(ValueError):
+        SnowpackSimulator(2, method="knauf", a0=2.0, a1=1.5).step(0.0, -1.0)
+
+
+@pytest.mark.parametrize("parameters", [{"method": "dd", "degree_day_factor": 3.0},
+                                        {"method": "knauf", "a0": 2.0, "a1": 1.5}])
+def test_step_allocates_no_float_arrays(parameters):
+    n_cells = 100000
+
+    simulator = SnowpackSimulator(n_cells, **parameters)
+
+    prec = np.full(n_cells, 2.0)
+    t_air = np.linspace(-5.0, 5.0, n_cells)
+    v = np.full(n_cells, 2.0)
+
+    simulator.step(prec, t_air, v)
+
+    tracemalloc.start()
+    simulator.step(prec, t_air, v)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    # Only boolean masks, smaller than one float64 array of the cells
+    assert peak < 8 * n_cells
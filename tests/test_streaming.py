@@ -0,0 +1,95 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from climate_tools import batch_indices, climate_indices
+from climate_tools.quality import validity_bitmap
+from climate_tools.streaming import split_years, stream_indices
+from climate_tools.year_matrix import YearMatrix
+
+INDICES = ["number_of_fd", "consecutive_dd", "growing_season_length", "rx5day", "sdii"]
+
+
+def _frame():
+    dates = pd.date_range("1999-03-01", "2002-12-31")
+    rng = np.random.default_rng(8)
+
+    seasonal_cycle = 9.0 + 12.0 * np.sin(2 * np.pi * (dates.dayofyear.to_numpy() - 105) / 365.25)
+    tmean = (seasonal_cycle + rng.normal(0.0, 4.0, dates.size)).round(1)
+
+    frame = pd.DataFrame({"DATE": dates, "tmin": tmean - 4.0, "tmean": tmean,
+                          "prec": np.where(rng.random(dates.size) < 0.4, rng.gamma(0.8, 8.0, dates.size), 0.0)})
+
+    # A few missing days in 2001
+    frame.loc[900:902, "tmin"] = np.nan
+
+    # No records at all in 2000
+    return frame[frame["DATE"].dt.year != 2000].reset_index(drop=True)
+
+
+def _chunks(frame, chunksize):
+    return (frame.iloc[start:start + chunksize] for start in range(0, len(frame), chunksize))
+
+
+def _batch_results(frame, indices, etccdi_missing_rules=False):
+    max_missing = (3, 15) if etccdi_missing_rules else (0, 0)
+
+    results = {}
+    for index in indices:
+        variable = batch_indices.INDEX_VARIABLES[index]
+        year_matrix = YearMatrix.from_array(frame[variable].to_numpy(), frame["DATE"].values)
+
+        results[index] = batch_indices.BATCH_INDICES[index](year_matrix, validity_bitmap(year_matrix, *max_missing))[0]
+
+    return results
+
+
+@pytest.mark.parametrize("chunksize", [1, 100, 10000])
+def test_stream_matches_batch_indices(chunksize):
+    frame = _frame()
+
+    for etccdi_missing_rules in [False, True]:
+        streamed = list(stream_indices(_chunks(frame, chunksize), INDICES,
+                                       etccdi_missing_rules=etccdi_missing_rules))
+
+        assert [year for year, _ in streamed] == [1999, 2000, 2001, 2002]
+
+        expected = _batch_results(frame, INDICES, etccdi_missing_rules)
+
+        for year_index, (_, results) in enumerate(streamed):
+            for index in INDICES:
+                np.testing.assert_allclose(results[index], expected[index][year_index], err_msg=index)
+
+
+def test_stream_percentile_indices():
+    frame = _frame()
+
+    year_matrix = YearMatrix.from_array(frame["tmin"].to_numpy(), frame["DATE"].values)
+    thresholds = {"tn10p": climate_indices.calculate_batch_percentile_threshold(year_matrix, 0.1, (1980, 2009), 5,
+                                                                                0.05)[0]}
+
+    streamed = dict(stream_indices(_chunks(frame, 250), ["tn10p"], thresholds))
+
+    expected = batch_indices.tn10p(year_matrix, thresholds["tn10p"][np.newaxis, :])[0]
+
+    np.testing.assert_allclose([streamed[year]["tn10p"] for year in year_matrix.years], expected)
+
+    with pytest.raises(ValueError):
+        next(stream_indices(_chunks(frame, 250), ["tn90p"], thresholds))
+
+
+def test_split_years():
+    frame = _frame()
+
+    years = list(split_years(_chunks(frame, 500), ["prec"]))
+
+    assert [year for year, _ in years] == [1999, 2000, 2001, 2002]
+
+    # Leading days of the first year and the year without records are missing
+    assert np.isnan(years[0][1]["prec"][:59]).all()
+    assert np.isnan(years[1][1]["prec"]).all()
+
+    np.testing.assert_array_equal(years[2][1]["prec"][:365], frame.loc[frame["DATE"].dt.year == 2001, "prec"])
+
+    with pytest.raises(ValueError):
+        list(split_years([frame.iloc[10:20], frame.iloc[0:10]], ["prec"]))
@@ -0,0 +1,125 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+from climate_tools import threshold_cache
+from climate_tools.threshold_cache import ThresholdCache, threshold_cache_key
+
+REFERENCE_PERIOD = (1961, 1990)
+
+
+def _frame(seed=0):
+    dates = pd.date_range("1961-01-01", "1990-12-31")
+    values = np.random.default_rng(seed).normal(10.0, 5.0, dates.size).round(1)
+
+    return pd.DataFrame({"DATE": dates, "VALUE": values})
+
+
+def _count_calculations(monkeypatch):
+    calls = []
+    calculate = threshold_cache.calculate_percentile_threshold
+
+    def counting_calculation(*args):
+        calls.append(args)
+        return calculate(*args)
+
+    monkeypatch.setattr(threshold_cache, "calculate_percentile_threshold", counting_calculation)
+
+    return calls
+
+
+def test_cache_hit(monkeypatch):
+    calls = _count_calculations(monkeypatch)
+    cache = ThresholdCache()
+    frame = _frame()
+
+    computed = cache.percentile_threshold(frame, 0.9, REFERENCE_PERIOD, 5, 0.9)
+    cached = cache.percentile_threshold(frame, 0.9, REFERENCE_PERIOD, 5, 0.9)
+
+    assert len(calls) == 1
+    pd.testing.assert_series_equal(computed, cached)
+
+    # Other parameters and other values are other entries
+    cache.percentile_threshold(frame, [0.1, 0.9], REFERENCE_PERIOD, 5, 0.9)
+    cache.percentile_threshold(_frame(seed=1), 0.9, REFERENCE_PERIOD, 5, 0.9)
+
+    assert len(calls) == 3
+
+
+def test_key_ignores_values_outside_the_reference_period():
+    frame = _frame()
+
+    # A day beyond the rolling mean windows of the reference period
+    extended = pd.concat([frame, pd.DataFrame({"DATE": [pd.Timestamp("1991-02-01")], "VALUE": [99.0]})])
+
+    assert threshold_cache_key(frame, 0.9, REFERENCE_PERIOD, 5, 0.9) == \
+        threshold_cache_key(extended, 0.9, REFERENCE_PERIOD, 5, 0.9)
+    assert threshold_cache_key(frame, 0.9, REFERENCE_PERIOD, 5, 0.9) != \
+        threshold_cache_key(frame, 0.9, REFERENCE_PERIOD, 7, 0.9)
+
+
+def test_key_depends_on_the_value_type(monkeypatch):
+    calls = _count_calculations(monkeypatch)
+    cache = ThresholdCache()
+
+    frame = _frame()
+    frame_32 = frame.astype({"VALUE": np.float32})
+
+    # The float32 values are exactly representable in float64
+    frame_64 = frame_32.astype({"VALUE": np.float64})
+
+    assert threshold_cache_key(frame_32, 0.9, REFERENCE_PERIOD, 5, 0.9) != \
+        threshold_cache_key(frame_64, 0.9, REFERENCE_PERIOD, 5, 0.9)
+
+    thresholds_32 = cache.percentile_threshold(frame_32, 0.9, REFERENCE_PERIOD, 5, 0.9)
+    thresholds_64 = cache.percentile_threshold(frame_64, 0.9, REFERENCE_PERIOD, 5, 0.9)
+
+    assert len(calls) == 2
+    assert thresholds_32.dtype == np.float32
+    assert thresholds_64.dtype == np.float64
+    pd.testing.assert_series_equal(cache.percentile_threshold(frame_32, 0.9, REFERENCE_PERIOD, 5, 0.9), thresholds_32)
+
+
+def test_memory_eviction():
+    cache = ThresholdCache(maxsize=2)
+
+    for key in ["a", "b", "c"]:
+        cache.put(key, np.full((365, 1), 1.0))
+
+    assert cache.get("a") is None
+    assert cache.get("b") is not None
+    assert not cache.get("b").flags.writeable
+
+
+def test_disk_tier(tmp_path, monkeypatch):
+    calls = _count_calculations(monkeypatch)
+    frame = _frame()
+
+    ThresholdCache(directory=str(tmp_path)).percentile_threshold(frame, 0.9, REFERENCE_PERIOD, 5, 0.9)
+
+    # A new process (cache) finds the thresholds on disk
+    cache = ThresholdCache(directory=str(tmp_path))
+    cache.percentile_threshold(frame, 0.9, REFERENCE_PERIOD, 5, 0.9)
+
+    assert len(calls) == 1
+
+    cache.clear()
+
+    assert os.listdir(tmp_path) == []
+
+
+def test_disk_eviction(tmp_path):
+    cache = ThresholdCache(maxsize=0, directory=str(tmp_path))
+
+    cache.put("a", np.full((365, 1), 1.0))
+    cache.max_disk_bytes = 2 * os.path.getsize(tmp_path / "a.npy")
+
+    for modification_time, key in enumerate(["a", "b", "c"]):
+        cache.put(key, np.full((365, 1), 1.0))
+
+        # Distinct modification times of the entries, the oldest entry is evicted first
+        os.utime(tmp_path / f"{key}.npy", (modification_time, modification_time))
+
+    assert sorted(os.listdir(tmp_path)) == ["b.npy", "c.npy"]
+    assert cache.get("a") is None